@@ -1,10 +1,24 @@
-from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.chains import RetrievalQA
 from dotenv import load_dotenv
+from pathlib import Path
 import os
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[4] / "rag-techniques" / "embeddings" / "embedding-cache-poc"))
+from embedding_cache import CachedEmbeddings
+
+sys.path.append(str(Path(__file__).resolve().parents[4] / "rag-techniques" / "databases" / "vector-store" / "faiss-index-poc"))
+from faiss_index import LazyRetriever, ensure_index, index_type_from_env, load_index
+
+sys.path.append(str(Path(__file__).resolve().parents[4] / "rag-techniques" / "splitters" / "fast-splitter-poc"))
+from fast_splitter import FastRecursiveTextSplitter
+
+INDEX_DIR = Path(__file__).resolve().parent / "faiss_index"
+CHUNK_SIZE = 300
+CHUNK_OVERLAP = 20
+INDEX_TYPE = index_type_from_env()
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,19 +34,30 @@ It enables applications that are data-aware, agentic, and able to interact with
 FAISS is a library for efficient similarity search and clustering of dense vectors.
 """
 
-# Create a list of Documents
-documents = [Document(page_content=text)]
+def load_documents():
+    # Create a list of Documents
+    documents = [Document(page_content=text)]
+
+    # Split the document into chunks
+    splitter = FastRecursiveTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return splitter.split_documents(documents)
 
-# Split the document into chunks
-splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=20)
-docs = splitter.split_documents(documents)
+# 2. Create embeddings and a persistent vector store, rebuilt only when the text or settings change
+embeddings = CachedEmbeddings(OpenAIEmbeddings())  # Requires OPENAI_API_KEY env var; unchanged chunks come from the cache
 
-# 2. Create embeddings and vector store
-embeddings = OpenAIEmbeddings()  # Requires OPENAI_API_KEY env var
-vectorstore = FAISS.from_documents(docs, embeddings)
+def open_vectorstore():
+    ensure_index(
+        INDEX_DIR,
+        embeddings,
+        load_documents,
+        sources=[text],
+        options={"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP},
+        index_type=INDEX_TYPE
+    )
+    return load_index(INDEX_DIR, embeddings)
 
-# 3. Create a retriever
-retriever = vectorstore.as_retriever(search_kwargs={"k": 2})
+# 3. Create a retriever; the index is opened on the first query
+retriever = LazyRetriever(load=open_vectorstore, search_kwargs={"k": 2})
 
 # 4. Set up the RAG chain
 llm = ChatOpenAI(model="gpt-4", api_key=api_key)  # or gpt-3.5-turbo
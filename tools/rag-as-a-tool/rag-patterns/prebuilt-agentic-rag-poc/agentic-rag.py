@@ -1,15 +1,18 @@
 # agentic-rag.py
 
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
 # LangChain imports
-from langchain.tools.retriever import create_retriever_tool
 from langchain_openai import ChatOpenAI
 
-from etl import vectorstore
+sys.path.append(str(Path(__file__).resolve().parents[2] / "rag-techniques" / "retrivers" / "multi-query-retriever-poc"))
+from multi_query import create_multi_query_tool
 
-retriever = vectorstore.as_retriever()
+# The index is built by etl.py and opened on the first retrieval
+from etl import retriever
 
 # Import LangGraph create_react_agent
 from langgraph.prebuilt import create_react_agent
@@ -22,16 +25,22 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY is not set in your environment.")
 
-# Wrap retriever as a tool
-retriever_tool = create_retriever_tool(
-    retriever=retriever,
-    name="doc_retriever",
-    description="Search the document database for relevant information."
-)
+# multi_query (query rewrites), hyde (hypothetical answer) or both
+MULTI_QUERY_MODE = os.getenv("MULTI_QUERY_MODE", "multi_query")
 
 # Define LLM
 llm = ChatOpenAI(model="gpt-4o", api_key=OPENAI_API_KEY)
 
+# Wrap retriever as a tool: one call writes the sub-queries, retrieves them
+# concurrently and returns the fused results, so the agent needs one round-trip
+retriever_tool = create_multi_query_tool(
+    retriever=retriever,
+    llm=ChatOpenAI(model="gpt-4o-mini", api_key=OPENAI_API_KEY, temperature=0),
+    name="doc_retriever",
+    description="Search the document database for relevant information.",
+    mode=MULTI_QUERY_MODE
+)
+
 # Create the agent using LangGraph's create_react_agent
 agent_runnable = create_react_agent(llm, [retriever_tool])
 
@@ -39,7 +48,8 @@ agent_runnable = create_react_agent(llm, [retriever_tool])
 query = "What did the president say about climate change?"
 response = agent_runnable.invoke({
     "messages": [
-        ("system", "You are an intelligent agent who helps answer questions using a document retriever."),
+        ("system", "You are an intelligent agent who helps answer questions using a document retriever. "
+                   "Call it once with the full question; it already searches each part of it."),
         ("user", query)
     ]
 })
@@ -1,14 +1,27 @@
 # etl.py
+#
+# Builds the FAISS index for agentic-rag.py. Run `python etl.py` to (re)build it;
+# the build is skipped when state_of_the_union.txt, the embedding model and the
+# splitter settings are unchanged. Importing this module embeds nothing: the
+# retriever opens the index on its first query and builds it only if missing.
 
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
 # LangChain imports
-from langchain.tools.retriever import create_retriever_tool
-from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import CharacterTextSplitter
+from langchain_core.documents import Document
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / "rag-techniques" / "embeddings" / "embedding-cache-poc"))
+from embedding_cache import CachedEmbeddings
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / "rag-techniques" / "databases" / "vector-store" / "faiss-index-poc"))
+from faiss_index import LazyRetriever, ensure_index, index_type_from_env, load_index
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / "rag-techniques" / "splitters" / "fast-splitter-poc"))
+from fast_splitter import FastCharacterTextSplitter, split_file_incremental
 
 # Load environment variables from .env
 load_dotenv()
@@ -16,21 +29,55 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY is not set in your environment.")
 
-# Create a sample text file
-with open("state_of_the_union.txt", "w") as f:
-    f.write("""
-    Hello, my fellow citizens. Today, I want to talk about the future of our great nation.
-    We are facing many challenges, including climate change, economic inequality, and global competition.
-    Climate change is one of the most pressing issues of our time, and we must act now to ensure
-    a better future for our children and grandchildren.
-    """)
-
-# Load and split documents
-loader = TextLoader("state_of_the_union.txt")
-documents = loader.load()
-text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-texts = text_splitter.split_documents(documents)
-
-# Embeddings and vectorstore
-embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-vectorstore = FAISS.from_documents(texts, embeddings)
+BASE_DIR = Path(__file__).resolve().parent
+SOURCE_FILE = BASE_DIR / "state_of_the_union.txt"
+INDEX_DIR = BASE_DIR / "faiss_index"
+# Previous text and chunk offsets, so an edit only re-splits the changed region
+CHUNK_STATE = INDEX_DIR / "chunks.json.gz"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 0
+INDEX_TYPE = index_type_from_env()
+
+# Embeddings
+# Cached on disk, so rebuilding the index only embeds new or changed chunks
+embeddings = CachedEmbeddings(OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY))
+
+
+def load_documents():
+    """
+    Load and split the source text. Chunks outside the edited region keep
+    their text, so their embeddings come from the cache on a rebuild.
+    """
+    text = SOURCE_FILE.read_text(encoding="utf-8")
+    text_splitter = FastCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = split_file_incremental(text, text_splitter, CHUNK_STATE)
+    return [
+        Document(page_content=chunk.text, metadata={"source": str(SOURCE_FILE), "start_index": chunk.start})
+        for chunk in chunks
+    ]
+
+
+def build_index(force: bool = False):
+    """Rebuild the index if the source text, model or splitter settings changed."""
+    return ensure_index(
+        INDEX_DIR,
+        embeddings,
+        load_documents,
+        sources=[SOURCE_FILE],
+        options={"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP},
+        force=force,
+        index_type=INDEX_TYPE
+    )
+
+
+def open_vectorstore():
+    build_index()
+    return load_index(INDEX_DIR, embeddings)
+
+
+# Opened lazily on the first query
+retriever = LazyRetriever(load=open_vectorstore)
+
+
+if __name__ == "__main__":
+    print(f"FAISS index ready: {build_index()}")
@@ -1,18 +1,27 @@
 import os
+import sys
 import tempfile
+from pathlib import Path
 import pandas as pd
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
 
 from langchain_openai import ChatOpenAI  # updated import
 from langchain_community.tools import QuerySQLDatabaseTool  # updated import for SQL tool
-from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings  # updated import
 from langchain.tools.retriever import create_retriever_tool
 from langchain_community.utilities import SQLDatabase
 from langgraph.prebuilt import create_react_agent
 from langchain.docstore.document import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+sys.path.append(str(Path(__file__).resolve().parents[3] / "rag-techniques" / "embeddings" / "embedding-cache-poc"))
+from embedding_cache import CachedEmbeddings
+
+sys.path.append(str(Path(__file__).resolve().parents[3] / "rag-techniques" / "databases" / "vector-store" / "faiss-index-poc"))
+from faiss_index import LazyRetriever, ensure_index, index_type_from_env, load_index
+
+sys.path.append(str(Path(__file__).resolve().parents[3] / "rag-techniques" / "splitters" / "fast-splitter-poc"))
+from fast_splitter import FastRecursiveTextSplitter
 
 # -------------------- 0. Load environment --------------------
 load_dotenv()
@@ -43,7 +52,7 @@ with engine.begin() as connection:
 db = SQLDatabase.from_uri(f"duckdb:///{db_file_path}", include_tables=["products"])
 
 # -------------------- 3. FAISS Vector Store for schema --------------------
-embedding = OpenAIEmbeddings(openai_api_key=openai_key)
+embedding = CachedEmbeddings(OpenAIEmbeddings(openai_api_key=openai_key))
 
 schema_docs = [
     Document(page_content="""
@@ -56,11 +65,25 @@ schema_docs = [
     """),
 ]
 
-splitter = RecursiveCharacterTextSplitter(chunk_size=512, chunk_overlap=0)
-split_docs = splitter.split_documents(schema_docs)
-faiss_index = FAISS.from_documents(split_docs, embedding)
-
-retriever = faiss_index.as_retriever()
+SCHEMA_INDEX_DIR = Path(__file__).resolve().parent / "schema_index"
+INDEX_TYPE = index_type_from_env()
+
+def split_schema_docs():
+    splitter = FastRecursiveTextSplitter(chunk_size=512, chunk_overlap=0)
+    return splitter.split_documents(schema_docs)
+
+def open_schema_index():
+    ensure_index(
+        SCHEMA_INDEX_DIR,
+        embedding,
+        split_schema_docs,
+        sources=[doc.page_content for doc in schema_docs],
+        options={"chunk_size": 512, "chunk_overlap": 0},
+        index_type=INDEX_TYPE
+    )
+    return load_index(SCHEMA_INDEX_DIR, embedding)
+
+retriever = LazyRetriever(load=open_schema_index)
 retriever_tool = create_retriever_tool(
     retriever,
     name="schema_context_tool",
@@ -0,0 +1,258 @@
+"""
+Disk-backed, memory-mapped key-value store for LangChain Documents.
+
+Records are appended to a single log file and read through a read-only
+memory map, so processes opening the same file share its pages through the
+OS page cache instead of each holding their own copy. A small LRU cache of
+decoded Documents sits in front of the map.
+
+Record layout (little endian):
+
+    key length (u16) | value length (u32, 0 = deleted) | crc32 (u32) | key | value
+
+The value is zlib-compressed JSON `[page_content, metadata]`. A record whose
+checksum does not match, e.g. the tail of an interrupted write, ends the log;
+the next writer truncates it. Appends are serialized between processes with
+an exclusive file lock, and readers pick up other processes' writes on the
+next read. When another process has compacted the log into a new file, the
+next read or write reopens the store on it.
+"""
+from typing import List, Dict, Any, Optional, Iterator, Sequence, Tuple
+from collections import OrderedDict
+from pathlib import Path
+from langchain_core.documents import Document
+from langchain_core.stores import BaseStore
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MDS1"
+HEADER = struct.Struct("<HII")
+
+
+def encode_document(doc: Document, level: int = 6) -> bytes:
+    """Compact serialization of a Document."""
+    payload = json.dumps([doc.page_content, doc.metadata], separators=(",", ":"), ensure_ascii=False, default=str)
+    return zlib.compress(payload.encode("utf-8"), level)
+
+
+def decode_document(data: bytes) -> Document:
+    page_content, metadata = json.loads(zlib.decompress(data))
+    return Document(page_content=page_content, metadata=metadata)
+
+
+class MmapDocStore(BaseStore[str, Document]):
+    """
+    Persistent Document store, e.g. the parent docstore of a ParentDocumentRetriever.
+
+    Overwritten and deleted records stay in the log until compact() rewrites it.
+    """
+
+    def __init__(self, path: str, cache_size: int = 1024, compress_level: int = 6):
+        """
+        Args:
+            path (str): Log file, created if missing
+            cache_size (int): Decoded Documents kept in the LRU cache
+            compress_level (int): zlib level for new records
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_size = cache_size
+        self.compress_level = compress_level
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._cache: "OrderedDict[str, Document]" = OrderedDict()
+        self._open()
+
+    def _open(self) -> None:
+        self._fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.write(self._fd, MAGIC)
+            elif os.pread(self._fd, len(MAGIC), 0) != MAGIC:
+                raise ValueError(f"'{self.path}' is not a document store")
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map: Optional[mmap.mmap] = None
+        self._mapped = 0
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._end = len(MAGIC)
+        self._refresh()
+
+    def _replaced(self) -> bool:
+        """Whether the path now names another file than the open one, e.g. after another process compacted it."""
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._fd).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _reopen(self) -> None:
+        logger.info(f"{self.path} was replaced, reopening it")
+        self.close()
+        self._open()
+
+    def _lock_file(self) -> None:
+        """Take the exclusive file lock on the current file."""
+        while True:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            # A compaction may have replaced the file while we waited for its lock
+            if not self._replaced():
+                return
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._reopen()
+
+    # ----------------------------------------------------------------------
+    def _refresh(self) -> None:
+        """Index records appended since the last scan, by this or another process."""
+        if self._replaced():
+            # _open() scans the new file from the start
+            self._reopen()
+            return
+        size = os.fstat(self._fd).st_size
+        # Unchanged, or only an incomplete record was added since the last scan
+        if size <= self._end or size == self._mapped:
+            return
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._fd, size, access=mmap.ACCESS_READ)
+        self._mapped = size
+
+        pos = self._end
+        while pos + HEADER.size <= size:
+            key_len, value_len, crc = HEADER.unpack_from(self._map, pos)
+            start = pos + HEADER.size
+            end = start + key_len + value_len
+            if end > size or zlib.crc32(self._map[start:end]) != crc:
+                # Interrupted write; the next writer truncates it
+                break
+            key = self._map[start:start + key_len].decode("utf-8")
+            if value_len:
+                self._offsets[key] = (start + key_len, value_len)
+            else:
+                self._offsets.pop(key, None)
+            self._cache.pop(key, None)
+            pos = end
+        self._end = pos
+
+    def _append(self, records: List[Tuple[str, bytes]]) -> None:
+        blob = bytearray()
+        for key, value in records:
+            key_bytes = key.encode("utf-8")
+            blob += HEADER.pack(len(key_bytes), len(value), zlib.crc32(key_bytes + value))
+            blob += key_bytes + value
+
+        self._lock_file()
+        try:
+            self._refresh()
+            if os.fstat(self._fd).st_size > self._end:
+                logger.warning(f"Discarding an incomplete record at the end of {self.path}")
+                os.ftruncate(self._fd, self._end)
+                self._mapped = 0
+            os.pwrite(self._fd, bytes(blob), self._end)
+            os.fsync(self._fd)
+            self._refresh()
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    # ----------------------------------------------------------------------
+    def mget(self, keys: Sequence[str]) -> List[Optional[Document]]:
+        with self._lock:
+            # One fstat when nothing changed; picks up other processes' writes and deletes
+            self._refresh()
+            results = []
+            for key in keys:
+                doc = self._cache.get(key)
+                if doc is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                elif key in self._offsets:
+                    offset, length = self._offsets[key]
+                    doc = decode_document(self._map[offset:offset + length])
+                    self.misses += 1
+                    self._cache[key] = doc
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+                results.append(doc)
+            return results
+
+    def mset(self, key_value_pairs: Sequence[Tuple[str, Document]]) -> None:
+        records = [(key, encode_document(doc, self.compress_level)) for key, doc in key_value_pairs]
+        if records:
+            with self._lock:
+                self._append(records)
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        with self._lock:
+            self._refresh()
+            records = [(key, b"") for key in keys if key in self._offsets]
+            if records:
+                self._append(records)
+
+    def yield_keys(self, *, prefix: Optional[str] = None) -> Iterator[str]:
+        with self._lock:
+            self._refresh()
+            keys = list(self._offsets)
+        for key in keys:
+            if prefix is None or key.startswith(prefix):
+                yield key
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._offsets)
+
+    # ----------------------------------------------------------------------
+    def compact(self) -> None:
+        """
+        Rewrite the log with only the live records.
+
+        Other processes switch to the new file on their next read or write.
+        """
+        with self._lock:
+            self._lock_file()
+            try:
+                self._refresh()
+                before = self._end
+                tmp = self.path.with_name(self.path.name + ".tmp")
+                with open(tmp, "wb") as f:
+                    f.write(MAGIC)
+                    for key, (offset, length) in self._offsets.items():
+                        key_bytes = key.encode("utf-8")
+                        value = self._map[offset:offset + length]
+                        f.write(HEADER.pack(len(key_bytes), length, zlib.crc32(key_bytes + value)))
+                        f.write(key_bytes + value)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self.close()
+            self._open()
+            logger.info(f"Compacted {self.path}: {before} -> {self._end} bytes")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "keys": len(self._offsets),
+                "file_bytes": self._end,
+                "cached": len(self._cache),
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            os.close(self._fd)
+            self._cache.clear()
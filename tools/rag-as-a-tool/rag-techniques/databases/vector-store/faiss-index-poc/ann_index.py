@@ -0,0 +1,252 @@
+"""
+Approximate nearest neighbour index selection for FAISS.
+
+    flat   exact search, scans every vector (the LangChain default)
+    ivf    inverted file: k-means cells, searches `nprobe` of them
+    hnsw   graph search, beam width `efSearch`; no training needed
+    ivfpq  inverted file over product-quantized codes, smallest memory; the
+           lossy codes cap recall, raise pq_m for a higher ceiling
+
+make_index() sizes the index for the corpus (cells, graph degree, PQ code
+size) and falls back to flat when the corpus is too small for clustering.
+train_index() trains on a random sample. tune_index() sweeps the search
+parameter against exact results and keeps the fastest setting that reaches a
+target recall.
+
+Pipelines built on faiss_index.py read the index type from the
+FAISS_INDEX_TYPE environment variable (see index_type_from_env): "flat" by
+default, which is exact and fastest to build; the approximate types pay off
+on large corpora.
+"""
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+import math
+import os
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+
+# k-means wants about this many training points per centroid
+POINTS_PER_CENTROID = 39
+
+# FAISS index_factory storage suffixes for the flat, ivf and hnsw types
+STORAGE = {"none": "Flat", "fp16": "SQfp16", "int8": "SQ8"}
+
+
+def index_type_from_env(default: str = "flat") -> str:
+    """Index type from FAISS_INDEX_TYPE, one of INDEX_TYPES."""
+    index_type = os.getenv("FAISS_INDEX_TYPE", default)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"FAISS_INDEX_TYPE must be one of {INDEX_TYPES}, got '{index_type}'")
+    return index_type
+
+
+def _faiss():
+    import faiss
+    return faiss
+
+
+def index_description(
+    dim: int,
+    index_type: str = "flat",
+    num_vectors: Optional[int] = None,
+    compression: str = "none",
+    nlist: Optional[int] = None,
+    hnsw_m: int = 32,
+    pq_m: Optional[int] = None,
+    pq_bits: int = 8
+) -> str:
+    """
+    FAISS index_factory string for an index type sized for `num_vectors`.
+
+    Args:
+        dim (int): Vector dimension
+        index_type (str): "flat", "ivf", "hnsw" or "ivfpq"
+        num_vectors (int, optional): Expected corpus size, used to pick nlist
+        compression (str): Vector storage for flat/ivf/hnsw: "none", "fp16" or "int8"
+        nlist (int, optional): IVF cells (default about 4 * sqrt(num_vectors))
+        hnsw_m (int): HNSW graph degree
+        pq_m (int, optional): PQ sub-quantizers, must divide dim (default: dim / 8 rounded to a divisor)
+        pq_bits (int): Bits per PQ code
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'; use one of {INDEX_TYPES}")
+    if compression not in STORAGE:
+        raise ValueError(f"Unknown compression '{compression}'; use one of {sorted(STORAGE)}")
+    storage = STORAGE[compression]
+
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m},{storage}"
+    if index_type == "flat":
+        return storage
+
+    n = num_vectors or 0
+    if nlist is None:
+        nlist = int(4 * math.sqrt(n)) if n else 0
+    nlist = min(nlist, n // POINTS_PER_CENTROID)
+    if nlist < 8:
+        logger.warning(f"{n} vectors are too few to cluster; using an exact flat index instead of {index_type}.")
+        return storage
+
+    if index_type == "ivf":
+        return f"IVF{nlist},{storage}"
+
+    if pq_m is None:
+        pq_m = max(1, dim // 8)
+        while dim % pq_m:
+            pq_m -= 1
+    if dim % pq_m:
+        raise ValueError(f"pq_m={pq_m} must divide the dimension {dim}")
+    # Each PQ codebook needs POINTS_PER_CENTROID points per centroid as well
+    pq_bits = min(pq_bits, max(4, int(math.log2(max(n, 1) / POINTS_PER_CENTROID))))
+    return f"IVF{nlist},PQ{pq_m}x{pq_bits}"
+
+
+def make_index(dim: int, index_type: str = "flat", num_vectors: Optional[int] = None, **params: Any):
+    """Create an (untrained) FAISS index; see index_description for the parameters."""
+    description = index_description(dim, index_type, num_vectors, **params)
+    logger.info(f"FAISS index '{description}' for {num_vectors or 'unknown'} vectors")
+    return _faiss().index_factory(dim, description)
+
+
+def train_index(index, vectors: np.ndarray, sample_size: int = 100_000, seed: int = 0) -> None:
+    """Train on a random sample of at most `sample_size` vectors; no-op for indexes that need no training."""
+    if index.is_trained:
+        return
+    if len(vectors) > sample_size:
+        rng = np.random.default_rng(seed)
+        vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    start = time.perf_counter()
+    index.train(np.ascontiguousarray(vectors, dtype=np.float32))
+    logger.info(f"Trained index on {len(vectors)} vectors in {time.perf_counter() - start:.1f}s")
+
+
+def training_size(index) -> int:
+    """Vectors worth training an index on: 0 when it needs no training, else enough for its k-means."""
+    if index.is_trained:
+        return 0
+    ivf = _faiss().try_extract_index_ivf(index)
+    # PQ codebooks have 256 centroids per subquantizer
+    return POINTS_PER_CENTROID * max(ivf.nlist if ivf is not None else 0, 256)
+
+
+def build_ann_index(vectors: np.ndarray, index_type: str = "flat", **params: Any):
+    """Create, train and fill an index for the given vectors."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = make_index(vectors.shape[1], index_type, num_vectors=len(vectors), **params)
+    train_index(index, vectors)
+    index.add(vectors)
+    return index
+
+
+# ----------------------------------------------------------------------
+def search_parameter(index) -> Tuple[Optional[str], List[int]]:
+    """The index's recall/speed knob and candidate values, e.g. ("nprobe", [1, 2, 4, ...])."""
+    faiss = _faiss()
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        values = [v for v in (1, 2, 4, 8, 16, 32, 64, 128, 256, 512) if v < ivf.nlist] + [ivf.nlist]
+        return "nprobe", values
+    if hasattr(index, "hnsw"):
+        return "efSearch", [16, 24, 32, 48, 64, 96, 128, 192, 256, 384, 512]
+    return None, []
+
+
+def set_search_params(index, params: Dict[str, int]) -> None:
+    """Apply {"nprobe": n} and/or {"efSearch": n} to an index."""
+    faiss = _faiss()
+    if "nprobe" in params:
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = int(params["nprobe"])
+    if "efSearch" in params and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = int(params["efSearch"])
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Fraction of the true top-k ids found, averaged over queries."""
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int, metric: Optional[int] = None) -> np.ndarray:
+    """Exact top-k ids by brute force, the ground truth for recall."""
+    faiss = _faiss()
+    exact = faiss.IndexFlat(vectors.shape[1], faiss.METRIC_L2 if metric is None else metric)
+    exact.add(np.ascontiguousarray(vectors, dtype=np.float32))
+    return exact.search(np.ascontiguousarray(queries, dtype=np.float32), k)[1]
+
+
+def tune_index(
+    index,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    target_recall: float = 0.95
+) -> Dict[str, Any]:
+    """
+    Sweep the index's search parameter and keep the fastest value reaching `target_recall`.
+
+    Args:
+        index: A filled FAISS index
+        queries (np.ndarray): Sample queries, e.g. held-out corpus vectors
+        truth (np.ndarray): Exact top-k ids for the queries (see exact_neighbours)
+        target_recall (float): Minimum recall@k to accept
+
+    Returns:
+        Dict[str, Any]: {"params", "recall", "ms_per_query", "sweep"}; if no value
+        reaches the target, the one with the best recall is applied
+    """
+    name, values = search_parameter(index)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    k = truth.shape[1]
+
+    def measure() -> Tuple[float, float]:
+        start = time.perf_counter()
+        found = index.search(queries, k)[1]
+        return recall_at_k(found, truth), (time.perf_counter() - start) * 1000 / len(queries)
+
+    if name is None:
+        recall, ms = measure()
+        return {"params": {}, "recall": recall, "ms_per_query": ms, "sweep": []}
+
+    sweep = []
+    chosen = None
+    for value in values:
+        set_search_params(index, {name: value})
+        recall, ms = measure()
+        sweep.append({name: value, "recall": recall, "ms_per_query": ms})
+        # Recall grows with the parameter, so the first value that reaches the target is the fastest
+        if recall >= target_recall:
+            chosen = sweep[-1]
+            break
+        # PQ codes cap recall below exact; stop once larger values no longer help
+        if len(sweep) >= 3 and sweep[-1]["recall"] - sweep[-3]["recall"] < 0.002:
+            break
+    if chosen is None:
+        chosen = max(sweep, key=lambda row: row["recall"])
+        logger.warning(
+            f"Target recall {target_recall} not reached; best is {chosen['recall']:.3f} at {name}={chosen[name]}"
+        )
+    set_search_params(index, {name: chosen[name]})
+    logger.info(f"Tuned {name}={chosen[name]}: recall@{k}={chosen['recall']:.3f}, {chosen['ms_per_query']:.3f} ms/query")
+    return {"params": {name: chosen[name]}, "recall": chosen["recall"], "ms_per_query": chosen["ms_per_query"], "sweep": sweep}
+
+
+def tune_on_sample(
+    index,
+    vectors: np.ndarray,
+    target_recall: float = 0.95,
+    num_queries: int = 200,
+    k: int = 10,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """tune_index with corpus vectors (slightly perturbed) as the sample queries."""
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)
+    scale = float(np.std(vectors)) * 0.05
+    queries = (vectors[picks] + rng.normal(0, scale, (len(picks), vectors.shape[1]))).astype(np.float32)
+    k = min(k, len(vectors))
+    return tune_index(index, queries, exact_neighbours(vectors, queries, k, index.metric_type), target_recall)
@@ -0,0 +1,139 @@
+"""
+Local benchmark of the FAISS index types in ann_index.py on synthetic vectors.
+
+For each corpus size and index type: build (train + add) time, index size,
+the search parameter tuned for the target recall, and the recall, per-query
+latency and batch throughput at that setting. The parameter is tuned on one
+half of the queries and measured on the other, so the reported recall is not
+fitted to the queries it is measured on. Run:
+
+    python benchmark_ann.py
+"""
+from typing import List, Dict, Any, Tuple
+import json
+import logging
+import time
+import numpy as np
+from ann_index import INDEX_TYPES, build_ann_index, exact_neighbours, index_description, recall_at_k, tune_index
+
+logger = logging.getLogger(__name__)
+
+
+def synthetic_vectors(num_vectors: int, dim: int = 128, num_clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Clustered Gaussian vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_clusters, dim)).astype(np.float32)
+    vectors = np.empty((num_vectors, dim), dtype=np.float32)
+    for offset in range(0, num_vectors, 100_000):
+        n = min(100_000, num_vectors - offset)
+        vectors[offset:offset + n] = centers[rng.integers(0, num_clusters, n)] + rng.normal(scale=0.5, size=(n, dim))
+    return vectors
+
+
+def _percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples_ms)
+    return {
+        "p50_ms": float(np.percentile(values, 50)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "mean_ms": float(values.mean()),
+    }
+
+
+def benchmark_index(
+    vectors: np.ndarray,
+    queries: Tuple[np.ndarray, np.ndarray],
+    truth: Tuple[np.ndarray, np.ndarray],
+    index_type: str,
+    target_recall: float,
+    **params: Any
+) -> Dict[str, Any]:
+    """Build, tune on the first query set and measure on the second."""
+    import faiss
+    tune_queries, eval_queries = queries
+    tune_truth, eval_truth = truth
+    k = eval_truth.shape[1]
+
+    start = time.perf_counter()
+    index = build_ann_index(vectors, index_type, **params)
+    build_s = time.perf_counter() - start
+
+    tuning = tune_index(index, tune_queries, tune_truth, target_recall)
+
+    latencies = []
+    for query in eval_queries:
+        start = time.perf_counter()
+        index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    found = index.search(eval_queries, k)[1]
+    batch_s = time.perf_counter() - start
+
+    return {
+        "index_type": index_type,
+        "description": index_description(vectors.shape[1], index_type, len(vectors), **params),
+        "build_s": build_s,
+        "index_bytes": int(faiss.serialize_index(index).nbytes),
+        "params": tuning["params"],
+        "recall": recall_at_k(found, eval_truth),
+        "latency": _percentiles(latencies),
+        "batch_qps": len(eval_queries) / batch_s,
+    }
+
+
+def run_benchmark(
+    sizes: Tuple[int, ...] = (10_000, 100_000, 1_000_000),
+    index_types: Tuple[str, ...] = INDEX_TYPES,
+    dim: int = 128,
+    num_queries: int = 400,
+    k: int = 10,
+    target_recall: float = 0.95,
+    output_path: str = "ann_benchmark_results.json"
+) -> Dict[str, Any]:
+    """
+    Benchmark every index type at every corpus size and write the results as JSON.
+
+    Args:
+        sizes: Corpus sizes
+        index_types: Subset of ann_index.INDEX_TYPES
+        dim (int): Vector dimension
+        num_queries (int): Queries per size, split evenly between tuning and measuring
+        k (int): Neighbours per query; recall is recall@k against exact search
+        target_recall (float): Recall the search parameter is tuned for
+        output_path (str): Where to write the JSON report
+    """
+    results = []
+    for size in sizes:
+        vectors = synthetic_vectors(size, dim)
+        # Queries near, but not at, corpus vectors
+        rng = np.random.default_rng(size)
+        picks = rng.choice(size, num_queries, replace=False)
+        queries = (vectors[picks] + rng.normal(scale=0.1, size=(num_queries, dim))).astype(np.float32)
+        truth = exact_neighbours(vectors, queries, k)
+        half = num_queries // 2
+        for index_type in index_types:
+            logger.info(f"Benchmarking {index_type} on {size} vectors")
+            row = {"num_vectors": size, **benchmark_index(
+                vectors, (queries[:half], queries[half:]), (truth[:half], truth[half:]), index_type, target_recall
+            )}
+            results.append(row)
+            print(
+                f"{size:>9} {index_type:<6} build={row['build_s']:7.1f}s size={row['index_bytes'] / 2**20:8.1f}MB "
+                f"{json.dumps(row['params']):<18} recall@{k}={row['recall']:.3f} "
+                f"p50={row['latency']['p50_ms']:.3f} p99={row['latency']['p99_ms']:.3f} ms "
+                f"batch={row['batch_qps']:.0f} q/s"
+            )
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {"dim": dim, "num_queries": num_queries, "k": k, "target_recall": target_recall},
+        "results": results,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output_path}")
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_benchmark()
@@ -0,0 +1,335 @@
+"""
+Persistent FAISS indexes for LangChain retrievers.
+
+build_index() embeds documents once and writes a versioned index directory:
+
+    <directory>/CURRENT              name of the live version
+    <directory>/<version>/index.faiss
+    <directory>/<version>/docstore.json.gz
+    <directory>/<version>/manifest.json
+
+ensure_index() hashes the inputs (source files or texts, embedding model and
+build options) and only rebuilds when that hash differs from the live
+version. load_index() memory-maps the index read-only, and LazyRetriever
+defers all of it to the first retrieval, so importing a pipeline costs no
+embedding calls and no index I/O. faiss itself is only imported on first use.
+
+Indexes are exact (flat) by default; pass index_type="ivf", "hnsw" or
+"ivfpq" for an approximate index (see ann_index.py), whose search parameter
+is tuned at build time to reach `target_recall` and stored in the manifest.
+"""
+from typing import List, Dict, Any, Optional, Callable, Iterable, Union
+from datetime import datetime, timezone
+from pathlib import Path
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, PrivateAttr
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import threading
+import numpy as np
+from ann_index import (
+    STORAGE, build_ann_index, index_description, index_type_from_env, make_index, set_search_params, train_index,
+    training_size, tune_on_sample
+)
+
+sys.path.append(str(Path(__file__).resolve().parents[3] / "embeddings" / "embedding-cache-poc"))
+from embedding_cache import model_name_of
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.json.gz"
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+# Vector storage; fp16 halves the size with no practical loss in recall
+COMPRESSION = STORAGE
+
+
+def embedding_model_of(embeddings: Embeddings) -> str:
+    """
+    Model identifier for the manifest and source hash, looking through cache
+    wrappers; includes the output dimension, so changing it forces a rebuild.
+    """
+    return model_name_of(getattr(embeddings, "underlying", embeddings))
+
+
+def source_hash(sources: Iterable[Union[str, Path]], embeddings: Embeddings, options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Hash of everything an index depends on.
+
+    Args:
+        sources: Input files (Path) or raw texts (str), in a stable order
+        embeddings (Embeddings): The embedding model
+        options (Dict, optional): Build options such as chunk sizes that change the index
+    """
+    h = hashlib.sha256()
+    for source in sources:
+        if isinstance(source, Path):
+            h.update(b"file\0" + source.name.encode("utf-8") + b"\0")
+            with open(source, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+        else:
+            h.update(b"text\0" + source.encode("utf-8"))
+        h.update(b"\0")
+    h.update(embedding_model_of(embeddings).encode("utf-8"))
+    h.update(json.dumps(options or {}, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def current_version(directory: Union[str, Path]) -> Optional[Path]:
+    """Directory of the live index version, or None if none was built."""
+    pointer = Path(directory) / CURRENT_FILE
+    if not pointer.exists():
+        return None
+    version = Path(directory) / pointer.read_text().strip()
+    return version if (version / MANIFEST_FILE).exists() else None
+
+
+def read_manifest(directory: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    version = current_version(directory)
+    if version is None:
+        return None
+    with open(version / MANIFEST_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ----------------------------------------------------------------------
+def build_index(
+    documents: List[Document],
+    embeddings: Embeddings,
+    directory: Union[str, Path],
+    hash_: str = "",
+    compression: str = "fp16",
+    batch_size: int = 256,
+    keep_versions: int = 2,
+    index_type: str = "flat",
+    index_params: Optional[Dict[str, Any]] = None,
+    target_recall: float = 0.95
+) -> Path:
+    """
+    Embed documents and write them as a new index version, then switch CURRENT to it.
+
+    Readers of the previous version are unaffected: versions are never
+    modified in place, and the pointer is swapped atomically. Approximate
+    index types are trained on a sample of the vectors and tuned to
+    `target_recall` (see ann_index.py).
+
+    Returns:
+        Path: The new version directory
+    """
+    if compression not in COMPRESSION:
+        raise ValueError(f"Unknown compression '{compression}'; use one of {sorted(COMPRESSION)}")
+    if not documents:
+        raise ValueError("Cannot build an index without documents")
+    directory = Path(directory)
+
+    vectors = []
+    for offset in range(0, len(documents), batch_size):
+        batch = documents[offset:offset + batch_size]
+        vectors.extend(embeddings.embed_documents([doc.page_content for doc in batch]))
+    matrix = np.asarray(vectors, dtype=np.float32)
+
+    import faiss
+    params = {"compression": compression, **(index_params or {})}
+    description = index_description(matrix.shape[1], index_type, len(matrix), **params)
+    index = build_ann_index(matrix, index_type, **params)
+    tuning = tune_on_sample(index, matrix, target_recall) if index_type != "flat" else {"params": {}}
+
+    built_at = datetime.now(timezone.utc)
+    name = f"v{built_at.strftime('%Y%m%dT%H%M%S%f')}-{hash_[:12] or 'nohash'}"
+    version = directory / name
+    staging = directory / f".{name}.tmp"
+    staging.mkdir(parents=True)
+    faiss.write_index(index, str(staging / INDEX_FILE))
+    with gzip.open(staging / DOCSTORE_FILE, "wt", encoding="utf-8") as f:
+        json.dump([{"page_content": doc.page_content, "metadata": doc.metadata} for doc in documents], f)
+    with open(staging / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "format_version": FORMAT_VERSION,
+            "source_hash": hash_,
+            "embedding_model": embedding_model_of(embeddings),
+            "dim": int(matrix.shape[1]),
+            "count": len(documents),
+            "compression": compression,
+            "index_type": index_type,
+            "index_description": description,
+            "search_params": tuning["params"],
+            "tuned_recall": tuning.get("recall"),
+            "built_at": built_at.isoformat(),
+        }, f, indent=2)
+    os.replace(staging, version)
+
+    pointer_tmp = directory / f".{CURRENT_FILE}.tmp"
+    pointer_tmp.write_text(name)
+    os.replace(pointer_tmp, directory / CURRENT_FILE)
+    logger.info(f"Built FAISS index {name}: {len(documents)} documents, '{description}'")
+
+    _prune(directory, keep_versions)
+    return version
+
+
+def _prune(directory: Path, keep_versions: int) -> None:
+    """Remove all but the newest `keep_versions` versions (the live one is always kept)."""
+    live = current_version(directory)
+    versions = sorted(p for p in directory.iterdir() if p.is_dir() and p.name.startswith("v"))
+    for old in versions[:-keep_versions] if keep_versions > 0 else versions:
+        if old != live:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def ensure_index(
+    directory: Union[str, Path],
+    embeddings: Embeddings,
+    load_documents: Callable[[], List[Document]],
+    sources: Iterable[Union[str, Path]],
+    options: Optional[Dict[str, Any]] = None,
+    compression: str = "fp16",
+    force: bool = False,
+    index_type: str = "flat",
+    index_params: Optional[Dict[str, Any]] = None
+) -> Path:
+    """
+    Build the index only if its inputs changed since the live version.
+
+    Args:
+        directory: Index root directory
+        embeddings (Embeddings): Embedding model used for the documents and, later, queries
+        load_documents (Callable): Loads and splits the documents; only called on a rebuild
+        sources: Input files or texts whose content determines the index
+        options (Dict, optional): Build options that also invalidate the index (e.g. chunk size)
+        compression (str): "none", "fp16" or "int8" vector storage
+        force (bool): Rebuild even if the hash matches
+        index_type (str): "flat", "ivf", "hnsw" or "ivfpq"
+        index_params (Dict, optional): Index sizing overrides, e.g. {"nlist": 1024} (see ann_index.index_description)
+
+    Returns:
+        Path: The live version directory
+    """
+    hash_ = source_hash(sources, embeddings, {
+        **(options or {}), "compression": compression, "index_type": index_type, "index_params": index_params or {}
+    })
+    manifest = read_manifest(directory)
+    if not force and manifest and manifest.get("source_hash") == hash_:
+        logger.info(f"FAISS index in '{directory}' is up to date")
+        return current_version(directory)
+
+    logger.info(f"{'Rebuilding' if manifest else 'Building'} FAISS index in '{directory}'")
+    return build_index(
+        load_documents(), embeddings, directory, hash_=hash_, compression=compression,
+        index_type=index_type, index_params=index_params
+    )
+
+
+def load_index(directory: Union[str, Path], embeddings: Embeddings, mmap: bool = True) -> FAISS:
+    """
+    Open the live index version as a LangChain FAISS vector store.
+
+    With `mmap`, the vectors are memory-mapped read-only instead of read into
+    memory; processes opening the same version share them through the page cache.
+    """
+    version = current_version(directory)
+    if version is None:
+        raise FileNotFoundError(f"No FAISS index in '{directory}'; run the build first")
+    with open(version / MANIFEST_FILE, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("embedding_model") != embedding_model_of(embeddings):
+        logger.warning(
+            f"Index was built with '{manifest.get('embedding_model')}' but queries use "
+            f"'{embedding_model_of(embeddings)}'; rebuild the index."
+        )
+
+    import faiss
+    flags = 0
+    if mmap:
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+    index = faiss.read_index(str(version / INDEX_FILE), flags)
+    set_search_params(index, manifest.get("search_params") or {})
+
+    with gzip.open(version / DOCSTORE_FILE, "rt", encoding="utf-8") as f:
+        records = json.load(f)
+    ids = [str(i) for i in range(len(records))]
+    docstore = InMemoryDocstore({
+        doc_id: Document(page_content=record["page_content"], metadata=record["metadata"])
+        for doc_id, record in zip(ids, records)
+    })
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=dict(enumerate(ids))
+    )
+
+
+def empty_vectorstore(
+    embeddings: Embeddings,
+    index_type: str = "flat",
+    training_texts: Optional[List[str]] = None,
+    search_params: Optional[Dict[str, int]] = None,
+    **index_params: Any
+) -> FAISS:
+    """
+    Empty LangChain FAISS store on an ANN index, for retrievers that add
+    their own documents (e.g. ParentDocumentRetriever).
+
+    IVF types are trained on the embeddings of a sample of `training_texts`,
+    as many as their k-means needs, and fall back to flat when there are too
+    few; flat and HNSW need no training and embed none of them.
+
+    Args:
+        embeddings (Embeddings): Embedding model
+        index_type (str): "flat", "ivf", "hnsw" or "ivfpq"
+        training_texts (List[str], optional): Representative texts, e.g. the chunks about to be added
+        search_params (Dict, optional): {"nprobe": n} or {"efSearch": n}
+        **index_params: Passed to ann_index.index_description (compression, nlist, hnsw_m, ...)
+    """
+    dim = len(embeddings.embed_query("dimension probe"))
+    index = make_index(dim, index_type, num_vectors=len(training_texts or []), **index_params)
+    needed = training_size(index)
+    if needed:
+        texts = training_texts
+        if len(texts) > needed:
+            texts = random.Random(0).sample(texts, needed)
+        train_index(index, np.asarray(embeddings.embed_documents(texts), dtype=np.float32))
+    set_search_params(index, search_params or {})
+    return FAISS(embedding_function=embeddings, index=index, docstore=InMemoryDocstore(), index_to_docstore_id={})
+
+
+class LazyRetriever(BaseRetriever):
+    """
+    Retriever that opens its vector store on the first query.
+
+    `load` is called once (thread-safely) and must return a LangChain vector
+    store, e.g. `lambda: load_index(INDEX_DIR, embeddings)`.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    load: Callable[[], Any]
+    search_kwargs: Dict[str, Any] = {}
+    _store: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def vectorstore(self) -> Any:
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = self.load()
+        return self._store
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.vectorstore.similarity_search(query, **self.search_kwargs)
@@ -0,0 +1,206 @@
+"""
+Multi-query and HyDE retrieval behind a single retriever (and agent tool).
+
+A ReAct agent with a plain retriever tool answers a multi-faceted question
+with several sequential LLM -> retrieve rounds. MultiQueryFusionRetriever
+does the fan-out inside one tool call instead:
+
+1. one LLM call writes `num_queries` rewrites of the question (multi_query),
+   a hypothetical answer passage to search with (hyde), or both;
+2. all sub-queries, plus the original, are retrieved concurrently with the
+   underlying retriever's batch/abatch;
+3. the result lists are de-duplicated and fused with reciprocal-rank fusion.
+"""
+from typing import List, Dict, Any, Optional, Tuple
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.tools import BaseTool
+from langchain.tools.retriever import create_retriever_tool
+from pydantic import ConfigDict
+import heapq
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+MODES = ("multi_query", "hyde", "both")
+
+PROMPT = """You help a search engine answer the question below.
+{instructions}
+Reply with JSON only, in the form {schema}.
+
+Question: {question}"""
+
+QUERIES_INSTRUCTIONS = (
+    "Write {n} different search queries that together cover every part of the question: "
+    "split multi-part questions into their parts and rephrase with the terms a document would use."
+)
+HYDE_INSTRUCTIONS = "Write a short passage (3-5 sentences) that a document answering the question could contain."
+
+# "- ", "* ", "1. " or "1) " in front of a line of the plain-text fallback
+LIST_MARKER = re.compile(r"^\s*(?:[-*]|\d+[.)])\s*")
+
+
+def document_key(doc: Document) -> str:
+    """Identity of a retrieved document for de-duplication: its id, else source and content."""
+    if doc.id:
+        return doc.id
+    return f"{doc.metadata.get('source', '')}\0{doc.page_content}"
+
+
+def reciprocal_rank_fusion(ranked_lists: List[List[Document]], k: int = 4, rrf_k: int = 60) -> List[Document]:
+    """
+    Fuse ranked Document lists with reciprocal-rank fusion.
+
+    The first occurrence of each document is kept, with its 'rrf_score' added
+    to a copy of its metadata.
+    """
+    fused: Dict[str, Document] = {}
+    scores: Dict[str, float] = {}
+    for results in ranked_lists:
+        for rank, doc in enumerate(results, 1):
+            key = document_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            fused.setdefault(key, doc)
+
+    top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+    return [
+        Document(id=fused[key].id, page_content=fused[key].page_content, metadata={**fused[key].metadata, "rrf_score": score})
+        for key, score in top
+    ]
+
+
+def parse_generation(text: str, mode: str, num_queries: int) -> Tuple[List[str], Optional[str]]:
+    """Sub-queries and hypothetical passage from the LLM reply; tolerates code fences and plain lines."""
+    # Decode the first JSON object and ignore whatever follows it (prose, more braces)
+    data: Dict[str, Any] = {}
+    start = text.find("{")
+    if start >= 0:
+        try:
+            decoded, _ = json.JSONDecoder().raw_decode(text, start)
+            if isinstance(decoded, dict):
+                data = decoded
+        except json.JSONDecodeError:
+            pass
+
+    queries = data.get("queries", [])
+    if isinstance(queries, str):
+        queries = [queries]
+    queries = [str(q).strip() for q in queries if str(q).strip()]
+    passage = str(data.get("passage", "")).strip() or None
+    if not data:
+        # Not JSON: one query per line for multi_query, the whole reply for hyde
+        if mode == "hyde":
+            passage = text.strip() or None
+        else:
+            queries = [LIST_MARKER.sub("", line).strip() for line in text.splitlines()]
+            queries = [q for q in queries if q]
+    return queries[:num_queries], passage
+
+
+class MultiQueryFusionRetriever(BaseRetriever):
+    """
+    Retriever that expands a question with one LLM call and fuses concurrent sub-retrievals.
+
+    Example:
+        retriever = MultiQueryFusionRetriever(retriever=base, llm=ChatOpenAI(model="gpt-4o-mini"))
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    retriever: BaseRetriever
+    llm: BaseLanguageModel
+    mode: str = "multi_query"
+    num_queries: int = 3
+    k: int = 4
+    include_original: bool = True
+    rrf_k: int = 60
+    max_concurrency: int = 8
+
+    # ----------------------------------------------------------------------
+    def _prompt(self, query: str) -> str:
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown mode '{self.mode}'; use one of {MODES}")
+        instructions = []
+        schema = {}
+        if self.mode in ("multi_query", "both"):
+            instructions.append(QUERIES_INSTRUCTIONS.format(n=self.num_queries))
+            schema["queries"] = ["..."]
+        if self.mode in ("hyde", "both"):
+            instructions.append(HYDE_INSTRUCTIONS)
+            schema["passage"] = "..."
+        return PROMPT.format(instructions="\n".join(instructions), schema=json.dumps(schema), question=query)
+
+    def _sub_queries(self, query: str, reply: Any) -> List[str]:
+        if reply is None:
+            return [query]
+        text = getattr(reply, "content", reply)
+        queries, passage = parse_generation(str(text), self.mode, self.num_queries)
+        sub_queries = ([query] if self.include_original else []) + queries + ([passage] if passage else [])
+        # Keep the order but drop repeats, e.g. a rewrite identical to the question
+        sub_queries = list(dict.fromkeys(sub_queries)) or [query]
+        logger.info(f"Expanded '{query}' into {len(sub_queries)} sub-queries ({self.mode})")
+        return sub_queries
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        callbacks = run_manager.get_child()
+        prompt = self._prompt(query)
+        try:
+            reply = self.llm.invoke(prompt, config={"callbacks": callbacks})
+        except Exception as e:
+            logger.warning(f"Query expansion failed ({e}); retrieving with the question only")
+            reply = None
+        sub_queries = self._sub_queries(query, reply)
+        results = self.retriever.batch(
+            sub_queries, config={"callbacks": callbacks, "max_concurrency": self.max_concurrency}
+        )
+        return reciprocal_rank_fusion(results, k=self.k, rrf_k=self.rrf_k)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        callbacks = run_manager.get_child()
+        prompt = self._prompt(query)
+        try:
+            reply = await self.llm.ainvoke(prompt, config={"callbacks": callbacks})
+        except Exception as e:
+            logger.warning(f"Query expansion failed ({e}); retrieving with the question only")
+            reply = None
+        sub_queries = self._sub_queries(query, reply)
+        results = await self.retriever.abatch(
+            sub_queries, config={"callbacks": callbacks, "max_concurrency": self.max_concurrency}
+        )
+        return reciprocal_rank_fusion(results, k=self.k, rrf_k=self.rrf_k)
+
+
+def create_multi_query_tool(
+    retriever: BaseRetriever,
+    llm: BaseLanguageModel,
+    name: str,
+    description: str,
+    **kwargs: Any
+) -> BaseTool:
+    """
+    Agent tool over a MultiQueryFusionRetriever.
+
+    The description tells the agent to pass the whole question in one call,
+    since the tool already searches its parts in parallel.
+
+    Args:
+        retriever (BaseRetriever): Underlying retriever
+        llm (BaseLanguageModel): Model that writes the sub-queries (a small, fast one is enough)
+        name (str): Tool name
+        description (str): What the tool searches
+        **kwargs: MultiQueryFusionRetriever options (mode, num_queries, k, ...)
+    """
+    return create_retriever_tool(
+        MultiQueryFusionRetriever(retriever=retriever, llm=llm, **kwargs),
+        name=name,
+        description=(
+            f"{description} Pass the user's full question in a single call, even if it has several parts: "
+            "the tool searches the parts and rephrasings in parallel."
+        )
+    )
@@ -0,0 +1,430 @@
+"""
+Fast drop-in replacements for LangChain's RecursiveCharacterTextSplitter and
+CharacterTextSplitter, plus incremental re-chunking.
+
+The chunks are the same as LangChain's (same chunk_size / chunk_overlap /
+separator semantics), but the splitter works on (start, end) offsets into the
+original text instead of copies of it. Separator occurrences are located
+in C (str.find/str.split part lengths, or a regex compiled once and scanned
+with `pattern.finditer(text, start, end)`), pieces are merged as windows
+over lists of offsets rather than re-joined lists of strings, and each chunk
+is sliced out of the text once.
+Token-count-aware boundaries work as in LangChain, e.g.
+`FastRecursiveTextSplitter.from_tiktoken_encoder(chunk_size=256)` (needs tiktoken).
+
+rechunk() re-splits only the region of a document that changed since the
+previous split. Chunks before and after the edit are kept verbatim, so
+their content-addressed ids (Chunk.id), and any embeddings cached under
+them, survive the edit. split_file_incremental() keeps that state on disk.
+"""
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple, Union, Literal
+from itertools import accumulate
+from operator import add, sub
+from pathlib import Path
+from langchain_core.documents import Document
+from langchain_text_splitters import TextSplitter
+import copy
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+class Chunk(NamedTuple):
+    """A chunk and its position in the source text."""
+    text: str
+    start: int
+    end: int
+
+    @property
+    def id(self) -> str:
+        """Content address of the chunk text."""
+        return hashlib.sha256(self.text.encode("utf-8")).hexdigest()[:32]
+
+
+# Used per chunk in the inner loop: no argument parsing, no copy of the stripped text
+_new_chunk = tuple.__new__
+_LEADING_SPACE = re.compile(r"\s*")
+
+
+class FastRecursiveTextSplitter(TextSplitter):
+    """Offset-based RecursiveCharacterTextSplitter."""
+
+    # Pieces longer than chunk_size are split with the next separator
+    _recursive = True
+
+    def __init__(
+        self,
+        separators: Optional[List[str]] = None,
+        keep_separator: Union[bool, Literal["start", "end"]] = True,
+        is_separator_regex: bool = False,
+        **kwargs: Any
+    ):
+        super().__init__(keep_separator=keep_separator, **kwargs)
+        self._separators = separators or DEFAULT_SEPARATORS
+        self._is_separator_regex = is_separator_regex
+        self._patterns = [re.compile(s) if s and is_separator_regex else None for s in self._separators]
+
+    # ----------------------------------------------------------------------
+    def _pieces(self, text: str, start: int, end: int, index: int) -> Tuple[List[int], List[int], bool]:
+        """
+        Start and end offsets of the non-empty pieces between occurrences of
+        separator `index`, and whether consecutive pieces joined with the
+        merge separator are exactly the text between them.
+        """
+        separator = self._separators[index]
+        keep = self._keep_separator
+        if not separator:
+            starts = list(range(start, end))
+            return starts, [i + 1 for i in starts], True
+        if self._is_separator_regex:
+            starts, ends = self._regex_pieces(text, start, end, self._patterns[index])
+            if any(e <= s for s, e in zip(starts, ends)):
+                kept = [(s, e) for s, e in zip(starts, ends) if e > s]
+                starts = [s for s, _ in kept]
+                ends = [e for _, e in kept]
+            return starts, ends, bool(keep)
+
+        # Literal separator: str.split and the part lengths locate every occurrence in C
+        sep_len = len(separator)
+        part_lens = list(map(len, (text if start == 0 and end == len(text) else text[start:end]).split(separator)))
+        part_starts = list(accumulate(map(sep_len.__add__, part_lens), initial=start))
+        part_starts.pop()
+        # Only parts, not separators, can be empty: drop the pieces that consist of an empty part alone
+        if keep == "end":
+            ends = part_starts[1:]
+            ends.append(end)
+            if not part_lens[-1]:
+                part_starts.pop()
+                ends.pop()
+            return part_starts, ends, True
+        if keep:
+            starts = [p - sep_len for p in part_starts]
+            starts[0] = start
+            if not part_lens[0]:
+                del starts[0]
+                if not starts:
+                    return [], [], True
+            ends = starts[1:]
+            ends.append(end)
+            return starts, ends, True
+        ends = list(map(add, part_starts, part_lens))
+        if 0 in part_lens:
+            # Repeated separators: the pieces around them are joined with a single one
+            kept = [(s, e) for s, e, n in zip(part_starts, ends, part_lens) if n]
+            return [s for s, _ in kept], [e for _, e in kept], False
+        return part_starts, ends, True
+
+    def _regex_pieces(self, text: str, start: int, end: int, pattern: "re.Pattern") -> Tuple[List[int], List[int]]:
+        if self._keep_separator == "end":
+            ends = [m.end() for m in pattern.finditer(text, start, end)] + [end]
+            return [start] + ends[:-1], ends
+        if self._keep_separator:
+            starts = [start] + [m.start() for m in pattern.finditer(text, start, end)]
+            return starts, starts[1:] + [end]
+        matches = [m.span() for m in pattern.finditer(text, start, end)]
+        return [start] + [e for _, e in matches], [s for s, _ in matches] + [end]
+
+    def _occurs(self, text: str, start: int, end: int, index: int) -> bool:
+        separator = self._separators[index]
+        if not separator:
+            return True
+        if self._is_separator_regex:
+            return self._patterns[index].search(text, start, end) is not None
+        return text.find(separator, start, end) != -1
+
+    def _join(
+        self,
+        text: str,
+        starts: List[int],
+        ends: List[int],
+        first: int,
+        last: int,
+        separator: str,
+        contiguous: bool
+    ) -> Optional[Chunk]:
+        """Chunk of pieces first..last-1, sliced straight from the text when they are contiguous."""
+        start, end = starts[first], ends[last - 1]
+        joined = text[start:end] if contiguous else separator.join([text[starts[i]:ends[i]] for i in range(first, last)])
+        if self._strip_whitespace:
+            stripped = joined.strip()
+            if len(stripped) != len(joined):
+                start += _LEADING_SPACE.match(joined).end()
+                end = start + len(stripped)
+                joined = stripped
+        return _new_chunk(Chunk, (joined, start, end)) if joined else None
+
+    def _merge(
+        self,
+        text: str,
+        starts: List[int],
+        ends: List[int],
+        lengths: List[int],
+        lo: int,
+        hi: int,
+        separator: str,
+        contiguous: bool
+    ) -> List[Chunk]:
+        """
+        LangChain's _merge_splits over pieces lo..hi-1. The current chunk is
+        always a run of consecutive pieces, so it is kept as a window
+        (first..i) instead of a list of strings.
+        """
+        size = self._chunk_size
+        overlap = self._chunk_overlap
+        separator_len = self._length_function(separator)
+        chunks = []
+        first = lo
+        total = 0
+        for i in range(lo, hi):
+            length = lengths[i]
+            if total + length + (separator_len if i > first else 0) > size:
+                if total > size:
+                    logger.warning(f"Created a chunk of size {total}, which is longer than the specified {size}")
+                if i > first:
+                    chunk = self._join(text, starts, ends, first, i, separator, contiguous)
+                    if chunk is not None:
+                        chunks.append(chunk)
+                    while total > overlap or (total + length + (separator_len if i > first else 0) > size and total > 0):
+                        total -= lengths[first] + (separator_len if i - first > 1 else 0)
+                        first += 1
+            total += length + (separator_len if i > first else 0)
+        if hi > first:
+            chunk = self._join(text, starts, ends, first, hi, separator, contiguous)
+            if chunk is not None:
+                chunks.append(chunk)
+        return chunks
+
+    def _split_range(self, text: str, start: int, end: int, level: int) -> List[Chunk]:
+        # First separator (from `level` on) that occurs in the range
+        index = len(self._separators) - 1
+        for i in range(level, len(self._separators)):
+            if self._occurs(text, start, end, i):
+                index = i
+                break
+        has_finer = self._recursive and index + 1 < len(self._separators) and self._separators[index] != ""
+        separator = "" if self._keep_separator else self._separators[index]
+
+        starts, ends, contiguous = self._pieces(text, start, end, index)
+        if self._length_function is len:
+            # Plain character counts need no slicing at all
+            lengths = list(map(sub, ends, starts))
+        else:
+            lengths = [self._length_function(text[s:e]) for s, e in zip(starts, ends)]
+        if not self._recursive or not lengths or max(lengths) < self._chunk_size:
+            return self._merge(text, starts, ends, lengths, 0, len(starts), separator, contiguous)
+
+        # Pieces that fit are merged; the others are split with the next separator
+        chunks = []
+        lo = 0
+        for i in [i for i, length in enumerate(lengths) if length >= self._chunk_size]:
+            if i > lo:
+                chunks.extend(self._merge(text, starts, ends, lengths, lo, i, separator, contiguous))
+            if has_finer:
+                chunks.extend(self._split_range(text, starts[i], ends[i], index + 1))
+            else:
+                chunks.append(Chunk(text[starts[i]:ends[i]], starts[i], ends[i]))
+            lo = i + 1
+        if len(starts) > lo:
+            chunks.extend(self._merge(text, starts, ends, lengths, lo, len(starts), separator, contiguous))
+        return chunks
+
+    # ----------------------------------------------------------------------
+    def split_chunks(self, text: str, start: int = 0, end: Optional[int] = None) -> List[Chunk]:
+        """Split `text[start:end]` into Chunks whose offsets refer to `text`."""
+        return self._split_range(text, start, len(text) if end is None else end, 0)
+
+    def split_text(self, text: str) -> List[str]:
+        return [chunk.text for chunk in self.split_chunks(text)]
+
+    def create_documents(self, texts: List[str], metadatas: Optional[List[Dict[Any, Any]]] = None) -> List[Document]:
+        """As in LangChain, with `start_index` taken from the chunk offsets rather than searched for."""
+        metadatas = metadatas or [{}] * len(texts)
+        documents = []
+        for text, metadata in zip(texts, metadatas):
+            for chunk in self.split_chunks(text):
+                chunk_metadata = copy.deepcopy(metadata)
+                if self._add_start_index:
+                    chunk_metadata["start_index"] = chunk.start
+                documents.append(Document(page_content=chunk.text, metadata=chunk_metadata))
+        return documents
+
+    # ----------------------------------------------------------------------
+    def rechunk(self, old_text: str, old_chunks: List[Chunk], new_text: str) -> List[Chunk]:
+        """
+        Chunks for `new_text`, re-splitting only the region that differs from `old_text`.
+
+        Old chunks that lie entirely in the unchanged prefix or suffix are kept
+        (suffix offsets shifted), except the one next to the edit on each side,
+        which is re-split with the edited region so no chunk ends mid-word at
+        the seam. The seams carry no overlap, so the result can differ slightly
+        from a full split but respects the same chunk size.
+
+        Args:
+            old_text (str): Text the old chunks were split from
+            old_chunks (List[Chunk]): Result of split_chunks or rechunk on `old_text`
+            new_text (str): Edited text
+        """
+        if not old_chunks or old_text == new_text:
+            return list(old_chunks) if old_text == new_text else self.split_chunks(new_text)
+
+        prefix = _common_prefix(old_text, new_text)
+        suffix = _common_suffix(old_text, new_text, min(len(old_text), len(new_text)) - prefix)
+        shift = len(new_text) - len(old_text)
+
+        head = 0
+        while head < len(old_chunks) and old_chunks[head].end <= prefix:
+            head += 1
+        tail = len(old_chunks)
+        while tail > head and old_chunks[tail - 1].start >= len(old_text) - suffix:
+            tail -= 1
+        # Re-split the chunks adjacent to the edit too
+        head = max(head - 1, 0)
+        tail = min(tail + 1, len(old_chunks))
+
+        gap_start = old_chunks[head - 1].end if head else 0
+        gap_end = old_chunks[tail].start + shift if tail < len(old_chunks) else len(new_text)
+        middle = self.split_chunks(new_text, gap_start, gap_end) if gap_end > gap_start else []
+        shifted = [Chunk(c.text, c.start + shift, c.end + shift) for c in old_chunks[tail:]]
+        logger.debug(f"Re-chunked {gap_end - gap_start} of {len(new_text)} characters; kept {head + len(shifted)} chunks")
+        return old_chunks[:head] + middle + shifted
+
+
+class FastCharacterTextSplitter(FastRecursiveTextSplitter):
+    """Offset-based CharacterTextSplitter: one separator, no recursion."""
+
+    _recursive = False
+
+    def __init__(
+        self,
+        separator: str = "\n\n",
+        is_separator_regex: bool = False,
+        keep_separator: Union[bool, Literal["start", "end"]] = False,
+        **kwargs: Any
+    ):
+        super().__init__(
+            separators=[separator], keep_separator=keep_separator, is_separator_regex=is_separator_regex, **kwargs
+        )
+
+
+# ----------------------------------------------------------------------
+def _common_prefix(a: str, b: str, block: int = 4096) -> int:
+    """Length of the common prefix, compared block-wise in C before narrowing down."""
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i:i + block] == b[i:i + block]:
+        i += block
+    i = min(i, n)
+    limit = min(i + block, n)
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _common_suffix(a: str, b: str, max_len: int, block: int = 4096) -> int:
+    """Length of the common suffix, at most `max_len`."""
+    i = 0
+    while i < max_len and a[len(a) - min(i + block, max_len):len(a) - i] == b[len(b) - min(i + block, max_len):len(b) - i]:
+        i += block
+    i = min(i, max_len)
+    limit = min(i + block, max_len)
+    while i < limit and a[len(a) - i - 1] == b[len(b) - i - 1]:
+        i += 1
+    return i
+
+
+def chunk_changes(old_chunks: List[Chunk], new_chunks: List[Chunk]) -> Tuple[List[Chunk], List[str]]:
+    """
+    What to update in a vector store keyed by Chunk.id.
+
+    Returns:
+        Tuple[List[Chunk], List[str]]: New chunks to add, ids of old chunks to delete
+    """
+    old_ids = {c.id for c in old_chunks}
+    new_ids = {c.id for c in new_chunks}
+    added = [c for c in new_chunks if c.id not in old_ids]
+    return added, sorted(old_ids - new_ids)
+
+
+def _function_id(fn: Any) -> str:
+    """
+    Stable identifier of a length function: its qualified name, plus the
+    values it closes over that name a tokenizer (e.g. the tiktoken encoding
+    of from_tiktoken_encoder, or a Hugging Face tokenizer's name_or_path).
+    """
+    if isinstance(fn, functools.partial):
+        return f"partial({_function_id(fn.func)}, {fn.args!r}, {sorted(fn.keywords.items())!r})"
+    parts = [getattr(fn, "__module__", None) or type(fn).__module__,
+             getattr(fn, "__qualname__", None) or type(fn).__qualname__]
+    for cell in getattr(fn, "__closure__", None) or ():
+        try:
+            value = cell.cell_contents
+        except ValueError:
+            continue
+        if isinstance(value, (str, int, float, bool)):
+            parts.append(repr(value))
+        else:
+            name = getattr(value, "name", None) or getattr(value, "name_or_path", None)
+            if isinstance(name, str):
+                parts.append(name)
+    return ":".join(parts)
+
+
+def _settings(splitter: FastRecursiveTextSplitter) -> List[Any]:
+    """Everything that decides where a splitter cuts, for the saved-state check."""
+    return [
+        f"{type(splitter).__module__}.{type(splitter).__qualname__}",
+        splitter._chunk_size,
+        splitter._chunk_overlap,
+        splitter._separators,
+        splitter._is_separator_regex,
+        str(splitter._keep_separator),
+        splitter._strip_whitespace,
+        _function_id(splitter._length_function),
+    ]
+
+
+def split_file_incremental(
+    text: str,
+    splitter: FastRecursiveTextSplitter,
+    state_path: Union[str, Path]
+) -> List[Chunk]:
+    """
+    Split `text`, re-splitting only what changed since the last call with the same state file.
+
+    The state (previous text and chunk offsets) is stored gzipped at
+    `state_path`; it is ignored when the splitter settings changed, including
+    its class and length function.
+    """
+    state_path = Path(state_path)
+    settings = _settings(splitter)
+
+    previous = None
+    if state_path.exists():
+        with gzip.open(state_path, "rt", encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous.get("settings") != settings:
+            previous = None
+
+    if previous is None:
+        chunks = splitter.split_chunks(text)
+    else:
+        old_text = previous["text"]
+        old_chunks = [Chunk(row[2] if len(row) > 2 else old_text[row[0]:row[1]], row[0], row[1]) for row in previous["chunks"]]
+        chunks = splitter.rechunk(old_text, old_chunks, text)
+
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = state_path.with_name(state_path.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        # Chunk texts are slices of the text, except where a separator was re-inserted
+        rows = [[c.start, c.end] if text[c.start:c.end] == c.text else [c.start, c.end, c.text] for c in chunks]
+        json.dump({"settings": settings, "text": text, "chunks": rows}, f)
+    os.replace(tmp, state_path)
+    return chunks
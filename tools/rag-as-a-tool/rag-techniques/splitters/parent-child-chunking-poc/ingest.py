@@ -0,0 +1,91 @@
+"""
+Resumable ingestion for a ParentDocumentRetriever.
+
+ParentDocumentRetriever.add_documents() gives every parent a random id, so
+running it again duplicates everything. ingest_documents() instead derives
+parent ids from their content and child ids from the parent id, splits and
+embeds each child exactly once, and stores each batch's parents only after
+its children are in the vector store (and `checkpoint` has saved it). An
+interrupted run therefore resumes where it stopped: parents already in the
+docstore are skipped, and children already in the vector store are not
+embedded again.
+"""
+from typing import List, Dict, Optional, Callable
+from langchain_core.documents import Document
+from langchain_core.stores import BaseStore
+from langchain_core.vectorstores import VectorStore
+from langchain_text_splitters import TextSplitter
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parent_id(doc: Document) -> str:
+    """Content address of a parent document (source and text)."""
+    h = hashlib.sha256(str(doc.metadata.get("source", "")).encode("utf-8") + b"\0" + doc.page_content.encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+def ingest_documents(
+    documents: List[Document],
+    vectorstore: VectorStore,
+    docstore: BaseStore[str, Document],
+    child_splitter: TextSplitter,
+    parent_splitter: Optional[TextSplitter] = None,
+    id_key: str = "doc_id",
+    batch_size: int = 64,
+    checkpoint: Optional[Callable[[], None]] = None
+) -> Dict[str, int]:
+    """
+    Add documents to a parent docstore and child vector store, skipping what is already there.
+
+    Args:
+        documents (List[Document]): Source documents
+        vectorstore (VectorStore): Child chunk index (the retriever's vectorstore)
+        docstore (BaseStore): Parent store (the retriever's docstore)
+        child_splitter (TextSplitter): Splits parents into indexed children
+        parent_splitter (TextSplitter, optional): Splits documents into parents; whole documents otherwise
+        id_key (str): Child metadata key holding the parent id, as in ParentDocumentRetriever
+        batch_size (int): Parents per batch
+        checkpoint (Callable, optional): Persists the vector store, called before each batch's parents are stored
+
+    Returns:
+        Dict[str, int]: Counts of parents, skipped parents and added children
+    """
+    parents = parent_splitter.split_documents(documents) if parent_splitter else documents
+    stored = set(docstore.yield_keys())
+    # FAISS and most LangChain stores keep their ids here; others re-add children on resume
+    indexed = set(getattr(vectorstore, "index_to_docstore_id", {}).values())
+
+    pending: Dict[str, Document] = {}
+    for parent in parents:
+        key = parent_id(parent)
+        if key not in stored:
+            pending.setdefault(key, parent)
+
+    added = 0
+    items = list(pending.items())
+    for offset in range(0, len(items), batch_size):
+        batch = items[offset:offset + batch_size]
+        children = []
+        child_ids = []
+        for key, parent in batch:
+            for n, child in enumerate(child_splitter.split_documents([parent])):
+                child_key = f"{key}-{n}"
+                if child_key not in indexed:
+                    child.metadata[id_key] = key
+                    children.append(child)
+                    child_ids.append(child_key)
+        if children:
+            vectorstore.add_documents(children, ids=child_ids)
+            added += len(children)
+        if checkpoint:
+            checkpoint()
+        docstore.mset(batch)
+        logger.info(f"Ingested {min(offset + batch_size, len(items))}/{len(items)} parents ({added} children)")
+
+    skipped = len(parents) - len(pending)
+    if skipped:
+        logger.info(f"Skipped {skipped} parents already in the docstore")
+    return {"parents": len(parents), "skipped": skipped, "children": added}
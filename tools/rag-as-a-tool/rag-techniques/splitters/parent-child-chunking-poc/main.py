@@ -1,9 +1,25 @@
 from langchain.retrievers import ParentDocumentRetriever
-from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.storage import InMemoryStore
+from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / "databases" / "vector-store" / "faiss-index-poc"))
+from faiss_index import empty_vectorstore, index_type_from_env
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / "databases" / "docstore" / "mmap-docstore-poc"))
+from mmap_docstore import MmapDocStore
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "fast-splitter-poc"))
+from fast_splitter import FastRecursiveTextSplitter
+
+from ingest import ingest_documents
+
+BASE_DIR = Path(__file__).resolve().parent
+CHILD_INDEX_DIR = BASE_DIR / "child_index"
+PARENT_STORE_PATH = BASE_DIR / "parent_docstore.log"
+INDEX_TYPE = index_type_from_env()
 
 # 1. Define sample parent documents
 docs = [
@@ -13,20 +29,36 @@ docs = [
 ]
 
 # 2. Setup parent and child splitters
-parent_splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=30)
-child_splitter = RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=20)
+parent_splitter = FastRecursiveTextSplitter(chunk_size=300, chunk_overlap=30)
+child_splitter = FastRecursiveTextSplitter(chunk_size=100, chunk_overlap=20)
 
 # 3. Setup HuggingFace embeddings
 embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
 
-# 4. Split documents into child chunks
-child_docs = child_splitter.split_documents(docs)
+# 4. Open the saved child index, or create an empty one; IVF indexes are trained on the child chunks
+if (CHILD_INDEX_DIR / "index.faiss").exists():
+    # Our own file, written by save_local below
+    vectorstore = FAISS.load_local(str(CHILD_INDEX_DIR), embeddings, allow_dangerous_deserialization=True)
+else:
+    training_texts = None
+    if INDEX_TYPE in ("ivf", "ivfpq"):
+        training_texts = [doc.page_content for doc in child_splitter.split_documents(parent_splitter.split_documents(docs))]
+    vectorstore = empty_vectorstore(embeddings, INDEX_TYPE, training_texts=training_texts)
 
-# 5. Create FAISS vectorstore from child docs and embeddings
-vectorstore = FAISS.from_documents(documents=child_docs, embedding=embeddings)
+# 5. Open the disk-backed parent docstore, shared by every process on this machine
+docstore = MmapDocStore(str(PARENT_STORE_PATH))
 
-# 6. Create an in-memory docstore for the parent docs
-docstore = InMemoryStore()
+# 6. Add only the parents not ingested yet; each child is split and embedded once,
+#    and an interrupted run resumes from the last saved batch
+stats = ingest_documents(
+    docs,
+    vectorstore,
+    docstore,
+    child_splitter=child_splitter,
+    parent_splitter=parent_splitter,
+    checkpoint=lambda: vectorstore.save_local(str(CHILD_INDEX_DIR))
+)
+print(f"Ingestion: {stats}")
 
 # 7. Create ParentDocumentRetriever with vectorstore, docstore, and splitters
 retriever = ParentDocumentRetriever(
@@ -36,13 +68,10 @@ retriever = ParentDocumentRetriever(
     parent_splitter=parent_splitter,
 )
 
-# 8. Add the original parent documents to the retriever (indexes them internally)
-retriever.add_documents(docs)
-
-# 9. Query the retriever using the updated `invoke()` method
+# 8. Query the retriever using the updated `invoke()` method
 query = "What is LangChain?"
 results = retriever.invoke(query)
 
-# 10. Print the results
+# 9. Print the results
 for i, doc in enumerate(results, 1):
     print(f"\n[Result {i}]\n{doc.page_content}")
@@ -0,0 +1,104 @@
+from typing import Dict, Optional, AsyncIterator
+from contextlib import asynccontextmanager
+import asyncio
+import time
+
+
+class Overloaded(Exception):
+    """Raised when a request is rejected by admission control."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounds the work one server process takes on.
+
+    At most `max_in_flight` requests run at once; up to `max_queue` more wait
+    for a slot, each for at most `queue_timeout` seconds. Anything beyond that
+    is rejected immediately with Overloaded, so the client can back off or
+    try another worker instead of piling up latency.
+
+    Usage:
+        async with controller.slot():
+            ...
+    """
+
+    def __init__(self, max_in_flight: int = 32, max_queue: int = 64, queue_timeout: float = 10.0):
+        """
+        Args:
+            max_in_flight (int): Requests processed concurrently
+            max_queue (int): Requests allowed to wait for a slot
+            queue_timeout (float): Seconds a queued request waits before it is rejected
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Running average of request seconds, used for the Retry-After hint
+        self._seconds_per_request = 1.0
+
+    def _retry_after(self) -> float:
+        backlog = self.queued + self.in_flight
+        return max(1.0, self._seconds_per_request * backlog / self.max_in_flight)
+
+    async def acquire(self) -> float:
+        """
+        Wait for a slot.
+
+        Returns:
+            float: perf_counter timestamp of admission, to pass to release()
+
+        Raises:
+            Overloaded: If the queue is full or the wait times out
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        if self._semaphore.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"Server busy: {self.in_flight} in flight, {self.queued} queued", self._retry_after())
+
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded(f"Timed out after {self.queue_timeout:.0f}s in the queue", self._retry_after())
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        return time.perf_counter()
+
+    def release(self, admitted_at: float) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+        elapsed = time.perf_counter() - admitted_at
+        self._seconds_per_request = 0.9 * self._seconds_per_request + 0.1 * elapsed
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        admitted_at = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(admitted_at)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+        }
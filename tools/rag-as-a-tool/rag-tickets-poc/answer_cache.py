@@ -0,0 +1,208 @@
+from typing import List, Dict, Optional, Set, Tuple
+import logging
+import sqlite3
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """
+    Persistent cache of generated answers, looked up by query-embedding similarity.
+
+    An entry is only reused when the support type and the set of retrieved ticket
+    ids match exactly and the cosine similarity between the new and the cached
+    query embedding is at least `threshold`. Entries expire after `ttl` seconds
+    and the least recently used ones are evicted beyond `max_entries`.
+
+    Several processes (e.g. server workers) can share one file: a lookup that
+    finds nothing in memory first loads the rows other processes have added,
+    and entries they have since removed count as misses.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        threshold: float = 0.95,
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 10000
+    ):
+        """
+        Args:
+            path (str): SQLite file backing the cache
+            threshold (float): Minimum cosine similarity for a hit
+            ttl (float): Seconds an answer stays valid
+            max_entries (int): Maximum number of cached answers
+        """
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " cache_key TEXT NOT NULL,"
+            " query TEXT NOT NULL,"
+            " embedding BLOB NOT NULL,"
+            " answer TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_key ON answers(cache_key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_access ON answers(last_access)")
+
+        # cache_key -> [(row id, normalized embedding, created)], mirrored in memory for fast lookups
+        self._vectors: Dict[str, List[Tuple[int, np.ndarray, float]]] = {}
+        self._ids: Set[int] = set()
+        # Highest row id loaded; AUTOINCREMENT ids only grow, across processes too
+        self._last_id = 0
+        self._sync()
+
+    def _sync(self) -> bool:
+        """Load rows added since the last sync, by this or another process (lock must be held)."""
+        added = False
+        for row_id, key, blob, created in self._conn.execute(
+            "SELECT id, cache_key, embedding, created FROM answers WHERE id > ? ORDER BY id", (self._last_id,)
+        ):
+            self._last_id = row_id
+            if row_id not in self._ids:
+                self._ids.add(row_id)
+                self._vectors.setdefault(key, []).append((row_id, np.frombuffer(blob, dtype=np.float32), created))
+                added = True
+        # The table never holds more than max_entries rows, so any excess here was removed by another process
+        if len(self._ids) > self.max_entries:
+            live = {row_id for row_id, in self._conn.execute("SELECT id FROM answers")}
+            self._forget(list(self._ids - live))
+        return added
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def make_key(support_type: Optional[str], ticket_ids: List[str]) -> str:
+        """Cache partition for a support type and a set of retrieved tickets."""
+        return f"{support_type or '*'}|{','.join(sorted(str(t) for t in ticket_ids))}"
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    # ----------------------------------------------------------------------
+    def lookup(
+        self,
+        query_emb: List[float],
+        support_type: Optional[str],
+        ticket_ids: List[str]
+    ) -> Optional[str]:
+        """Return a cached answer for a semantically equivalent query, if any."""
+        key = self.make_key(support_type, ticket_ids)
+        vector = self._normalize(query_emb)
+        now = time.time()
+
+        with self._lock:
+            best_id, best_score = self._best_match(key, vector, now)
+            if best_id is None and self._sync():
+                best_id, best_score = self._best_match(key, vector, now)
+
+            row = None
+            if best_id is not None:
+                self._conn.execute("UPDATE answers SET last_access = ? WHERE id = ?", (now, best_id))
+                row = self._conn.execute("SELECT answer FROM answers WHERE id = ?", (best_id,)).fetchone()
+                if row is None:
+                    # Evicted or expired by another process sharing the file
+                    self._forget([best_id])
+
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        logger.info(f"Semantic cache hit (similarity {best_score:.3f}, hit rate {self.hit_rate():.1%})")
+        return row[0]
+
+    def _best_match(self, key: str, vector: np.ndarray, now: float) -> Tuple[Optional[int], float]:
+        """Most similar live entry above the threshold, dropping expired ones (lock must be held)."""
+        best_id, best_score = None, self.threshold
+        expired = []
+        for row_id, cached_vector, created in self._vectors.get(key, []):
+            if now - created > self.ttl:
+                expired.append(row_id)
+                continue
+            score = float(np.dot(vector, cached_vector))
+            if score >= best_score:
+                best_id, best_score = row_id, score
+        if expired:
+            self._delete(expired)
+        return best_id, best_score
+
+    def store(
+        self,
+        query: str,
+        query_emb: List[float],
+        support_type: Optional[str],
+        ticket_ids: List[str],
+        answer: str
+    ) -> None:
+        """Cache a generated answer."""
+        key = self.make_key(support_type, ticket_ids)
+        vector = self._normalize(query_emb)
+        now = time.time()
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO answers (cache_key, query, embedding, answer, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, query, vector.tobytes(), answer, now, now)
+            )
+            self._vectors.setdefault(key, []).append((cursor.lastrowid, vector, now))
+            self._ids.add(cursor.lastrowid)
+
+            overflow = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                victims = [row[0] for row in self._conn.execute(
+                    "SELECT id FROM answers ORDER BY last_access LIMIT ?", (overflow,)
+                )]
+                self._delete(victims)
+
+    def _delete(self, row_ids: List[int]) -> None:
+        """Remove rows from SQLite and the in-memory mirror (lock must be held)."""
+        self._conn.executemany("DELETE FROM answers WHERE id = ?", [(row_id,) for row_id in row_ids])
+        self._forget(row_ids)
+
+    def _forget(self, row_ids: List[int]) -> None:
+        """Drop rows from the in-memory mirror only (lock must be held)."""
+        doomed = set(row_ids)
+        self._ids -= doomed
+        for key in list(self._vectors):
+            kept = [entry for entry in self._vectors[key] if entry[0] not in doomed]
+            if kept:
+                self._vectors[key] = kept
+            else:
+                del self._vectors[key]
+
+    # ----------------------------------------------------------------------
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "entries": sum(len(entries) for entries in self._vectors.values()),
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._vectors.clear()
+            self._ids.clear()
@@ -1,14 +1,20 @@
 import asyncio
 import logging
+import os
 import sys
+import threading
+import time
 from pathlib import Path
 from typing import Optional
 
 import streamlit as st
 
 from src.document_loader import SupportDocumentLoader
+from src.answer_cache import SemanticAnswerCache
 from src.rag_chain import SupportRAGChain
-from src.vector_store import SupportVectorStore
+from src.reranker import CrossEncoderReranker
+from src.tracing import configure_tracing
+from src.vector_store import SupportVectorStore, get_shared_store, set_shared_store
 
 # Configure logging
 logging.basicConfig(
@@ -25,6 +31,53 @@ DATA_PATH = "data"
 status_placeholder = st.empty()
 progress_bar = st.progress(0)
 
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return a process-wide event loop running in a background thread.
+    
+    Reusing one loop avoids creating (and tearing down) a new loop with
+    asyncio.run on every search, and keeps the OpenAI async clients alive.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="rag-event-loop", daemon=True).start()
+    return loop
+
+@st.cache_resource
+def get_answer_cache() -> SemanticAnswerCache:
+    """Process-wide answer cache, so its embeddings are loaded once rather than per session."""
+    return SemanticAnswerCache(os.path.join(VECTOR_STORE_DIR, "answer_cache.sqlite3"))
+
+@st.cache_resource
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """Cross-encoder reranker shared by all sessions, enabled by setting RERANKER_MODEL."""
+    model_name = os.getenv("RERANKER_MODEL")
+    return CrossEncoderReranker(model_name) if model_name else None
+
+@st.cache_resource
+def setup_tracing() -> bool:
+    """Configure trace export once per process, from TRACE_FILE / OTEL_EXPORTER_OTLP_ENDPOINT."""
+    configure_tracing()
+    return True
+
+def run_async(coro):
+    """Run a coroutine on the shared event loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+def iter_async(async_iterable):
+    """
+    Iterate an async iterator from the Streamlit script thread.
+    
+    Each step runs on the shared event loop, while the caller stays in the
+    script thread so it can keep updating Streamlit elements.
+    """
+    iterator = async_iterable.__aiter__()
+    while True:
+        try:
+            yield run_async(iterator.__anext__())
+        except StopAsyncIteration:
+            return
+
 def log_error(e: Exception) -> str:
     """
     Log an error and return formatted error message.
@@ -84,6 +137,7 @@ def create_new_vector_store() -> Optional[SupportVectorStore]:
         progress_bar.progress(100)
         
         status_placeholder.success("✅ Vector store created and saved successfully!")
+        set_shared_store(VECTOR_STORE_DIR, vector_store)
         return vector_store
         
     except Exception as e:
@@ -92,21 +146,21 @@ def create_new_vector_store() -> Optional[SupportVectorStore]:
 
 def load_existing_vector_store() -> Optional[SupportVectorStore]:
     """
-    Load an existing vector store from disk.
+    Load the process-wide vector store from its manifest.
     
     Returns:
-        Optional[SupportVectorStore]: Loaded vector store instance or None if loading fails
+        Optional[SupportVectorStore]: Loaded vector store instance or None if none was built yet
+    
+    Raises:
+        Exception: If an existing store cannot be loaded
     """
-    try:
-        status_placeholder.info("🔄 Loading existing vector store...")
-        progress_bar.progress(30)
-        vector_store = SupportVectorStore.load_local(VECTOR_STORE_DIR)
-        progress_bar.progress(100)
+    status_placeholder.info("🔄 Loading existing vector store...")
+    progress_bar.progress(30)
+    vector_store = get_shared_store(VECTOR_STORE_DIR)
+    progress_bar.progress(100)
+    if vector_store:
         status_placeholder.success("✅ Vector store loaded successfully!")
-        return vector_store
-    except Exception as e:
-        status_placeholder.error(log_error(e))
-        return None
+    return vector_store
 
 def initialize_rag_system() -> Optional[SupportRAGChain]:
     """
@@ -116,7 +170,10 @@ def initialize_rag_system() -> Optional[SupportRAGChain]:
         Optional[SupportRAGChain]: Initialized RAG chain or None if initialization fails
     """
     try:
-        # Try to load existing vector store, create new one if loading fails
+        start = time.perf_counter()
+        
+        # Load the existing vector store; only build one if none exists yet.
+        # A store that exists but fails to load is reported, not rebuilt.
         vector_store = load_existing_vector_store()
         if not vector_store:
             vector_store = create_new_vector_store()
@@ -125,8 +182,10 @@ def initialize_rag_system() -> Optional[SupportRAGChain]:
         
         # Initialize RAG chain
         status_placeholder.info("🤖 Initializing RAG chain...")
-        rag_chain = SupportRAGChain(vector_store)
+        rag_chain = SupportRAGChain(vector_store, answer_cache=get_answer_cache(), reranker=get_reranker())
         
+        st.session_state.startup_seconds = time.perf_counter() - start
+        logger.info(f"RAG system ready in {st.session_state.startup_seconds * 1000:.0f} ms")
         status_placeholder.empty()
         return rag_chain
         
@@ -150,42 +209,84 @@ def display_system_status():
         return False
     return True
 
+def render_tickets(relevant_docs):
+    """
+    Render the retrieved support tickets.
+    
+    Args:
+        relevant_docs (List[Dict]): Documents returned by the RAG chain
+    """
+    st.subheader("Relevant Support Tickets")
+    for i, doc in enumerate(relevant_docs, 1):
+        with st.expander(
+            f"{i}. Ticket {doc['metadata']['ticket_id']} - {doc['metadata'].get('product', 'Unknown')}"
+        ):
+            st.write(f"**Tags:** {', '.join(doc['metadata'].get('tags', []))}")
+            st.write(f"**Content:** {doc['content']}")
+            st.write(f"**Similarity Score:** {doc['similarity']:.2f}")
+
+def stream_search_results(query: str, rag_chain: SupportRAGChain):
+    """
+    Consume the streaming RAG response, rendering tokens as they arrive.
+    
+    Args:
+        query (str): User's search query
+        rag_chain (SupportRAGChain): RAG chain instance
+    """
+    st.subheader("AI Response")
+    response_placeholder = st.empty()
+    response_placeholder.info("🔍 Searching for relevant tickets...")
+    tickets_container = st.container()
+    
+    answer = ""
+    for event in iter_async(rag_chain.astream_query(query)):
+        if event["event"] == "sources":
+            response_placeholder.info("🤖 Generating AI response...")
+            with tickets_container:
+                render_tickets(event["data"])
+        elif event["event"] == "token":
+            answer += event["data"]
+            response_placeholder.markdown(answer + "▌")
+        elif event["event"] == "end":
+            response_placeholder.markdown(event["data"])
+
 def render_search_results(query: str, rag_chain: SupportRAGChain):
     """
     Render search results and AI response for a query.
     
+    Tickets are shown as soon as they are retrieved and the answer is
+    rendered token by token while it is generated.
+    
     Args:
         query (str): User's search query
         rag_chain (SupportRAGChain): RAG chain instance
     """
     try:
-        # Show spinner for document retrieval
-        with st.spinner("🔍 Searching for relevant tickets..."):
-            relevant_docs = rag_chain.get_relevant_documents(query)
-        
-        # Show spinner for AI response generation
-        with st.spinner("🤖 Generating AI response..."):
-            response = asyncio.run(rag_chain.query(query))
-        
-        # Display AI response
-        st.subheader("AI Response")
-        st.write(response)
-        
-        # Display relevant tickets
-        st.subheader("Relevant Support Tickets")
-        for i, doc in enumerate(relevant_docs, 1):
-            with st.expander(
-                f"{i}. Ticket {doc['metadata']['ticket_id']} - {doc['metadata'].get('product', 'Unknown')}"
-            ):
-                st.write(f"**Tags:** {', '.join(doc['metadata'].get('tags', []))}")
-                st.write(f"**Content:** {doc['content']}")
-                st.write(f"**Similarity Score:** {doc['similarity']:.2f}")
-                
+        stream_search_results(query, rag_chain)
     except Exception as e:
         st.error(f"Error processing query: {str(e)}")
 
+def render_debug_panel(rag_chain: SupportRAGChain):
+    """
+    Show the per-stage timing breakdown of the last request.
+    
+    Args:
+        rag_chain (SupportRAGChain): RAG chain instance
+    """
+    trace = rag_chain.last_trace
+    if trace is None:
+        return
+    with st.expander(f"🛠️ Debug: last request took {trace.duration * 1000:.0f} ms"):
+        st.dataframe(trace.breakdown(), use_container_width=True, hide_index=True)
+        if rag_chain.answer_cache is not None:
+            st.caption(f"Answer cache: {rag_chain.answer_cache.stats()}")
+        if rag_chain.reranker is not None:
+            st.caption(f"Reranker: {rag_chain.reranker.stats()}")
+
 def main():
     """Main application function."""
+    setup_tracing()
+
     # Clear progress indicators
     progress_bar.empty()
     
@@ -203,6 +304,7 @@ def main():
     # Check system status
     if not display_system_status():
         return
+    st.caption(f"Ready in {st.session_state.startup_seconds * 1000:.0f} ms")
     
     # Product filter (optional)
     # products = ["All Products", "Product A", "Product B", "Product C"]
@@ -218,6 +320,8 @@ def main():
     if st.button("Search") and query:
         # product = None if selected_product == "All Products" else selected_product
         render_search_results(query, st.session_state.rag_chain)
+    
+    render_debug_panel(st.session_state.rag_chain)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+Concurrency benchmark for SupportRAGChain retrieval, fully offline.
+
+Compares the old blocking path (synchronous retrieval inside the coroutine)
+with the async retrieval path, using StubEmbeddings and a stub LLM with
+fixed latencies. Run from the directory containing the package:
+
+    python -m src.benchmark_async
+"""
+from typing import List, Dict, Any, AsyncIterator
+from langchain.schema import Document
+from langchain_core.messages import AIMessage, AIMessageChunk
+import asyncio
+import os
+import tempfile
+import time
+from .ingest import StubEmbeddings
+from .rag_chain import SupportRAGChain
+from .vector_store import SupportVectorStore
+
+
+class StubChatModel:
+    """Stand-in for ChatOpenAI that answers after a fixed delay, without network calls."""
+
+    def __init__(self, latency: float = 0.3, answer: str = "Restart the service and clear the cache."):
+        self.latency = latency
+        self.answer = answer
+
+    async def ainvoke(self, messages: Any) -> AIMessage:
+        await asyncio.sleep(self.latency)
+        return AIMessage(content=self.answer)
+
+    async def astream(self, messages: Any) -> AsyncIterator[AIMessageChunk]:
+        words = self.answer.split(" ")
+        for word in words:
+            await asyncio.sleep(self.latency / len(words))
+            yield AIMessageChunk(content=word + " ")
+
+
+def build_chain(num_docs: int, embed_latency: float, llm_latency: float) -> SupportRAGChain:
+    """Build a throwaway vector store and chain backed by stubs."""
+    embeddings = StubEmbeddings(dim=256)
+    store = SupportVectorStore(tempfile.mkdtemp(prefix="rag-bench-"), embeddings=embeddings)
+    documents = {
+        support_type: [
+            Document(
+                page_content=f"Subject: {support_type} issue {i}\nDescription: error code E{i % 50} on login",
+                metadata={"ticket_id": f"{support_type}_{i}", "support_type": support_type}
+            )
+            for i in range(num_docs)
+        ]
+        for support_type in ("technical", "product", "customer")
+    }
+    store.create_vector_store(documents)
+    # Only queries pay the simulated embedding latency
+    embeddings.latency = embed_latency
+
+    # ChatOpenAI needs a key to construct; it is replaced before any call
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    chain = SupportRAGChain(store)
+    chain.llm = StubChatModel(latency=llm_latency)
+    return chain
+
+
+async def blocking_query(chain: SupportRAGChain, query: str) -> str:
+    """The pre-async behaviour: synchronous retrieval inside the coroutine."""
+    docs = chain.get_relevant_documents(query)
+    prompt = chain.prompt.format_messages(context=chain._prepare_context(docs, query=query), question=query)
+    response = await chain.llm.ainvoke(prompt)
+    return response.content
+
+
+async def run_concurrently(coro_factory, queries: List[str]) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(coro_factory(query) for query in queries))
+    return time.perf_counter() - start
+
+
+async def benchmark(
+    concurrency_levels: tuple = (1, 10, 50),
+    num_docs: int = 500,
+    embed_latency: float = 0.05,
+    llm_latency: float = 0.3
+) -> List[Dict[str, float]]:
+    chain = build_chain(num_docs, embed_latency, llm_latency)
+    results = []
+    for concurrency in concurrency_levels:
+        queries = [f"How do I fix login error code E{i % 50}?" for i in range(concurrency)]
+        blocking = await run_concurrently(lambda q: blocking_query(chain, q), queries)
+        non_blocking = await run_concurrently(chain.query, queries)
+        results.append({
+            "concurrency": concurrency,
+            "blocking_qps": concurrency / blocking,
+            "async_qps": concurrency / non_blocking,
+        })
+        print(
+            f"concurrency={concurrency:<4} blocking={concurrency / blocking:8.1f} q/s   "
+            f"async={concurrency / non_blocking:8.1f} q/s   speedup={blocking / non_blocking:5.1f}x"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
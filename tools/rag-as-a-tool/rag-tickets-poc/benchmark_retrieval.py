@@ -0,0 +1,329 @@
+"""
+Offline retrieval benchmark for SupportVectorStore and SupportRAGChain.
+
+Generates synthetic tickets in the JSON and XML layouts SupportDocumentLoader
+reads, indexes them with the deterministic StubEmbeddings, and measures for
+each backend and corpus size:
+
+    build time and throughput, on-disk and resident memory footprint,
+    p50/p95/p99 latency of vector search, hybrid search and chain retrieval,
+    recall@k of the vector search against brute-force exact search.
+
+Results are written as JSON; when the output file already exists, the previous
+run is compared and metrics that got more than 20% worse are listed. Latencies
+are compared by their median over `repeats` passes of the queries, and only
+when both runs timed at least MIN_COMPARE_SAMPLES queries; tail percentiles of
+a few hundred samples are too noisy to flag regressions. Run from the directory
+containing the package:
+
+    python -m src.benchmark_retrieval
+"""
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from pathlib import Path
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+import numpy as np
+from .document_loaders_implemented import SupportDocumentLoader
+from .ingest import StubEmbeddings
+from .vector_backends import create_backend
+from .vector_store import SupportVectorStore
+
+SUPPORT_TYPES = ("technical", "product", "customer")
+
+# Timed queries (num_queries * repeats) both runs need before latencies are compared
+MIN_COMPARE_SAMPLES = 500
+
+_PRODUCTS = ["VPN client", "mobile app", "web dashboard", "billing portal", "SSO gateway", "printer driver",
+             "email sync", "backup agent", "payment API", "analytics export"]
+_SYMPTOMS = ["crashes on startup", "shows error {code}", "times out after login", "drops the connection",
+             "rejects valid credentials", "is very slow", "fails to sync", "returns a blank page",
+             "charges twice", "loses saved settings"]
+_CAUSES = ["an expired certificate", "a stale cache", "a misconfigured proxy", "an outdated version",
+           "a wrong time zone", "a full disk", "a revoked token", "a blocked port"]
+_FIXES = ["update to version {version}", "clear the local cache", "reset the password", "reinstall the client",
+          "renew the certificate", "open port {port} on the firewall", "re-link the account",
+          "restart the sync service"]
+_QUEUES = ["Technical Support", "Product Support", "Billing and Payments", "Customer Service", "IT Support"]
+_PRIORITIES = ["low", "medium", "high", "critical"]
+_TAGS = ["login", "network", "billing", "crash", "performance", "security", "mobile", "sync", "account"]
+
+
+def _ticket(rng: random.Random, ticket_id: int) -> Dict[str, Any]:
+    product = rng.choice(_PRODUCTS)
+    symptom = rng.choice(_SYMPTOMS).format(code=f"E{rng.randint(100, 999)}")
+    cause = rng.choice(_CAUSES)
+    fix = rng.choice(_FIXES).format(version=f"{rng.randint(1, 9)}.{rng.randint(0, 9)}", port=rng.choice([443, 8080, 8443]))
+    return {
+        "id": ticket_id,
+        "subject": f"The {product} {symptom}",
+        "body": f"Since this morning the {product} {symptom}. We tried restarting without success. "
+                f"Support found {cause} on the affected machines.",
+        "answer": f"The issue was caused by {cause}. Please {fix}.",
+        "type": rng.choice(["Incident", "Problem", "Request", "Change"]),
+        "queue": rng.choice(_QUEUES),
+        "priority": rng.choice(_PRIORITIES),
+        "language": "en",
+        "tags": rng.sample(_TAGS, rng.randint(1, 3)),
+    }
+
+
+def generate_tickets(
+    data_dir: str,
+    num_tickets: int,
+    support_types: Tuple[str, ...] = SUPPORT_TYPES,
+    xml_fraction: float = 0.3,
+    seed: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Write synthetic tickets to data_dir/<support_type>/tickets.json and tickets.xml.
+
+    Returns:
+        List[Dict[str, Any]]: The generated tickets (with "support_type" and "source" added)
+    """
+    rng = random.Random(seed)
+    tickets = []
+    per_type = num_tickets // len(support_types)
+    for t, support_type in enumerate(support_types):
+        folder = Path(data_dir) / support_type
+        folder.mkdir(parents=True, exist_ok=True)
+        records = [_ticket(rng, t * per_type + i + 1) for i in range(per_type)]
+        n_xml = int(len(records) * xml_fraction)
+        json_records, xml_records = records[n_xml:], records[:n_xml]
+
+        with open(folder / "tickets.json", "w", encoding="utf-8") as f:
+            json.dump([
+                {**{k: v for k, v in record.items() if k != "tags"},
+                 **{f"tag_{i}": tag for i, tag in enumerate(record["tags"], 1)}}
+                for record in json_records
+            ], f)
+
+        root = ET.Element("tickets")
+        for record in xml_records:
+            ticket = ET.SubElement(root, "ticket")
+            for field, tag in (("id", "id"), ("subject", "subject"), ("body", "description"), ("answer", "resolution"),
+                               ("type", "type"), ("queue", "queue"), ("priority", "priority"), ("language", "language")):
+                ET.SubElement(ticket, tag).text = str(record[field])
+            tags = ET.SubElement(ticket, "tags")
+            for tag in record["tags"]:
+                ET.SubElement(tags, "tag").text = tag
+        ET.ElementTree(root).write(folder / "tickets.xml", encoding="utf-8", xml_declaration=True)
+
+        tickets += [{**r, "support_type": support_type, "source": "xml"} for r in xml_records]
+        tickets += [{**r, "support_type": support_type, "source": "json"} for r in json_records]
+    return tickets
+
+
+def make_queries(tickets: List[Dict[str, Any]], num_queries: int, seed: int = 1) -> List[str]:
+    """Queries phrased like a user describing the problem of a random ticket."""
+    rng = random.Random(seed)
+    return [
+        f"How do I fix it when {ticket['subject'][4:].lower()}? Maybe {rng.choice(_CAUSES)}"
+        for ticket in rng.sample(tickets, min(num_queries, len(tickets)))
+    ]
+
+
+# ----------------------------------------------------------------------
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+    return {"p50_ms": pick(50), "p95_ms": pick(95), "p99_ms": pick(99), "mean_ms": statistics.fmean(ordered)}
+
+
+def _latencies(fn: Callable[[Any], Any], inputs: List[Any], repeats: int = 1) -> Dict[str, float]:
+    """Percentiles over every pass; p50_ms is the median of the per-pass medians."""
+    samples, medians = [], []
+    for _ in range(repeats):
+        run = []
+        for item in inputs:
+            start = time.perf_counter()
+            fn(item)
+            run.append((time.perf_counter() - start) * 1000)
+        samples += run
+        medians.append(percentiles(run)["p50_ms"])
+    return {**percentiles(samples), "p50_ms": statistics.median(medians)}
+
+
+def _rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux only)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _dir_bytes(path: str) -> int:
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+
+
+def _exact_recall(store: SupportVectorStore, query_embs: np.ndarray, found: List[List[str]], k: int) -> float:
+    """
+    Recall@k against brute-force cosine search over every stored vector.
+    Synthetic tickets often share text, so a result scoring as high as the
+    exact k-th neighbour counts as a hit however the tie was broken.
+    """
+    ids, vectors = [], []
+    for collection in store.collections.values():
+        page = collection.get(include=["embeddings"])
+        ids += page["ids"]
+        vectors += list(page["embeddings"])
+    row_of = {doc_id: i for i, doc_id in enumerate(ids)}
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+    scores = query_embs @ matrix.T
+
+    recalls = []
+    for row, hits in zip(scores, found):
+        kth = np.partition(row, -k)[-k]
+        recalls.append(sum(1 for doc_id in hits if row[row_of[doc_id]] >= kth - 1e-5) / k)
+    return statistics.fmean(recalls)
+
+
+def benchmark_backend(
+    backend: str,
+    data_dir: str,
+    tickets: List[Dict[str, Any]],
+    queries: List[str],
+    dim: int,
+    k: int,
+    repeats: int = 1
+) -> Dict[str, Any]:
+    """Build one store from data_dir and measure it."""
+    from .rag_chain import SupportRAGChain
+
+    store_dir = tempfile.mkdtemp(prefix=f"rag-bench-{backend}-")
+    embeddings = StubEmbeddings(dim=dim)
+    try:
+        rss_before = _rss_bytes()
+        store = SupportVectorStore(store_dir, embeddings=embeddings, backend=create_backend(store_dir, backend))
+        start = time.perf_counter()
+        store.create_vector_store(SupportDocumentLoader(data_dir).iter_tickets())
+        build_seconds = time.perf_counter() - start
+        rss_after = _rss_bytes()
+
+        query_embs = [embeddings.embed_query(query) for query in queries]
+        normalized = np.asarray(query_embs, dtype=np.float32)
+        normalized /= np.linalg.norm(normalized, axis=1, keepdims=True) + 1e-12
+        found = [[doc["metadata"]["ticket_id"] for doc in store.query_by_embedding(emb, k=k)] for emb in query_embs]
+        recall = _exact_recall(store, normalized, found, k)
+
+        os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+        chain = SupportRAGChain(store)
+
+        result = {
+            "backend": backend,
+            "documents": len(tickets),
+            "build_seconds": build_seconds,
+            "docs_per_sec": len(tickets) / build_seconds,
+            "store_bytes": _dir_bytes(store_dir),
+            "rss_delta_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+            f"recall@{k}": recall,
+            "vector_search": _latencies(lambda emb: store.query_by_embedding(emb, k=k), query_embs, repeats),
+            "hybrid_search": _latencies(lambda query: store.query_hybrid(query, k=k), queries, repeats),
+            "chain_retrieval": _latencies(lambda query: chain.get_relevant_documents(query, k=k), queries, repeats),
+        }
+        store._query_pool.shutdown()
+        return result
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+
+def _timed_queries(report: Dict[str, Any]) -> int:
+    config = report.get("config", {})
+    return config.get("num_queries", 0) * config.get("repeats", 1)
+
+
+def compare_results(previous: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.2) -> List[str]:
+    """
+    List metrics that got worse by more than `tolerance` between two result files.
+
+    Latencies are compared by p50 only, and only when both runs timed at least
+    MIN_COMPARE_SAMPLES queries.
+    """
+    compare_latency = min(_timed_queries(previous), _timed_queries(current)) >= MIN_COMPARE_SAMPLES
+    def flatten(results: List[Dict[str, Any]]) -> Dict[str, float]:
+        flat = {}
+        for result in results:
+            prefix = f"{result['backend']}/{result['documents']}"
+            for key, value in result.items():
+                if isinstance(value, dict):
+                    for sub_key, sub_value in value.items():
+                        flat[f"{prefix}/{key}.{sub_key}"] = sub_value
+                elif isinstance(value, (int, float)) and key != "documents":
+                    flat[f"{prefix}/{key}"] = value
+        return flat
+
+    before, after = flatten(previous.get("results", [])), flatten(current["results"])
+    regressions = []
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        if not old or new is None:
+            continue
+        if key.endswith("_ms") and (not compare_latency or not key.endswith(".p50_ms")):
+            continue
+        change = (new - old) / abs(old)
+        # Throughput and recall should go up; times and sizes should go down
+        higher_is_better = key.endswith("docs_per_sec") or "/recall@" in key
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{key}: {old:.4g} -> {new:.4g} ({change:+.0%})")
+    return regressions
+
+
+def run_benchmark(
+    corpus_sizes: Tuple[int, ...] = (1000, 5000, 20000),
+    backends: Tuple[str, ...] = ("chroma", "int8", "pq"),
+    num_queries: int = 200,
+    repeats: int = 3,
+    dim: int = 384,
+    k: int = 5,
+    output_path: str = "benchmark_results.json"
+) -> Dict[str, Any]:
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"corpus_sizes": list(corpus_sizes), "backends": list(backends),
+                   "num_queries": num_queries, "repeats": repeats, "dim": dim, "k": k},
+        "results": [],
+    }
+    for size in corpus_sizes:
+        data_dir = tempfile.mkdtemp(prefix="rag-bench-data-")
+        try:
+            tickets = generate_tickets(data_dir, size)
+            queries = make_queries(tickets, num_queries)
+            for backend in backends:
+                result = benchmark_backend(backend, data_dir, tickets, queries, dim, k, repeats)
+                report["results"].append(result)
+                print(
+                    f"{backend:<6} n={size:<6} build={result['docs_per_sec']:8.0f} docs/s  "
+                    f"disk={result['store_bytes'] / 2**20:7.1f} MiB  recall@{k}={result[f'recall@{k}']:.3f}  "
+                    f"vector p50/p95/p99={result['vector_search']['p50_ms']:.2f}/"
+                    f"{result['vector_search']['p95_ms']:.2f}/{result['vector_search']['p99_ms']:.2f} ms"
+                )
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    if os.path.exists(output_path):
+        with open(output_path, encoding="utf-8") as f:
+            previous = json.load(f)
+        regressions = compare_results(previous, report)
+        if min(_timed_queries(previous), _timed_queries(report)) < MIN_COMPARE_SAMPLES:
+            print(f"Latencies not compared: fewer than {MIN_COMPARE_SAMPLES} timed queries (num_queries * repeats).")
+        print("Regressions vs previous run:" if regressions else "No regressions beyond 20% vs previous run.")
+        for regression in regressions:
+            print(f"  {regression}")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output_path}")
+    return report
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,80 @@
+"""
+Cold-start benchmark for SupportVectorStore.load_local, fully offline.
+
+Builds a throwaway store with StubEmbeddings, then times the old eager load
+(list and open every collection, load the local indexes) against the
+manifest-based lazy load and the process-wide shared store. Run from the
+directory containing the package:
+
+    python -m src.benchmark_startup
+"""
+from typing import Dict, List
+from langchain.schema import Document
+import shutil
+import statistics
+import tempfile
+import time
+from .ingest import StubEmbeddings
+from .vector_store import SupportVectorStore, get_shared_store
+
+
+def build_store(directory: str, num_docs: int, support_types: List[str]) -> None:
+    store = SupportVectorStore(directory, embeddings=StubEmbeddings(dim=256))
+    store.create_vector_store({
+        support_type: (
+            Document(
+                page_content=f"Subject: {support_type} issue {i}\nDescription: error code E{i % 50} on login",
+                metadata={"ticket_id": f"{support_type}_{i}", "support_type": support_type, "priority": "high"}
+            )
+            for i in range(num_docs)
+        )
+        for support_type in support_types
+    })
+
+
+def eager_load(directory: str) -> SupportVectorStore:
+    """The pre-manifest load: every collection and local index is opened up front."""
+    store = SupportVectorStore(directory, embeddings=StubEmbeddings(dim=256))
+    for name in store.backend.list_collections():
+        store.collections[name] = store.backend.get_collection(name)
+    len(store.lexical_index), len(store.metadata_index)
+    return store
+
+
+def timed_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def benchmark(num_docs: int = 5000, num_types: int = 6, repeat: int = 5) -> Dict[str, float]:
+    directory = tempfile.mkdtemp(prefix="rag-startup-")
+    try:
+        build_store(directory, num_docs, [f"type_{i}" for i in range(num_types)])
+
+        results = {
+            "eager_load_ms": timed_ms(lambda: eager_load(directory), repeat),
+            "manifest_load_ms": timed_ms(
+                lambda: SupportVectorStore.load_local(directory, embeddings=StubEmbeddings(dim=256)), repeat
+            ),
+            "manifest_load_and_query_ms": timed_ms(
+                lambda: SupportVectorStore.load_local(directory, embeddings=StubEmbeddings(dim=256))
+                .query_similar("login error code E7 on login", k=5),
+                repeat
+            ),
+        }
+        get_shared_store(directory)
+        results["shared_store_ms"] = timed_ms(lambda: get_shared_store(directory), repeat)
+
+        for name, value in results.items():
+            print(f"{name:<28} {value:10.2f} ms")
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark()
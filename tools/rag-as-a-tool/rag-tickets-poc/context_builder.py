@@ -0,0 +1,190 @@
+from typing import List, Dict, Any, Optional, Callable, Set, Tuple
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+TICKET_TEMPLATE = "Ticket {i}:\nSupport Type: {support_type}\nTags: {tags}\nContent: {content}"
+
+
+def format_ticket(i: int, doc: Dict[str, Any], content: Optional[str] = None) -> str:
+    """Render a retrieved ticket the way it appears in the prompt context."""
+    metadata = doc["metadata"]
+    tags = metadata.get("tags", [])
+    return TICKET_TEMPLATE.format(
+        i=i,
+        support_type=metadata.get("support_type", "Unknown"),
+        tags=", ".join(tags) if isinstance(tags, (list, tuple)) else str(tags),
+        content=doc["content"] if content is None else content
+    )
+
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class ContextBuilder:
+    """
+    Packs retrieved tickets into a prompt context that fits a token budget.
+
+    Tickets are taken in relevance order. Near-identical tickets are dropped,
+    over-long bodies are cut down to the sentences that best match the query,
+    and packing stops once the budget is full.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        max_ticket_tokens: int = 600,
+        min_ticket_tokens: int = 60,
+        dedup_threshold: float = 0.9,
+        model: str = "gpt-4o",
+        token_counter: Optional[Callable[[str], int]] = None
+    ):
+        """
+        Args:
+            max_tokens (int): Token budget for the whole context
+            max_ticket_tokens (int): Longest a single ticket may be before it is summarized
+            min_ticket_tokens (int): Smallest useful ticket; smaller leftovers of the budget are not filled
+            dedup_threshold (float): Word-trigram Jaccard similarity above which tickets count as duplicates
+            model (str): Model whose tokenizer is used for counting
+            token_counter (Callable, optional): Custom token counter, e.g. for tests
+        """
+        self.max_tokens = max_tokens
+        self.max_ticket_tokens = max_ticket_tokens
+        self.min_ticket_tokens = min_ticket_tokens
+        self.dedup_threshold = dedup_threshold
+        self.model = model
+        self._count = token_counter
+        self._lock = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    def count_tokens(self, text: str) -> int:
+        if self._count is None:
+            with self._lock:
+                if self._count is None:
+                    self._count = self._load_counter()
+        return self._count(text)
+
+    def _load_counter(self) -> Callable[[str], int]:
+        """tiktoken for the model, or a ~4 characters per token estimate if it cannot be loaded."""
+        try:
+            import tiktoken
+            try:
+                encoding = tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable ({e}); estimating tokens from text length.")
+            return lambda text: (len(text) + 3) // 4
+
+    # ----------------------------------------------------------------------
+    def _is_duplicate(self, shingles: Set[Tuple[str, ...]], kept: List[Set[Tuple[str, ...]]]) -> bool:
+        for other in kept:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= self.dedup_threshold:
+                return True
+        return False
+
+    def summarize(self, text: str, query: Optional[str], max_tokens: int) -> str:
+        """
+        Extractive summary: the sentences sharing the most words with the query
+        (the leading sentences without a query), in their original order.
+        """
+        if self.count_tokens(text) <= max_tokens:
+            return text
+
+        sentences = [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+        query_words = set(_WORD_RE.findall(query.lower())) if query else set()
+
+        def score(item: Tuple[int, str]) -> Tuple[float, int]:
+            i, sentence = item
+            words = set(_WORD_RE.findall(sentence.lower()))
+            overlap = len(words & query_words) / (len(words) ** 0.5) if words else 0.0
+            # The first sentence (usually the subject) gets a small bonus; ties keep text order
+            return (overlap + (0.5 if i == 0 else 0.0), -i)
+
+        chosen: List[int] = []
+        used = 0
+        for i, sentence in sorted(enumerate(sentences), key=score, reverse=True):
+            tokens = self.count_tokens(sentence) + 1
+            if used + tokens > max_tokens:
+                continue
+            chosen.append(i)
+            used += tokens
+
+        if not chosen:
+            # A single sentence longer than the budget: hard cut by characters
+            return text[:max(0, max_tokens * 4 - 3)] + "..."
+        return " ".join(sentences[i] for i in sorted(chosen)) + " [...]"
+
+    # ----------------------------------------------------------------------
+    def build(self, documents: List[Dict[str, Any]], query: Optional[str] = None) -> Tuple[str, Dict[str, int]]:
+        """
+        Build the context for documents sorted by relevance.
+
+        Returns:
+            Tuple[str, Dict[str, int]]: The context and stats: tickets_in, tickets_packed,
+            duplicates, summarized, tokens_before (full concatenation), tokens and tokens_saved
+        """
+        if not documents:
+            return "No relevant support tickets found.", {
+                "tickets_in": 0, "tickets_packed": 0, "duplicates": 0, "summarized": 0,
+                "tokens_before": 0, "tokens": 0, "tokens_saved": 0,
+            }
+
+        separator_tokens = self.count_tokens("\n\n")
+        tokens_before = sum(self.count_tokens(format_ticket(i, doc)) for i, doc in enumerate(documents, 1))
+        tokens_before += separator_tokens * (len(documents) - 1)
+
+        parts: List[str] = []
+        kept_shingles: List[Set[Tuple[str, ...]]] = []
+        used = 0
+        duplicates = 0
+        summarized = 0
+        for doc in documents:
+            shingles = _shingles(doc["content"])
+            if self._is_duplicate(shingles, kept_shingles):
+                duplicates += 1
+                continue
+
+            remaining = self.max_tokens - used - (separator_tokens if parts else 0)
+            header_tokens = self.count_tokens(format_ticket(len(parts) + 1, doc, content=""))
+            body_budget = min(self.max_ticket_tokens, remaining - header_tokens)
+            if body_budget < self.min_ticket_tokens:
+                # Budget is full; a shorter ticket further down may still fit
+                if self.count_tokens(format_ticket(len(parts) + 1, doc)) > remaining:
+                    continue
+
+            content = doc["content"]
+            if self.count_tokens(content) > body_budget:
+                content = self.summarize(content, query, max(body_budget, 0))
+                summarized += 1
+            text = format_ticket(len(parts) + 1, doc, content=content)
+            tokens = self.count_tokens(text)
+            if tokens > remaining:
+                continue
+
+            parts.append(text)
+            kept_shingles.append(shingles)
+            used += tokens + (separator_tokens if len(parts) > 1 else 0)
+
+        context = "\n\n".join(parts) if parts else "No relevant support tickets found."
+        stats = {
+            "tickets_in": len(documents),
+            "tickets_packed": len(parts),
+            "duplicates": duplicates,
+            "summarized": summarized,
+            "tokens_before": tokens_before,
+            "tokens": used,
+            "tokens_saved": max(0, tokens_before - used),
+        }
+        return context, stats
@@ -1,15 +1,43 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Tuple, Optional
 from pathlib import Path
+from uuid import uuid4
+from concurrent.futures import ProcessPoolExecutor
 from langchain.schema import Document
 from langchain_community.document_loaders import JSONLoader
 import xml.etree.ElementTree as ET
+import json
 import logging
 import jq
 import os
+import time
 
 logger = logging.getLogger(__name__)
 
 
+# Loader built once per worker process by _parse_ticket_file
+_worker_loader: Optional["SupportDocumentLoader"] = None
+
+
+def _parse_ticket_file(
+    loader_cls: type,
+    data_path: str,
+    file_path: Path,
+    support_type: str
+) -> Tuple[List[Document], float]:
+    """Process-pool worker: parse one ticket file and time it."""
+    global _worker_loader
+    if type(_worker_loader) is not loader_cls or str(_worker_loader.data_path) != data_path:
+        _worker_loader = loader_cls(data_path)
+    loader = _worker_loader
+    start = time.perf_counter()
+    if file_path.suffix.lower() == ".json":
+        docs = list(loader.iter_json_tickets(file_path, support_type))
+    else:
+        # Same error policy as the sequential path: a malformed file is logged and skipped
+        docs = loader.load_xml_tickets(file_path, support_type)
+    return docs, time.perf_counter() - start
+
+
 class SupportDocumentLoader:
     """
     A loader to read, normalize, and convert JSON and XML support tickets into LangChain Documents.
@@ -22,6 +50,8 @@ class SupportDocumentLoader:
         self.data_path = Path(data_path)
         if not self.data_path.exists():
             raise FileNotFoundError(f"Data path does not exist: {self.data_path}")
+        # Per-file timings of the last load_tickets_parallel run
+        self.file_stats: List[Dict[str, Any]] = []
         logger.info(f"Initialized SupportDocumentLoader with path: {self.data_path}")
 
     # ------------------------------------------------------
@@ -77,54 +107,190 @@ class SupportDocumentLoader:
     # ------------------------------------------------------
     # XML TICKET LOADING
     # ------------------------------------------------------
+    def _xml_ticket_to_document(self, ticket: ET.Element, support_type: str) -> Document:
+        """
+        Convert a single <ticket> element into a Document.
+        """
+        original_id = ticket.findtext("id", str(uuid4()))
+        subject = ticket.findtext("subject", "")
+        description = ticket.findtext("description", "")
+        resolution = ticket.findtext("resolution", "")
+        type_ = ticket.findtext("type", "")
+        queue = ticket.findtext("queue", "")
+        priority = ticket.findtext("priority", "")
+        language = ticket.findtext("language", "en")
+
+        tags = [t.text for t in ticket.findall(".//tags/tag") if t.text]
+
+        content = (
+            f"Subject: {subject}\n"
+            f"Description: {description}\n"
+            f"Resolution: {resolution}\n"
+            f"Type: {type_}\n"
+            f"Queue: {queue}\n"
+            f"Priority: {priority}"
+        )
+
+        metadata = {
+            "ticket_id": f"{support_type}_xml_{original_id}",
+            "original_ticket_id": original_id,
+            "support_type": support_type,
+            "type": type_,
+            "queue": queue,
+            "priority": priority,
+            "language": language,
+            "tags": tags,
+            "source": "xml",
+        }
+
+        return Document(page_content=content, metadata=metadata)
+
     def load_xml_tickets(self, file_path: Path, support_type: str) -> List[Document]:
         """
         Parse XML support tickets and convert to Document objects.
         """
         documents = []
         try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-            for ticket in root.findall(".//ticket"):
-                original_id = ticket.findtext("id", str(uuid4()))
-                subject = ticket.findtext("subject", "")
-                description = ticket.findtext("description", "")
-                resolution = ticket.findtext("resolution", "")
-                type_ = ticket.findtext("type", "")
-                queue = ticket.findtext("queue", "")
-                priority = ticket.findtext("priority", "")
-                language = ticket.findtext("language", "en")
-
-                tags = [t.text for t in ticket.findall(".//tags/tag") if t.text]
-
-                content = (
-                    f"Subject: {subject}\n"
-                    f"Description: {description}\n"
-                    f"Resolution: {resolution}\n"
-                    f"Type: {type_}\n"
-                    f"Queue: {queue}\n"
-                    f"Priority: {priority}"
-                )
-
-                metadata = {
-                    "ticket_id": f"{support_type}_xml_{original_id}",
-                    "original_ticket_id": original_id,
-                    "support_type": support_type,
-                    "type": type_,
-                    "queue": queue,
-                    "priority": priority,
-                    "language": language,
-                    "tags": tags,
-                    "source": "xml",
-                }
-
-                documents.append(Document(page_content=content, metadata=metadata))
-
+            for doc in self.iter_xml_tickets(file_path, support_type):
+                documents.append(doc)
             logger.info(f"Loaded {len(documents)} XML tickets from {file_path.name}")
         except Exception as e:
             logger.error(f"Failed to load XML file {file_path}: {e}", exc_info=True)
         return documents
 
+    # ------------------------------------------------------
+    # STREAMING (CONSTANT-MEMORY) LOADING
+    # ------------------------------------------------------
+    def iter_xml_tickets(self, file_path: Path, support_type: str) -> Iterator[Document]:
+        """
+        Lazily yield Documents from an XML file using iterparse.
+
+        Each <ticket> element is removed from its parent once converted, at any
+        nesting depth (e.g. <export><tickets><ticket>), so memory stays bounded
+        by the size of a single ticket rather than the whole export.
+        """
+        # Open elements, so a finished ticket can be detached from its parent
+        path: List[ET.Element] = []
+        for event, elem in ET.iterparse(str(file_path), events=("start", "end")):
+            if event == "start":
+                path.append(elem)
+                continue
+            path.pop()
+            if elem.tag == "ticket":
+                yield self._xml_ticket_to_document(elem, support_type)
+                elem.clear()
+                if path:
+                    path[-1].remove(elem)
+
+    def iter_json_records(self, file_path: Path, chunk_size: int = 1 << 20) -> Iterator[Dict[str, Any]]:
+        """
+        Incrementally parse a top-level JSON array, yielding one element at a time.
+
+        The file is read in chunks of `chunk_size` characters and only the
+        element currently being decoded is kept in memory. Elements are decoded
+        in place from a read position; consumed text is dropped only when the
+        next chunk is read, so parsing stays linear in the file size.
+        """
+        decoder = json.JSONDecoder()
+        with open(file_path, "r", encoding="utf-8") as f:
+            buffer = ""
+            pos = 0
+            eof = False
+
+            def fill() -> bool:
+                nonlocal buffer, pos, eof
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    eof = True
+                    return False
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                return True
+
+            # Locate the opening bracket
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer):
+                    if buffer[pos] != "[":
+                        raise ValueError(f"Expected a JSON array in {file_path}")
+                    pos += 1
+                    break
+                if not fill():
+                    return
+
+            while True:
+                # Skip separators between elements
+                while True:
+                    while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                        pos += 1
+                    if pos < len(buffer) or not fill():
+                        break
+
+                if pos >= len(buffer):
+                    raise ValueError(f"Unterminated JSON array in {file_path}")
+                if buffer[pos] == "]":
+                    return
+
+                try:
+                    record, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if not fill():
+                        raise
+                    continue
+                # A scalar ending exactly at the buffer edge may be truncated
+                if end == len(buffer) and not eof and fill():
+                    continue
+
+                pos = end
+                yield record
+
+    def iter_json_tickets(self, file_path: Path, support_type: str) -> Iterator[Document]:
+        """
+        Lazily yield Documents from a JSON array export.
+        """
+        for record in self.iter_json_records(file_path):
+            yield Document(
+                page_content=self.get_json_content(record),
+                metadata=self.get_json_metadata(record, support_type)
+            )
+
+    def iter_tickets(self) -> Iterator[Tuple[str, Iterator[Document]]]:
+        """
+        Stream all tickets, yielding (support_type, lazy Document iterator) pairs.
+
+        Each support type's iterator must be consumed before advancing to the next
+        pair. Ticket IDs are still checked for uniqueness across the whole dataset;
+        only the IDs are kept in memory.
+
+        Raises:
+            ValueError: If duplicate ticket IDs are found (while iterating)
+        """
+        seen_ids = set()
+
+        def stream_folder(folder: Path, support_type: str) -> Iterator[Document]:
+            count = 0
+            for file_path in sorted(folder.iterdir()):
+                suffix = file_path.suffix.lower()
+                if suffix == ".json":
+                    docs = self.iter_json_tickets(file_path, support_type)
+                elif suffix == ".xml":
+                    docs = self.iter_xml_tickets(file_path, support_type)
+                else:
+                    continue
+
+                for doc in docs:
+                    if doc.metadata["ticket_id"] in seen_ids:
+                        raise ValueError(f"Duplicate ticket ID found: {doc.metadata['ticket_id']}")
+                    seen_ids.add(doc.metadata["ticket_id"])
+                    count += 1
+                    yield doc
+            logger.info(f"Streamed {count} tickets for support type '{support_type}'")
+
+        for folder in sorted(self.data_path.iterdir()):
+            if folder.is_dir():
+                yield folder.name.lower(), stream_folder(folder, folder.name.lower())
+
     # ------------------------------------------------------
     # LOAD ALL TICKETS (JSON + XML)
     # ------------------------------------------------------
@@ -175,12 +341,80 @@ class SupportDocumentLoader:
         logger.info(f"Loaded {sum(len(v) for v in support_docs.values())} total tickets")
         return support_docs
 
+    # ------------------------------------------------------
+    # PARALLEL LOADING
+    # ------------------------------------------------------
+    def load_tickets_parallel(self, max_workers: Optional[int] = None) -> Dict[str, List[Document]]:
+        """
+        Load all JSON and XML tickets grouped by support type, parsing files in a process pool.
+
+        Files are parsed independently; the merge step then walks the results in
+        folder/file order, so duplicate detection stays global, exact and
+        deterministic. Per-file timings are stored in `self.file_stats`.
+
+        Args:
+            max_workers (int, optional): Worker processes (defaults to the CPU count)
+
+        Raises:
+            ValueError: If duplicate ticket IDs are found
+        """
+        tasks: List[Tuple[Path, str]] = []
+        support_docs: Dict[str, List[Document]] = {}
+
+        for folder in sorted(self.data_path.iterdir()):
+            if not folder.is_dir():
+                continue
+            support_type = folder.name.lower()
+            support_docs[support_type] = []
+            for file_path in sorted(folder.iterdir()):
+                if file_path.suffix.lower() in (".json", ".xml"):
+                    tasks.append((file_path, support_type))
+
+        start = time.perf_counter()
+        self.file_stats = []
+        seen_ids = set()
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # Workers get the loader class and path, not a pickled copy of this loader per file
+            futures = [
+                executor.submit(_parse_ticket_file, type(self), str(self.data_path), file_path, support_type)
+                for file_path, support_type in tasks
+            ]
+            # Merge in submission order while later files are still parsing
+            for (file_path, support_type), future in zip(tasks, futures):
+                docs, seconds = future.result()
+                for doc in docs:
+                    if doc.metadata["ticket_id"] in seen_ids:
+                        # Don't wait for the remaining files before reporting the error
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        raise ValueError(f"Duplicate ticket ID found: {doc.metadata['ticket_id']}")
+                    seen_ids.add(doc.metadata["ticket_id"])
+                support_docs[support_type].extend(docs)
+                self.file_stats.append({
+                    "file": str(file_path),
+                    "support_type": support_type,
+                    "documents": len(docs),
+                    "seconds": seconds,
+                    "docs_per_sec": len(docs) / seconds if seconds > 0 else 0.0,
+                })
+
+        elapsed = time.perf_counter() - start
+        parse_time = sum(stat["seconds"] for stat in self.file_stats)
+        logger.info(
+            f"Loaded {len(seen_ids)} total tickets from {len(tasks)} files in {elapsed:.2f}s "
+            f"({parse_time:.2f}s of parsing across workers)"
+        )
+        return support_docs
+
     # ------------------------------------------------------
     # WRAPPER
     # ------------------------------------------------------
-    def create_documents(self) -> Dict[str, List[Document]]:
+    def create_documents(self, parallel: bool = False, max_workers: Optional[int] = None) -> Dict[str, List[Document]]:
         """
         Load and process all support tickets.
+        Set `parallel` to parse files in a process pool of `max_workers`.
         """
         logger.info("Creating documents from support data...")
+        if parallel:
+            return self.load_tickets_parallel(max_workers=max_workers)
         return self.load_tickets()
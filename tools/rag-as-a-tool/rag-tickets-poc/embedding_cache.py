@@ -0,0 +1,308 @@
+# Vendored copy of rag-techniques/embeddings/embedding-cache-poc/embedding_cache.py, so this
+# package imports it like its other modules; keep the two files in sync.
+from typing import List, Dict, Optional, Sequence, Tuple
+from array import array
+from pathlib import Path
+from langchain_core.embeddings import Embeddings
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GiB
+
+# Seconds between last_access updates of an entry; LRU eviction only needs coarse times
+ACCESS_RESOLUTION = 3600
+
+
+def default_cache_path() -> Path:
+    """Cache file shared by every vector store; override with EMBEDDING_CACHE_PATH."""
+    return Path(os.getenv("EMBEDDING_CACHE_PATH", Path.home() / ".cache" / "rag-embeddings" / "embeddings.sqlite3"))
+
+
+def text_hash(text: str) -> str:
+    """Content address of a text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def output_dimension_of(embeddings: Embeddings) -> Optional[int]:
+    """Configured output dimension (e.g. OpenAIEmbeddings(dimensions=256)), None for the model default."""
+    for attr in ("dimensions", "output_dimensionality", "dim"):
+        value = getattr(embeddings, attr, None)
+        if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+            return value
+    return None
+
+
+def model_name_of(embeddings: Embeddings) -> str:
+    """
+    Best-effort model identifier for a LangChain embeddings object, including
+    its output dimension when one is configured, e.g. "OpenAIEmbeddings:text-embedding-3-small@256".
+    """
+    name = type(embeddings).__name__
+    for attr in ("model", "model_name", "deployment"):
+        value = getattr(embeddings, attr, None)
+        if isinstance(value, str) and value:
+            name = f"{name}:{value}"
+            break
+    dim = output_dimension_of(embeddings)
+    return f"{name}@{dim}" if dim else name
+
+
+class SQLiteEmbeddingCache:
+    """
+    Persistent (model, text hash) -> vector cache in a single SQLite file.
+
+    Vectors are stored as float32 blobs. When the stored payload exceeds
+    max_bytes, the least recently used entries are evicted down to 90% of it.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path) if path else default_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " PRIMARY KEY (model, hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    # ----------------------------------------------------------------------
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        """
+        Return cached vectors for the given hashes and mark them as recently used.
+
+        Access times are only rewritten once they are ACCESS_RESOLUTION old, in
+        one transaction, so most lookups write nothing.
+        """
+        found: Dict[str, List[float]] = {}
+        if not hashes:
+            return found
+
+        now = time.time()
+        stale = []
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = list(hashes[start:start + 500])
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector, last_access FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *chunk]
+                ).fetchall()
+                for h, blob, last_access in rows:
+                    found[h] = array("f", blob).tolist()
+                    if now - last_access > ACCESS_RESOLUTION:
+                        stale.append((now, model, h))
+            if stale:
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE model = ? AND hash = ?", stale)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        return found
+
+    # ----------------------------------------------------------------------
+    def put_many(self, model: str, items: Sequence[Tuple[str, List[float]]]) -> None:
+        """Store (hash, vector) pairs, evicting old entries if the size limit is exceeded."""
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        for h, vector in items:
+            blob = array("f", vector).tobytes()
+            rows.append((model, h, blob, len(blob), now))
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                replaced = self._existing_size(model, [h for h, _ in items])
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, hash, vector, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._total_bytes += sum(row[3] for row in rows) - replaced
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _existing_size(self, model: str, hashes: List[str]) -> int:
+        total = 0
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            total += self._conn.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                [model, *chunk]
+            ).fetchone()[0]
+        return total
+
+    # ----------------------------------------------------------------------
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache is at 90% of max_bytes."""
+        target = int(self.max_bytes * 0.9)
+        # Other processes may share the file, so start from the real total
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if self._total_bytes <= target:
+            return
+
+        to_free = self._total_bytes - target
+        victims = []
+        freed = 0
+        for model, h, size in self._conn.execute(
+            "SELECT model, hash, size FROM embeddings ORDER BY last_access"
+        ):
+            victims.append((model, h))
+            freed += size
+            if freed >= to_free:
+                break
+
+        self._conn.execute("BEGIN")
+        self._conn.executemany("DELETE FROM embeddings WHERE model = ? AND hash = ?", victims)
+        self._conn.execute("COMMIT")
+        self._total_bytes -= freed
+        logger.info(f"Evicted {len(victims)} cached embeddings ({freed} bytes) from {self.path}")
+
+    # ----------------------------------------------------------------------
+    def size_bytes(self) -> int:
+        """Total size of the stored vectors."""
+        return self._total_bytes
+
+    def clear(self) -> None:
+        """Remove all cached embeddings."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._total_bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps any LangChain Embeddings object with a content-addressed disk cache,
+    so only texts that were never embedded by the same model reach the provider.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        cache: Optional[SQLiteEmbeddingCache] = None,
+        model_name: Optional[str] = None,
+        cache_queries: bool = True
+    ):
+        """
+        Args:
+            underlying (Embeddings): The embeddings implementation to call on a miss
+            cache (SQLiteEmbeddingCache, optional): Cache instance, defaults to the shared cache file
+            model_name (str, optional): Cache namespace, derived from the underlying object if omitted
+            cache_queries (bool): Whether embed_query results are cached too
+        """
+        self.underlying = underlying
+        self.cache = cache or SQLiteEmbeddingCache()
+        self.model_name = model_name or model_name_of(underlying)
+        self.cache_queries = cache_queries
+        self.hits = 0
+        self.misses = 0
+
+    # ----------------------------------------------------------------------
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(text) for text in texts]
+        cached = self.cache.get_many(self.model_name, hashes)
+
+        # Embed each missing text once, even if it appears several times
+        missing: Dict[str, str] = {}
+        for h, text in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = text
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            fresh = list(zip(missing.keys(), vectors))
+            self.cache.put_many(self.model_name, fresh)
+            cached.update(fresh)
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        if not self.cache_queries:
+            return self.underlying.embed_query(text)
+
+        h = text_hash(text)
+        cached = self.cache.get_many(f"{self.model_name}#query", [h])
+        if h in cached:
+            self.hits += 1
+            return cached[h]
+
+        vector = self.underlying.embed_query(text)
+        self.cache.put_many(f"{self.model_name}#query", [(h, vector)])
+        self.misses += 1
+        return vector
+
+    # ----------------------------------------------------------------------
+    # Async variants: SQLite reads and writes run in a worker thread (they can
+    # wait on the lock or the disk), so the event loop is never blocked.
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(text) for text in texts]
+        cached = await asyncio.to_thread(self.cache.get_many, self.model_name, hashes)
+
+        missing: Dict[str, str] = {}
+        for h, text in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = text
+
+        if missing:
+            vectors = await self.underlying.aembed_documents(list(missing.values()))
+            fresh = list(zip(missing.keys(), vectors))
+            await asyncio.to_thread(self.cache.put_many, self.model_name, fresh)
+            cached.update(fresh)
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return [cached[h] for h in hashes]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        if not self.cache_queries:
+            return await self.underlying.aembed_query(text)
+
+        h = text_hash(text)
+        cached = await asyncio.to_thread(self.cache.get_many, f"{self.model_name}#query", [h])
+        if h in cached:
+            self.hits += 1
+            return cached[h]
+
+        vector = await self.underlying.aembed_query(text)
+        await asyncio.to_thread(self.cache.put_many, f"{self.model_name}#query", [(h, vector)])
+        self.misses += 1
+        return vector
+
+    # ----------------------------------------------------------------------
+    def hit_rate(self) -> float:
+        """Fraction of texts served from the cache since construction."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,197 @@
+from typing import List, Dict, Any, Iterable, Iterator, Tuple, Callable
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from langchain_core.embeddings import Embeddings
+import asyncio
+import hashlib
+import logging
+import math
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# (id, text, metadata) triple consumed by the pipeline
+IngestItem = Tuple[str, str, Dict[str, Any]]
+
+# sink(ids, texts, metadatas, embeddings) persists one embedded batch
+BatchSink = Callable[[List[str], List[str], List[Dict[str, Any]], List[List[float]]], None]
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class StubEmbeddings(Embeddings):
+    """
+    Deterministic, offline embedder based on feature hashing of word tokens.
+    Texts sharing words get similar vectors, so it is usable for benchmarks
+    and local tests without calling OpenAI.
+    """
+
+    def __init__(self, dim: int = 1536, latency: float = 0.0):
+        """
+        Args:
+            dim (int): Vector dimension (1536 matches text-embedding-ada-002)
+            latency (float): Simulated seconds per embedding call
+        """
+        self.dim = dim
+        self.latency = latency
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            vector[digest % self.dim] += 1.0 if (digest >> 63) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._embed(text)
+
+
+def batched(items: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """Yield lists of up to batch_size items without materializing the input."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class EmbeddingPipeline:
+    """
+    Embeds documents in fixed-size batches with a bounded number of concurrent
+    embedding calls, handing every finished batch to a sink (e.g. collection.add).
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: int = 256,
+        max_workers: int = 4,
+        max_retries: int = 3
+    ):
+        """
+        Args:
+            embeddings (Embeddings): Any LangChain embeddings implementation
+            batch_size (int): Number of texts sent per embed_documents call
+            max_workers (int): Maximum number of in-flight embedding batches
+            max_retries (int): Attempts per batch before the run is aborted
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_retries < 1:
+            raise ValueError("max_retries must be at least 1")
+
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+
+    # ----------------------------------------------------------------------
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch, retrying transient failures with exponential backoff."""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = 2 ** (attempt - 1)
+                logger.warning(f"Embedding batch failed ({e}); retry {attempt}/{self.max_retries - 1} in {delay}s")
+                time.sleep(delay)
+
+    # ----------------------------------------------------------------------
+    def run(self, items: Iterable[IngestItem], sink: BatchSink) -> Dict[str, float]:
+        """
+        Embed all items and stream each batch into the sink as soon as it is ready.
+
+        The sink is always called from the calling thread, so it does not need to
+        be thread-safe. Batches already handed to the sink stay persisted if a
+        later batch fails.
+
+        Returns:
+            Dict[str, float]: documents, batches, seconds and docs_per_sec
+        """
+        start = time.perf_counter()
+        documents = 0
+        batches = 0
+        in_flight: Dict[Future, List[IngestItem]] = {}
+
+        def drain(block_until: int) -> None:
+            nonlocal documents, batches
+            while len(in_flight) > block_until:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = in_flight.pop(future)
+                    ids, texts, metadatas = (list(column) for column in zip(*batch))
+                    sink(ids, texts, metadatas, future.result())
+                    documents += len(batch)
+                    batches += 1
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                for batch in batched(items, self.batch_size):
+                    drain(self.max_workers - 1)
+                    in_flight[executor.submit(self._embed_batch, [text for _, text, _ in batch])] = batch
+                drain(0)
+            except BaseException:
+                for future in in_flight:
+                    future.cancel()
+                raise
+
+        seconds = time.perf_counter() - start
+        return {
+            "documents": documents,
+            "batches": batches,
+            "seconds": seconds,
+            "docs_per_sec": documents / seconds if seconds > 0 else 0.0,
+        }
+
+
+def benchmark(
+    num_docs: int = 5000,
+    batch_size: int = 128,
+    latency: float = 0.05,
+    worker_counts: Tuple[int, ...] = (1, 2, 4, 8)
+) -> List[Dict[str, float]]:
+    """
+    Measure pipeline throughput offline with StubEmbeddings and a no-op sink.
+    """
+    embeddings = StubEmbeddings(latency=latency)
+    results = []
+    for workers in worker_counts:
+        items = (
+            (f"bench_{i}", f"Subject: ticket {i}\nDescription: login error code {i % 97}", {})
+            for i in range(num_docs)
+        )
+        pipeline = EmbeddingPipeline(embeddings, batch_size=batch_size, max_workers=workers)
+        stats = pipeline.run(items, lambda ids, texts, metadatas, vectors: None)
+        stats["max_workers"] = workers
+        results.append(stats)
+        print(f"workers={workers:<3} batches={stats['batches']:<5} {stats['docs_per_sec']:>10.1f} docs/sec")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
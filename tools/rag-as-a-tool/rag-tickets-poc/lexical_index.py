@@ -0,0 +1,181 @@
+from typing import List, Dict, Any, Optional, Iterable, Tuple, Set
+from collections import Counter
+import heapq
+import logging
+import math
+import os
+import pickle
+import re
+
+logger = logging.getLogger(__name__)
+
+# Keeps compound identifiers such as "err-1042" or "v2.3.1" together
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+_SPLIT_RE = re.compile(r"[-_./:]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokenizer for error codes, product and queue names.
+    Compound tokens are indexed whole and by their parts.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        parts = _SPLIT_RE.split(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    Local inverted index with Okapi BM25 scoring.
+
+    Supports incremental add/remove so it can be kept in step with the Chroma
+    collections, and is persisted as a single pickle file.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            path (str, optional): File the index is saved to and loaded from
+            k1 (float): Term frequency saturation
+            b (float): Document length normalization
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        # doc_id -> (content, metadata, length)
+        self.docs: Dict[str, Tuple[str, Dict[str, Any], int]] = {}
+        # term -> {doc_id: term frequency}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.total_length = 0
+
+    # ----------------------------------------------------------------------
+    def add(self, doc_id: str, content: str, metadata: Dict[str, Any]) -> None:
+        """Index a document, replacing any previous version with the same id."""
+        if doc_id in self.docs:
+            self.remove(doc_id)
+
+        counts = Counter(tokenize(content))
+        length = sum(counts.values())
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        self.docs[doc_id] = (content, metadata, length)
+        self.total_length += length
+
+    def add_many(self, items: Iterable[Tuple[str, str, Dict[str, Any]]]) -> None:
+        for doc_id, content, metadata in items:
+            self.add(doc_id, content, metadata)
+
+    def remove(self, doc_id: str) -> None:
+        """Remove a document if present."""
+        entry = self.docs.pop(doc_id, None)
+        if entry is None:
+            return
+        content, _, length = entry
+        for term in set(tokenize(content)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= length
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # ----------------------------------------------------------------------
+    def search(
+        self,
+        query: str,
+        support_type: Optional[str] = None,
+        k: int = 5,
+        allowed_ids: Optional[Set[str]] = None
+    ) -> List[Tuple[float, str, str, Dict[str, Any]]]:
+        """
+        Return the top-k (score, doc_id, content, metadata) tuples for a query.
+        If `allowed_ids` is given, only those documents are scored.
+        """
+        n_docs = len(self.docs)
+        if not n_docs:
+            return []
+
+        avg_length = self.total_length / n_docs
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                if allowed_ids is not None and doc_id not in allowed_ids:
+                    continue
+                length = self.docs[doc_id][2]
+                norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+
+        if support_type:
+            scores = {
+                doc_id: score for doc_id, score in scores.items()
+                if self.docs[doc_id][1].get("support_type") == support_type
+            }
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(score, doc_id, self.docs[doc_id][0], self.docs[doc_id][1]) for doc_id, score in top]
+
+    # ----------------------------------------------------------------------
+    def save(self, path: Optional[str] = None) -> None:
+        """Persist the index atomically."""
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given for saving the BM25 index")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {"k1": self.k1, "b": self.b, "docs": self.docs, "postings": self.postings,
+                 "total_length": self.total_length},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load a saved index, or return an empty one bound to `path` if none exists."""
+        index = cls(path)
+        if not os.path.exists(path):
+            return index
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        index.k1 = state["k1"]
+        index.b = state["b"]
+        index.docs = state["docs"]
+        index.postings = state["postings"]
+        index.total_length = state["total_length"]
+        logger.info(f"Loaded BM25 index with {len(index.docs)} documents from {path}")
+        return index
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: List[List[Dict[str, Any]]],
+    k: int = 5,
+    rrf_k: int = 60
+) -> List[Dict[str, Any]]:
+    """
+    Fuse ranked result lists with reciprocal-rank fusion.
+
+    Results are matched on metadata['ticket_id'] (falling back to content); the
+    first list's entry is kept for each ticket and an 'rrf_score' is added.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    scores: Dict[str, float] = {}
+    for results in ranked_lists:
+        for rank, result in enumerate(results, 1):
+            key = result["metadata"].get("ticket_id") or result["content"]
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            fused.setdefault(key, result)
+
+    top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+    return [{**fused[key], "rrf_score": score} for key, score in top]
@@ -0,0 +1,204 @@
+"""
+Load test for the HTTP service (server.py) with stubbed model backends.
+
+Builds a synthetic store with StubEmbeddings, starts uvicorn with several
+workers and RAG_STUB_MODELS=1 (no OpenAI calls), and drives the search,
+answer and streaming endpoints at increasing concurrency. Reports
+throughput, latency percentiles, time to first token and how many requests
+admission control rejected with 503. Run from the directory containing the
+package:
+
+    python -m src.load_test
+"""
+from typing import List, Dict, Any, Tuple
+import asyncio
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from .benchmark_retrieval import generate_tickets, make_queries, percentiles
+from .document_loaders_implemented import SupportDocumentLoader
+from .ingest import StubEmbeddings
+from .vector_backends import create_backend
+from .vector_store import SupportVectorStore
+
+STUB_EMBEDDING_DIM = 256
+
+
+def build_store(directory: str, num_tickets: int, backend: str) -> List[Dict[str, Any]]:
+    data_dir = tempfile.mkdtemp(prefix="rag-load-data-")
+    try:
+        tickets = generate_tickets(data_dir, num_tickets)
+        store = SupportVectorStore(
+            directory, embeddings=StubEmbeddings(dim=STUB_EMBEDDING_DIM), backend=create_backend(directory, backend)
+        )
+        store.create_vector_store(SupportDocumentLoader(data_dir).iter_tickets())
+        return tickets
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def start_server(store_dir: str, backend: str, workers: int, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{__package__}.server:app",
+         "--workers", str(workers), "--port", str(port), "--log-level", "warning"],
+        env={
+            **os.environ,
+            "VECTOR_STORE_DIR": store_dir,
+            "VECTOR_BACKEND": backend,
+            "RAG_STUB_MODELS": "1",
+            "STUB_EMBEDDING_DIM": str(STUB_EMBEDDING_DIM),
+            "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "sk-offline-load-test"),
+            **env,
+        }
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+async def one_request(client: httpx.AsyncClient, endpoint: str, query: str) -> Tuple[int, float, float]:
+    """Returns (status, seconds, seconds to first token or NaN)."""
+    start = time.perf_counter()
+    first_token = float("nan")
+    body = {"query": query, "hybrid": True}
+    try:
+        if endpoint == "/answer/stream":
+            async with client.stream("POST", endpoint, json=body) as response:
+                async for line in response.aiter_lines():
+                    if line == "event: token" and math.isnan(first_token):
+                        first_token = time.perf_counter() - start
+                status = response.status_code
+        else:
+            status = (await client.post(endpoint, json=body)).status_code
+    except httpx.TransportError:
+        status = 0
+    return status, time.perf_counter() - start, first_token
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    queries: List[str],
+    concurrency: int,
+    num_requests: int
+) -> Dict[str, Any]:
+    """Keep `concurrency` requests open until `num_requests` are done."""
+    pending = iter(range(num_requests))
+    outcomes: List[Tuple[int, float, float]] = []
+
+    async def user() -> None:
+        for i in pending:
+            outcomes.append(await one_request(client, endpoint, queries[i % len(queries)]))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ok = [o for o in outcomes if o[0] == 200]
+    result = {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(outcomes),
+        "ok": len(ok),
+        "rejected_503": sum(1 for o in outcomes if o[0] == 503),
+        "errors": sum(1 for o in outcomes if o[0] not in (200, 503)),
+        "throughput_rps": len(ok) / elapsed,
+    }
+    if ok:
+        result["latency"] = percentiles([o[1] * 1000 for o in ok])
+        first_tokens = [o[2] * 1000 for o in ok if not math.isnan(o[2])]
+        if first_tokens:
+            result["first_token"] = percentiles(first_tokens)
+    return result
+
+
+async def drive(port: int, queries: List[str], endpoints: Tuple[str, ...], levels: Tuple[int, ...], requests_per_level: int) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60.0, limits=limits) as client:
+        await wait_ready(client)
+        results = []
+        for endpoint in endpoints:
+            for concurrency in levels:
+                result = await run_level(client, endpoint, queries, concurrency, max(requests_per_level, concurrency))
+                results.append(result)
+                latency = result.get("latency", {})
+                print(
+                    f"{endpoint:<15} c={concurrency:<4} {result['throughput_rps']:8.1f} req/s  "
+                    f"p50={latency.get('p50_ms', 0):7.1f} p99={latency.get('p99_ms', 0):7.1f} ms  "
+                    f"503={result['rejected_503']:<4} errors={result['errors']}"
+                )
+        return results
+
+
+def run_load_test(
+    num_tickets: int = 5000,
+    backend: str = "int8",
+    workers: int = 4,
+    port: int = 8765,
+    endpoints: Tuple[str, ...] = ("/search", "/answer", "/answer/stream"),
+    levels: Tuple[int, ...] = (1, 16, 64, 256),
+    requests_per_level: int = 400,
+    max_in_flight: int = 16,
+    max_queue: int = 32,
+    llm_latency: float = 0.3,
+    answer_cache: bool = False,
+    output_path: str = "load_test_results.json"
+) -> Dict[str, Any]:
+    """
+    With the defaults, the top level (256 open requests against 4 workers x
+    (16 in flight + 32 queued)) deliberately exceeds capacity, so it shows
+    admission control shedding load with 503s rather than queueing without bound.
+
+    The answer cache is off by default so /answer latencies measure
+    generation; with `answer_cache=True` the workers share one cache file and
+    repeated queries are mostly answered from it, so report those runs separately.
+    """
+    store_dir = tempfile.mkdtemp(prefix="rag-load-store-")
+    server = None
+    try:
+        tickets = build_store(store_dir, num_tickets, backend)
+        queries = make_queries(tickets, 500)
+        server = start_server(store_dir, backend, workers, port, {
+            "MAX_IN_FLIGHT": str(max_in_flight),
+            "MAX_QUEUE": str(max_queue),
+            "QUEUE_TIMEOUT": "5",
+            "STUB_LLM_LATENCY": str(llm_latency),
+            "ANSWER_CACHE": "1" if answer_cache else "0",
+        })
+        results = asyncio.run(drive(port, queries, endpoints, levels, requests_per_level))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {"num_tickets": num_tickets, "backend": backend, "workers": workers,
+                   "max_in_flight": max_in_flight, "max_queue": max_queue, "llm_latency": llm_latency,
+                   "answer_cache": answer_cache},
+        "results": results,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output_path}")
+    return report
+
+
+if __name__ == "__main__":
+    run_load_test()
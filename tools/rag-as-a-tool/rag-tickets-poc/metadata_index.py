@@ -0,0 +1,129 @@
+from typing import List, Dict, Any, Optional, Set, Iterable, Tuple
+import logging
+import os
+import pickle
+
+logger = logging.getLogger(__name__)
+
+# Ticket fields from SupportDocumentLoader.get_json_metadata that can be filtered on
+INDEXED_FIELDS = ("support_type", "type", "queue", "priority", "language", "source", "tags")
+
+
+class MetadataIndex:
+    """
+    In-memory secondary indexes (field -> value -> ticket ids) over ticket metadata.
+
+    Used to resolve filters before the vector search: collections without any
+    matching ticket are skipped entirely, and the BM25 side only scores
+    matching tickets. Persisted as a single pickle file next to Chroma.
+    """
+
+    def __init__(self, path: Optional[str] = None, fields: Tuple[str, ...] = INDEXED_FIELDS):
+        self.path = path
+        self.fields = fields
+        # field -> value -> ids
+        self.postings: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in fields}
+        # id -> (collection, {field: values}) for removal and per-collection counts
+        self.docs: Dict[str, Tuple[str, Dict[str, List[Any]]]] = {}
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _values(value: Any) -> List[Any]:
+        if value is None or value == "":
+            return []
+        return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+    def add(self, doc_id: str, metadata: Dict[str, Any], collection: Optional[str] = None) -> None:
+        """
+        Index a ticket's metadata, replacing any previous entry.
+        `collection` defaults to the ticket's support_type.
+        """
+        if doc_id in self.docs:
+            self.remove(doc_id)
+
+        indexed = {}
+        for field in self.fields:
+            values = self._values(metadata.get(field))
+            for value in values:
+                self.postings[field].setdefault(value, set()).add(doc_id)
+            indexed[field] = values
+        self.docs[doc_id] = (collection or str(metadata.get("support_type", "")), indexed)
+
+    def add_many(self, items: Iterable[Tuple[str, Dict[str, Any]]], collection: Optional[str] = None) -> None:
+        for doc_id, metadata in items:
+            self.add(doc_id, metadata, collection=collection)
+
+    def remove(self, doc_id: str) -> None:
+        entry = self.docs.pop(doc_id, None)
+        if entry is None:
+            return
+        for field, values in entry[1].items():
+            for value in values:
+                ids = self.postings[field].get(value)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del self.postings[field][value]
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # ----------------------------------------------------------------------
+    def match(self, filters: Dict[str, Any]) -> Set[str]:
+        """
+        Return the ids matching all filters.
+
+        A scalar matches by equality, a list on a scalar field matches any of
+        its values, and a list on a list field (e.g. tags) requires every value.
+        """
+        result: Optional[Set[str]] = None
+        for field, wanted in filters.items():
+            if field not in self.postings:
+                raise ValueError(f"Field '{field}' is not indexed; indexed fields: {', '.join(self.fields)}")
+            index = self.postings[field]
+            values = self._values(wanted)
+            if field == "tags":
+                ids = set.intersection(*(index.get(v, set()) for v in values)) if values else set()
+            else:
+                ids = set().union(*(index.get(v, set()) for v in values))
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result if result is not None else set(self.docs)
+
+    def count_by_collection(self, ids: Iterable[str]) -> Dict[str, int]:
+        """Number of the given tickets stored in each collection."""
+        counts: Dict[str, int] = {}
+        for doc_id in ids:
+            collection = self.docs[doc_id][0]
+            counts[collection] = counts.get(collection, 0) + 1
+        return counts
+
+    def values(self, field: str) -> List[Any]:
+        """Distinct values of an indexed field, e.g. to populate UI filters."""
+        return sorted(self.postings.get(field, {}), key=str)
+
+    # ----------------------------------------------------------------------
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given for saving the metadata index")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"fields": self.fields, "postings": self.postings, "docs": self.docs}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "MetadataIndex":
+        """Load a saved index, or return an empty one bound to `path` if none exists."""
+        index = cls(path)
+        if not os.path.exists(path):
+            return index
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        index.fields = state["fields"]
+        index.postings = state["postings"]
+        index.docs = state["docs"]
+        logger.info(f"Loaded metadata index with {len(index.docs)} tickets from {path}")
+        return index
@@ -0,0 +1,667 @@
+"""
+Quantized, memory-mapped local vector index usable as a SupportVectorStore backend.
+
+Each collection is a directory holding:
+    config.json     dimension, quantization and PQ settings
+    docs.sqlite3    row -> (id, document, metadata), with tombstones for deletes
+    codes.bin       int8 codes (one per dimension) or PQ codes (one byte per subvector)
+    scales.f32      per-vector int8 scale factors (int8 only)
+    codebooks.npy   PQ centroids (pq only)
+    vectors.f32     exact, normalized float32 vectors used to re-rank candidates
+
+All vector files are opened with np.memmap, so opening a collection reads no
+vectors at all. Searches scan the compact codes and re-rank the best
+`rerank_factor * k` candidates with the exact vectors, of which only those
+rows are paged in.
+"""
+from typing import List, Dict, Any, Optional, Tuple
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import numpy as np
+from .vector_backends import VectorBackend, VectorCollection
+
+logger = logging.getLogger(__name__)
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+# Rows scored per step, bounding the temporary memory of a scan
+SCAN_CHUNK = 65536
+
+_SQL_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def _nearest_centroids(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid for each row of x (squared L2)."""
+    return np.argmax(x @ centroids.T - 0.5 * np.sum(centroids * centroids, axis=1), axis=1)
+
+
+def _where_sql(where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    Translate a Chroma `where` clause into SQL over the JSON metadata column.
+    Supports $and, $or, $eq, $ne, $gt, $gte, $lt, $lte, $in and $nin.
+    """
+    clauses: List[str] = []
+    params: List[Any] = []
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            parts = [_where_sql(sub) for sub in condition]
+            joiner = " AND " if key == "$and" else " OR "
+            clauses.append("(" + joiner.join(sql for sql, _ in parts) + ")")
+            for _, sub_params in parts:
+                params.extend(sub_params)
+            continue
+
+        path = '$."' + key.replace('"', '\\"') + '"'
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, value in condition.items():
+            if op in _SQL_OPERATORS:
+                clauses.append(f"json_extract(metadata, ?) {_SQL_OPERATORS[op]} ?")
+                params.extend([path, value])
+            elif op in ("$in", "$nin"):
+                placeholders = ",".join("?" * len(value))
+                negate = "NOT " if op == "$nin" else ""
+                clauses.append(f"json_extract(metadata, ?) {negate}IN ({placeholders})")
+                params.extend([path, *value])
+            else:
+                raise ValueError(f"Unsupported where operator '{op}'")
+    return " AND ".join(clauses) or "1", params
+
+
+class QuantizedCollection(VectorCollection):
+    """
+    One collection of the quantized index, with the Chroma collection API.
+
+    Vectors are normalized on insert, so similarities are cosine similarities
+    and distances are returned as 1 - similarity.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        name: str,
+        quantization: str = "int8",
+        pq_subvectors: Optional[int] = None,
+        rerank_factor: int = 10,
+        pq_train_size: int = 4096
+    ):
+        """
+        Args:
+            directory (str): Directory holding the collection files
+            name (str): Collection name
+            quantization (str): "int8" (4x smaller than float32) or "pq"
+            pq_subvectors (int, optional): PQ code bytes per vector, defaults to dim // 16
+            rerank_factor (int): Candidates re-ranked with exact vectors, as a multiple of k
+            pq_train_size (int): Maximum number of vectors the PQ codebooks are trained on
+        """
+        if quantization not in ("int8", "pq"):
+            raise ValueError(f"Unknown quantization '{quantization}'. Use 'int8' or 'pq'.")
+
+        os.makedirs(directory, exist_ok=True)
+        self.name = name
+        self.directory = directory
+        self.rerank_factor = rerank_factor
+        self.pq_train_size = pq_train_size
+        self._lock = threading.RLock()
+
+        self.config = {"quantization": quantization, "dim": None, "pq_subvectors": pq_subvectors, "trained_rows": 0}
+        config_path = self._path("config.json")
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                self.config.update(json.load(f))
+
+        self._conn = sqlite3.connect(self._path("docs.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " row INTEGER PRIMARY KEY,"
+            " id TEXT NOT NULL,"
+            " document TEXT,"
+            " metadata TEXT,"
+            " live INTEGER NOT NULL DEFAULT 1)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_id ON docs(id)")
+        self._n_rows = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM docs").fetchone()[0]
+        if self.dim:
+            self._truncate_files()
+
+        self._maps: Optional[Dict[str, np.ndarray]] = None
+        self._dead: Optional[np.ndarray] = None
+        # Bumped by compact(), which renumbers rows; map snapshots record the one they were taken at
+        self._generation = 0
+
+    # ----------------------------------------------------------------------
+    @property
+    def dim(self) -> Optional[int]:
+        return self.config["dim"]
+
+    @property
+    def quantization(self) -> str:
+        return self.config["quantization"]
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def _code_width(self) -> int:
+        return self.dim if self.quantization == "int8" else self.config["pq_subvectors"]
+
+    def _code_dtype(self) -> type:
+        return np.int8 if self.quantization == "int8" else np.uint8
+
+    def _files(self) -> List[Tuple[str, int]]:
+        """(file name, bytes per row) of every per-row file."""
+        files = [("vectors.f32", 4 * self.dim), ("codes.bin", self._code_width())]
+        if self.quantization == "int8":
+            files.append(("scales.f32", 4))
+        return files
+
+    def _save_config(self) -> None:
+        tmp_path = self._path("config.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.config, f)
+        os.replace(tmp_path, self._path("config.json"))
+
+    def _truncate_files(self) -> None:
+        """Drop rows written after the last committed insert (e.g. after a crash)."""
+        for filename, row_bytes in self._files():
+            path = self._path(filename)
+            expected = self._n_rows * row_bytes
+            if os.path.exists(path) and os.path.getsize(path) > expected:
+                with open(path, "r+b") as f:
+                    f.truncate(expected)
+
+    def _mapped(self) -> Dict[str, Any]:
+        """Memory-map the vector files for the current number of rows."""
+        with self._lock:
+            if self._maps is None:
+                n = self._n_rows
+                maps: Dict[str, Any] = {"rows": n, "generation": self._generation}
+                if n:
+                    maps["vectors"] = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(n, self.dim))
+                    maps["codes"] = np.memmap(self._path("codes.bin"), dtype=self._code_dtype(), mode="r", shape=(n, self._code_width()))
+                    if self.quantization == "int8":
+                        maps["scales"] = np.memmap(self._path("scales.f32"), dtype=np.float32, mode="r", shape=(n,))
+                    else:
+                        maps["codebooks"] = np.load(self._path("codebooks.npy"))
+                self._maps = maps
+            return self._maps
+
+    def _dead_rows(self) -> np.ndarray:
+        with self._lock:
+            if self._dead is None:
+                rows = self._conn.execute("SELECT row FROM docs WHERE live = 0").fetchall()
+                self._dead = np.fromiter((r for r, in rows), dtype=np.int64, count=len(rows))
+            return self._dead
+
+    # ----------------------------------------------------------------------
+    def _train_codebooks(self, vectors: np.ndarray, iterations: int = 10) -> np.ndarray:
+        """k-means codebooks (up to 256 centroids) for each PQ subvector."""
+        m = self.config["pq_subvectors"]
+        sub_dim = self.dim // m
+        rng = np.random.default_rng(0)
+        if len(vectors) > self.pq_train_size:
+            vectors = vectors[rng.choice(len(vectors), self.pq_train_size, replace=False)]
+        n_centroids = min(256, len(vectors))
+
+        codebooks = np.empty((m, n_centroids, sub_dim), dtype=np.float32)
+        for j in range(m):
+            x = vectors[:, j * sub_dim:(j + 1) * sub_dim]
+            centroids = x[rng.choice(len(x), n_centroids, replace=False)].copy()
+            for _ in range(iterations):
+                assign = _nearest_centroids(x, centroids)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, x)
+                counts = np.bincount(assign, minlength=n_centroids)
+                filled = counts > 0
+                centroids[filled] = sums[filled] / counts[filled, None]
+            codebooks[j] = centroids
+        return codebooks
+
+    def _encode(self, vectors: np.ndarray, codebooks: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Return (codes, int8 scales or None) for normalized vectors."""
+        if self.quantization == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+            return codes, scales.astype(np.float32)
+
+        m = codebooks.shape[0]
+        sub_dim = self.dim // m
+        codes = np.empty((len(vectors), m), dtype=np.uint8)
+        for j in range(m):
+            codes[:, j] = _nearest_centroids(vectors[:, j * sub_dim:(j + 1) * sub_dim], codebooks[j])
+        return codes, None
+
+    def _init_dim(self, dim: int) -> None:
+        self.config["dim"] = dim
+        if self.quantization == "pq":
+            m = self.config["pq_subvectors"] or max(1, dim // 16)
+            if dim % m:
+                raise ValueError(f"pq_subvectors ({m}) must divide the vector dimension ({dim})")
+            self.config["pq_subvectors"] = m
+        self._save_config()
+
+    # ----------------------------------------------------------------------
+    def upsert(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: List[List[float]]
+    ) -> None:
+        """Append the vectors and tombstone previous versions of the same ids."""
+        if not ids:
+            return
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+
+        with self._lock:
+            if self.dim is None:
+                self._init_dim(vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {self.dim}")
+
+            codebooks = None
+            if self.quantization == "pq":
+                if self.config["trained_rows"]:
+                    codebooks = np.load(self._path("codebooks.npy"))
+                else:
+                    codebooks = self._train_codebooks(vectors)
+                    np.save(self._path("codebooks.npy"), codebooks)
+                    self.config["trained_rows"] = len(vectors)
+                    self._save_config()
+            codes, scales = self._encode(vectors, codebooks)
+
+            # The last occurrence of an id within the batch wins
+            last = {doc_id: i for i, doc_id in enumerate(ids)}
+            start = self._n_rows
+            try:
+                # Vectors first: rows beyond the last committed insert are dropped on open
+                for filename, data in (("vectors.f32", vectors), ("codes.bin", codes), ("scales.f32", scales)):
+                    if data is not None:
+                        with open(self._path(filename), "ab") as f:
+                            f.write(data.tobytes())
+
+                self._conn.execute("BEGIN")
+                self._set_dead(list(last))
+                self._conn.executemany(
+                    "INSERT INTO docs (row, id, document, metadata, live) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (start + i, doc_id, doc, json.dumps(meta or {}, ensure_ascii=False), int(last[doc_id] == i))
+                        for i, (doc_id, doc, meta) in enumerate(zip(ids, documents, metadatas))
+                    ]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                # Drop the rows just appended, so later upserts line up with the docs table
+                self._truncate_files()
+                raise
+            self._n_rows += len(ids)
+            self._maps = None
+            self._dead = None
+
+        if self.quantization == "pq" and self.config["trained_rows"] < self.pq_train_size \
+                and self.count() >= 4 * self.config["trained_rows"]:
+            self.train()
+
+    def _set_dead(self, ids: List[str]) -> None:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            self._conn.execute(f"UPDATE docs SET live = 0 WHERE live = 1 AND id IN ({placeholders})", chunk)
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            self._set_dead(list(ids))
+            self._dead = None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs WHERE live = 1").fetchone()[0]
+
+    # ----------------------------------------------------------------------
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        include: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None
+    ) -> Dict[str, Any]:
+        include = include or ["documents", "metadatas"]
+        sql = "SELECT row, id, document, metadata FROM docs WHERE live = 1"
+        params: List[Any] = []
+        if ids is not None:
+            sql += f" AND id IN ({','.join('?' * len(ids))})"
+            params.extend(ids)
+        sql += " ORDER BY row LIMIT ? OFFSET ?"
+        params.extend([-1 if limit is None else limit, offset or 0])
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        result: Dict[str, Any] = {"ids": [r[1] for r in rows], "documents": None, "metadatas": None}
+        if "documents" in include:
+            result["documents"] = [r[2] for r in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(r[3]) for r in rows]
+        if "embeddings" in include:
+            vectors = self._mapped().get("vectors")
+            result["embeddings"] = [vectors[r[0]].tolist() for r in rows]
+        return result
+
+    # ----------------------------------------------------------------------
+    def _approx_scores(self, maps: Dict[str, Any], query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Approximate similarity from the codes, for all rows or the given ones."""
+        codes = maps["codes"]
+        total = maps["rows"] if rows is None else len(rows)
+        if self.quantization == "pq":
+            m, _, sub_dim = maps["codebooks"].shape
+            # Per-subvector lookup table of centroid . query
+            table = np.einsum("mkd,md->mk", maps["codebooks"], query.reshape(m, sub_dim))
+            subvectors = np.arange(m)
+
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, SCAN_CHUNK):
+            chunk = slice(start, start + SCAN_CHUNK) if rows is None else rows[start:start + SCAN_CHUNK]
+            if self.quantization == "int8":
+                scores[start:start + SCAN_CHUNK] = (codes[chunk].astype(np.float32) @ query) * maps["scales"][chunk]
+            else:
+                scores[start:start + SCAN_CHUNK] = table[subvectors, codes[chunk]].sum(axis=1)
+        return scores
+
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        maps = self._mapped()
+        for query_emb in query_embeddings:
+            query = _normalize(np.asarray(query_emb, dtype=np.float32))
+            hits = self._query_one(maps, query, n_results, where)
+            while hits is None:
+                # compact() renumbered the rows mid-query; search the new snapshot
+                maps = self._mapped()
+                hits = self._query_one(maps, query, n_results, where)
+            result["ids"].append([h[1] for h in hits])
+            result["documents"].append([h[2] for h in hits])
+            result["metadatas"].append([h[3] for h in hits])
+            result["distances"].append([float(1.0 - h[0]) for h in hits])
+        return result
+
+    def _query_one(
+        self,
+        maps: Dict[str, Any],
+        query: np.ndarray,
+        k: int,
+        where: Optional[Dict[str, Any]]
+    ) -> Optional[List[Tuple[float, str, str, Dict[str, Any]]]]:
+        """Top-k hits from a map snapshot, or None if compact() has since renumbered its rows."""
+        if not maps["rows"] or k < 1:
+            return []
+
+        if where:
+            sql, params = _where_sql(where)
+            with self._lock:
+                if maps["generation"] != self._generation:
+                    return None
+                matched = self._conn.execute(
+                    f"SELECT row FROM docs WHERE live = 1 AND row < ? AND ({sql}) ORDER BY row",
+                    [maps["rows"], *params]
+                ).fetchall()
+            rows = np.fromiter((r for r, in matched), dtype=np.int64, count=len(matched))
+            if not len(rows):
+                return []
+            scores = self._approx_scores(maps, query, rows)
+        else:
+            rows = None
+            scores = self._approx_scores(maps, query, None)
+            dead = self._dead_rows()
+            scores[dead[dead < maps["rows"]]] = -np.inf
+
+        # Exact re-rank of the best candidates from the compact codes
+        n_candidates = min(len(scores), k * max(1, self.rerank_factor))
+        candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+        candidates = candidates[np.isfinite(scores[candidates])]
+        candidate_rows = np.sort(candidates if rows is None else rows[candidates])
+        exact = maps["vectors"][candidate_rows] @ query
+        order = np.argsort(-exact)[:k]
+        top_rows = candidate_rows[order]
+        if not len(top_rows):
+            return []
+
+        with self._lock:
+            if maps["generation"] != self._generation:
+                return None
+            placeholders = ",".join("?" * len(top_rows))
+            stored = {
+                row: (doc_id, doc, meta)
+                for row, doc_id, doc, meta in self._conn.execute(
+                    f"SELECT row, id, document, metadata FROM docs WHERE row IN ({placeholders})",
+                    [int(r) for r in top_rows]
+                )
+            }
+        hits = []
+        for row, similarity in zip(top_rows, exact[order]):
+            doc_id, doc, meta = stored[int(row)]
+            hits.append((float(similarity), doc_id, doc, json.loads(meta)))
+        return hits
+
+    # ----------------------------------------------------------------------
+    def train(self) -> None:
+        """Retrain the PQ codebooks on a sample of the stored vectors and re-encode every row."""
+        if self.quantization != "pq":
+            return
+        with self._lock:
+            maps = self._mapped()
+            if not maps["rows"]:
+                return
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(rng.choice(maps["rows"], min(maps["rows"], self.pq_train_size), replace=False))
+            codebooks = self._train_codebooks(np.asarray(maps["vectors"][sample_rows]))
+
+            tmp_path = self._path("codes.bin.tmp")
+            with open(tmp_path, "wb") as f:
+                for start in range(0, maps["rows"], SCAN_CHUNK):
+                    codes, _ = self._encode(np.asarray(maps["vectors"][start:start + SCAN_CHUNK]), codebooks)
+                    f.write(codes.tobytes())
+            self._maps = None
+            del maps
+            np.save(self._path("codebooks.npy"), codebooks)
+            os.replace(tmp_path, self._path("codes.bin"))
+            self.config["trained_rows"] = len(sample_rows)
+            self._save_config()
+        logger.info(f"Retrained PQ codebooks for '{self.name}' on {len(sample_rows)} vectors.")
+
+    def compact(self) -> None:
+        """Rewrite the collection without deleted or superseded rows."""
+        with self._lock:
+            maps = self._mapped()
+            live = [r for r, in self._conn.execute("SELECT row FROM docs WHERE live = 1 ORDER BY row")]
+            if len(live) == maps["rows"]:
+                return
+
+            live_rows = np.asarray(live, dtype=np.int64)
+            for filename, _ in self._files():
+                source = {"vectors.f32": "vectors", "codes.bin": "codes", "scales.f32": "scales"}[filename]
+                with open(self._path(filename + ".tmp"), "wb") as f:
+                    for start in range(0, len(live_rows), SCAN_CHUNK):
+                        f.write(np.asarray(maps[source][live_rows[start:start + SCAN_CHUNK]]).tobytes())
+            self._maps = None
+            del maps
+
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM docs WHERE live = 0")
+                self._conn.execute(
+                    "CREATE TEMP TABLE renumber AS"
+                    " SELECT row AS old, ROW_NUMBER() OVER (ORDER BY row) - 1 AS new FROM docs"
+                )
+                # Go through negative rows so the primary key never collides
+                self._conn.execute("UPDATE docs SET row = -1 - (SELECT new FROM renumber WHERE old = docs.row)")
+                self._conn.execute("UPDATE docs SET row = -1 - row")
+                self._conn.execute("DROP TABLE renumber")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            for filename, _ in self._files():
+                os.replace(self._path(filename + ".tmp"), self._path(filename))
+            self._n_rows = len(live_rows)
+            self._dead = None
+            self._generation += 1
+        logger.info(f"Compacted '{self.name}' to {len(live_rows)} rows.")
+
+    def dead_fraction(self) -> float:
+        with self._lock:
+            return len(self._dead_rows()) / self._n_rows if self._n_rows else 0.0
+
+    def memory_bytes(self) -> Dict[str, int]:
+        """Bytes of the scanned codes versus the exact vectors left on disk."""
+        if not self.dim:
+            return {"codes": 0, "vectors": 0}
+        code_bytes = self._n_rows * self._code_width() + (4 * self._n_rows if self.quantization == "int8" else 0)
+        return {"codes": code_bytes, "vectors": self._n_rows * 4 * self.dim}
+
+    def close(self) -> None:
+        with self._lock:
+            self._maps = None
+            self._conn.close()
+
+
+class QuantizedBackend(VectorBackend):
+    """
+    Local backend storing each collection as a QuantizedCollection directory.
+
+    Collections are opened on first access, which only reads their config
+    and maps the vector files, so loading a store does no per-vector work.
+    """
+
+    def __init__(self, directory: str, quantization: str = "int8", compact_threshold: float = 0.25, **options):
+        """
+        Args:
+            directory (str): Root directory, one sub-directory per collection
+            quantization (str): "int8" or "pq" for new collections
+            compact_threshold (float): Dead-row fraction above which persist() compacts a collection
+            **options: Passed to QuantizedCollection (pq_subvectors, rerank_factor, pq_train_size)
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.quantization = quantization
+        self.compact_threshold = compact_threshold
+        self.options = options
+        self._collections: Dict[str, QuantizedCollection] = {}
+        self._lock = threading.Lock()
+
+    def _open(self, name: str) -> QuantizedCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = QuantizedCollection(
+                    os.path.join(self.directory, name), name, quantization=self.quantization, **self.options
+                )
+            return self._collections[name]
+
+    def get_or_create_collection(self, name: str) -> QuantizedCollection:
+        if not _NAME_RE.match(name):
+            raise ValueError(f"Invalid collection name '{name}'")
+        return self._open(name)
+
+    def get_collection(self, name: str) -> QuantizedCollection:
+        if name not in self.list_collections():
+            raise ValueError(f"Collection '{name}' does not exist")
+        return self._open(name)
+
+    def list_collections(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if os.path.exists(os.path.join(self.directory, name, "docs.sqlite3"))
+        )
+
+    def delete_collection(self, name: str) -> None:
+        with self._lock:
+            collection = self._collections.pop(name, None)
+        if collection is not None:
+            collection.close()
+        shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def persist(self) -> None:
+        """Compact collections where deletes and updates left many dead rows."""
+        for collection in list(self._collections.values()):
+            if collection.dead_fraction() > self.compact_threshold:
+                collection.compact()
+
+
+def benchmark(
+    num_docs: int = 20000,
+    dim: int = 1536,
+    k: int = 10,
+    num_queries: int = 50
+) -> List[Dict[str, float]]:
+    """
+    Compare int8 and PQ collections with exact search on random clustered vectors:
+    bytes scanned per vector, open time, query latency and recall@k.
+    Run with `python -m src.quantized_index`.
+    """
+    import tempfile
+
+    rng = np.random.default_rng(42)
+    centers = rng.normal(size=(200, dim))
+    vectors = _normalize(centers[rng.integers(0, 200, num_docs)] + 0.5 * rng.normal(size=(num_docs, dim)))
+    queries = _normalize(vectors[rng.integers(0, num_docs, num_queries)] + 0.1 * rng.normal(size=(num_queries, dim)))
+    truth = [set(np.argsort(-(vectors @ q))[:k]) for q in queries]
+    ids = [str(i) for i in range(num_docs)]
+
+    results = []
+    for quantization in ("int8", "pq"):
+        directory = tempfile.mkdtemp(prefix=f"quantized-{quantization}-")
+        collection = QuantizedCollection(directory, "bench", quantization=quantization)
+        for start in range(0, num_docs, 5000):
+            end = start + 5000
+            collection.upsert(ids[start:end], [""] * len(ids[start:end]), [{}] * len(ids[start:end]), vectors[start:end])
+        collection.close()
+
+        start = time.perf_counter()
+        collection = QuantizedCollection(directory, "bench")
+        collection.count()
+        open_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        recall = 0.0
+        for q, expected in zip(queries, truth):
+            found = collection.query([q.tolist()], n_results=k)["ids"][0]
+            recall += len(expected & {int(i) for i in found}) / k
+        query_ms = (time.perf_counter() - start) * 1000 / num_queries
+
+        footprint = collection.memory_bytes()
+        stats = {
+            "quantization": quantization,
+            "compression": footprint["vectors"] / footprint["codes"],
+            "open_ms": open_ms,
+            "query_ms": query_ms,
+            f"recall@{k}": recall / num_queries,
+        }
+        results.append(stats)
+        print(
+            f"{quantization:<5} {stats['compression']:5.1f}x smaller   open={open_ms:6.2f} ms   "
+            f"query={query_ms:6.2f} ms   recall@{k}={stats[f'recall@{k}']:.3f}"
+        )
+        collection.close()
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
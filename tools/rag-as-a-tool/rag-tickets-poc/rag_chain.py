@@ -1,9 +1,17 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from langchain.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
+from openai import RateLimitError
 import asyncio
 import logging
+import time
 from .vector_store import SupportVectorStore
+from .answer_cache import SemanticAnswerCache
+from .reranker import CrossEncoderReranker
+from .context_builder import ContextBuilder
+from .lexical_index import reciprocal_rank_fusion
+from .rate_limit import RateLimiter
+from .tracing import Span, span, resume
 import os
 from dotenv import load_dotenv, find_dotenv
 
@@ -18,12 +26,29 @@ class SupportRAGChain:
     Retrieval-Augmented Generation (RAG) chain for support tickets.
     """
 
-    def __init__(self, vector_store: SupportVectorStore):
+    def __init__(
+        self,
+        vector_store: SupportVectorStore,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        reranker: Optional[CrossEncoderReranker] = None,
+        rerank_candidates: int = 20,
+        context_builder: Optional[ContextBuilder] = None
+    ):
         """
         Initialize the RAG chain with vector store and LLM.
         llm = OpenAI GPT-4o
+        An optional semantic answer cache short-circuits generation for repeated questions.
+        With a reranker, `rerank_candidates` tickets are retrieved and only the
+        top-k by cross-encoder score are kept.
+        The context builder packs the tickets into a token budget (3000 by default).
         """
         self.vector_store = vector_store
+        self.answer_cache = answer_cache
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.context_builder = context_builder or ContextBuilder()
+        # Span tree of the last query, astream_query or abatch_query call, for debugging
+        self.last_trace: Optional[Span] = None
         self.llm = ChatOpenAI(model="gpt-4o", temperature=0.3)
         self.prompt = ChatPromptTemplate.from_template(
             "You are a helpful technical support assistant.\n"
@@ -34,15 +59,36 @@ class SupportRAGChain:
         )
         logger.info("✅ RAG chain initialized successfully.")
 
+    # ----------------------------------------------------------------------
+    def _rerank_span(self, candidates: int):
+        return span("rerank", model=self.reranker.model_name, candidates=candidates)
+
+    @staticmethod
+    def _record_usage(s: Span, usage: Optional[Dict[str, Any]]) -> None:
+        if usage:
+            s.set(
+                prompt_tokens=usage.get("input_tokens"),
+                completion_tokens=usage.get("output_tokens"),
+                total_tokens=usage.get("total_tokens")
+            )
+
     # ----------------------------------------------------------------------
     def get_relevant_documents(
         self, 
         query: str, 
         support_type: Optional[str] = None, 
-        k: int = 3
+        k: int = 3,
+        hybrid: bool = False,
+        query_emb: Optional[List[float]] = None,
+        filters: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """
         Retrieve relevant support tickets for a given query.
+        Set `hybrid` to fuse vector and BM25 keyword results, and `filters`
+        (e.g. {"priority": "high"}) to only consider matching tickets.
+
+        Raises:
+            ValueError: If the query is empty or too short, or a filter field is not indexed
         """
         if not query or not query.strip():
             raise ValueError("Query cannot be empty")
@@ -50,66 +96,426 @@ class SupportRAGChain:
             raise ValueError("Query too short. Please provide more details.")
 
         try:
-            docs = self.vector_store.query_similar(query, support_type=support_type, k=k)
-            return docs
+            n = max(k, self.rerank_candidates) if self.reranker else k
+            with span("retrieve", hybrid=hybrid, k=k, candidates=n) as s:
+                if hybrid:
+                    docs = self.vector_store.query_hybrid(query, support_type=support_type, k=n, query_emb=query_emb, filters=filters)
+                else:
+                    docs = self.vector_store.query_similar(query, support_type=support_type, k=n, query_emb=query_emb, filters=filters)
+                if self.reranker:
+                    with self._rerank_span(len(docs)):
+                        docs = self.reranker.rerank(query, docs, k)
+                s.set(results=len(docs))
+                return docs
+        except ValueError:
+            raise  # Invalid filters are the caller's error, not an empty result
+        except Exception as e:
+            logger.error(f"Error retrieving documents: {e}", exc_info=True)
+            return []
+
+    async def aget_relevant_documents(
+        self,
+        query: str,
+        support_type: Optional[str] = None,
+        k: int = 3,
+        hybrid: bool = False,
+        query_emb: Optional[List[float]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Async version of get_relevant_documents that does not block the event loop.
+        """
+        self._validate_query(query)
+
+        try:
+            n = max(k, self.rerank_candidates) if self.reranker else k
+            with span("retrieve", hybrid=hybrid, k=k, candidates=n) as s:
+                if hybrid:
+                    docs = await self.vector_store.aquery_hybrid(query, support_type=support_type, k=n, query_emb=query_emb, filters=filters)
+                else:
+                    docs = await self.vector_store.aquery_similar(query, support_type=support_type, k=n, query_emb=query_emb, filters=filters)
+                if self.reranker:
+                    with self._rerank_span(len(docs)):
+                        docs = await self.reranker.arerank(query, docs, k)
+                s.set(results=len(docs))
+                return docs
+        except ValueError:
+            raise  # Invalid filters are the caller's error, not an empty result
         except Exception as e:
             logger.error(f"Error retrieving documents: {e}", exc_info=True)
             return []
 
     # ----------------------------------------------------------------------
-    def _prepare_context(self, documents: List[Dict[str, Any]]) -> str:
+    def _build_context(self, documents: List[Dict[str, Any]], query: Optional[str] = None) -> Tuple[str, Dict[str, int]]:
+        """
+        Pack retrieved documents into a token-budgeted context string.
+
+        Returns:
+            Tuple[str, Dict[str, int]]: The context and its packing stats (see ContextBuilder.build)
+        """
+        with span("build_context", max_tokens=self.context_builder.max_tokens) as s:
+            context, stats = self.context_builder.build(documents, query=query)
+            s.set(**stats)
+        if stats["tickets_in"]:
+            logger.info(
+                f"Context: {stats['tickets_packed']}/{stats['tickets_in']} tickets, {stats['tokens']} tokens, "
+                f"{stats['tokens_saved']} saved ({stats['duplicates']} duplicates, {stats['summarized']} summarized)"
+            )
+        return context, stats
+
+    def _prepare_context(self, documents: List[Dict[str, Any]], query: Optional[str] = None) -> str:
         """
         Format retrieved documents into a context string.
         """
-        if not documents:
-            return "No relevant support tickets found."
+        return self._build_context(documents, query=query)[0]
+
+    # ----------------------------------------------------------------------
+    def _validate_query(self, query: str) -> None:
+        if not query or not query.strip():
+            raise ValueError("Query cannot be empty")
+        if len(query.strip()) < 10:
+            raise ValueError("Query too short. Please provide more details.")
+
+    async def _aretrieve(
+        self,
+        query: str,
+        support_type: Optional[str],
+        hybrid: bool
+    ) -> Tuple[List[float], List[Dict[str, Any]], List[str]]:
+        """
+        Embed the query once and retrieve tickets for it, without blocking the event loop.
 
-        formatted_docs = []
-        for i, doc in enumerate(documents, 1):
-            support_type = doc["metadata"].get("support_type", "Unknown")
-            tags = ", ".join(doc["metadata"].get("tags", []))
-            content = doc["content"]
+        Returns:
+            Tuple of (query embedding, relevant documents, their ticket ids)
+        """
+        # The embedding serves both retrieval and the answer cache
+        query_emb = await self.vector_store.aembed_query(query)
+        relevant_docs = await self.aget_relevant_documents(
+            query, support_type=support_type, hybrid=hybrid, query_emb=query_emb
+        )
+        ticket_ids = [doc["metadata"].get("ticket_id", "") for doc in relevant_docs]
+        return query_emb, relevant_docs, ticket_ids
 
-            formatted_docs.append(
-                f"Ticket {i}:\n"
-                f"Support Type: {support_type}\n"
-                f"Tags: {tags}\n"
-                f"Content: {content}"
-            )
+    def _lookup_cached(self, query_emb: List[float], support_type: Optional[str], ticket_ids: List[str]) -> Optional[str]:
+        """Answer cache lookup, recorded as a span; None without a cache or on a miss."""
+        if self.answer_cache is None:
+            return None
+        with span("answer_cache.lookup") as s:
+            cached_answer = self.answer_cache.lookup(query_emb, support_type, ticket_ids)
+            s.set(hit=cached_answer is not None)
+        return cached_answer
 
-        return "\n\n".join(formatted_docs)
+    async def _alookup_cached(self, query_emb: List[float], support_type: Optional[str], ticket_ids: List[str]) -> Optional[str]:
+        """Async version of _lookup_cached; the SQLite lookup runs in a worker thread."""
+        if self.answer_cache is None:
+            return None
+        return await asyncio.to_thread(self._lookup_cached, query_emb, support_type, ticket_ids)
 
     # ----------------------------------------------------------------------
     async def query(
         self, 
         query: str, 
-        support_type: Optional[str] = None
+        support_type: Optional[str] = None,
+        hybrid: bool = False
     ) -> str:
         """
         Generate a response to a support query using RAG.
         """
-        if not query or not query.strip():
-            raise ValueError("Query cannot be empty")
-        if len(query.strip()) < 10:
-            raise ValueError("Query too short. Please provide more details.")
+        result = await self.query_with_sources(query, support_type=support_type, hybrid=hybrid)
+        return result["answer"]
 
-        try:
-            # Retrieve relevant documents
-            relevant_docs = self.get_relevant_documents(query, support_type=support_type)
-            context = self._prepare_context(relevant_docs)
-
-            # Prepare full prompt
-            formatted_prompt = self.prompt.format_messages(
-                context=context,
-                question=query
-            )
+    # ----------------------------------------------------------------------
+    async def query_with_sources(
+        self,
+        query: str,
+        support_type: Optional[str] = None,
+        hybrid: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Generate a response and return it together with the tickets it was based on,
+        using a single retrieval pass.
 
-            # Run the model asynchronously
-            response = await self.llm.ainvoke(formatted_prompt)
-            return response.content.strip()
+        Returns:
+            Dict[str, Any]: {"answer": str, "sources": List[Dict], "context": Dict[str, int]},
+            where "context" holds the packing stats (empty for cached answers)
+        """
+        self._validate_query(query)
 
-        except ValueError as ve:
-            raise ve  # Pass through validation errors exactly as required
-        except Exception as e:
-            logger.error(f"Error generating response: {e}", exc_info=True)
-            raise Exception("Error generating response") from e
+        with span("rag.query", support_type=support_type, hybrid=hybrid) as root:
+            try:
+                query_emb, relevant_docs, ticket_ids = await self._aretrieve(query, support_type, hybrid)
+
+                cached_answer = await self._alookup_cached(query_emb, support_type, ticket_ids)
+                if cached_answer is not None:
+                    return {"answer": cached_answer, "sources": relevant_docs, "context": {}}
+
+                context, context_stats = self._build_context(relevant_docs, query=query)
+
+                # Prepare full prompt
+                formatted_prompt = self.prompt.format_messages(
+                    context=context,
+                    question=query
+                )
+
+                # Run the model asynchronously
+                with span("llm.generate", model=getattr(self.llm, "model_name", None)) as s:
+                    response = await self.llm.ainvoke(formatted_prompt)
+                    self._record_usage(s, getattr(response, "usage_metadata", None))
+                answer = response.content.strip()
+
+                if self.answer_cache is not None:
+                    await asyncio.to_thread(self.answer_cache.store, query, query_emb, support_type, ticket_ids, answer)
+                return {"answer": answer, "sources": relevant_docs, "context": context_stats}
+
+            except ValueError as ve:
+                raise ve  # Pass through validation errors exactly as required
+            except Exception as e:
+                logger.error(f"Error generating response: {e}", exc_info=True)
+                raise Exception("Error generating response") from e
+            finally:
+                self.last_trace = root
+
+    # ----------------------------------------------------------------------
+    async def astream_query(
+        self,
+        query: str,
+        support_type: Optional[str] = None,
+        hybrid: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a RAG response as events.
+
+        Yields, in order:
+            {"event": "sources", "data": List[Dict]}  - retrieved tickets, before generation starts
+            {"event": "token", "data": str}           - answer text as it is generated
+            {"event": "end", "data": str}             - the complete answer
+        """
+        self._validate_query(query)
+
+        with span("rag.stream_query", support_type=support_type, hybrid=hybrid) as root:
+            try:
+                query_emb, relevant_docs, ticket_ids = await self._aretrieve(query, support_type, hybrid)
+                yield {"event": "sources", "data": relevant_docs}
+                # The consumer may drive each step from a different task
+                resume(root)
+
+                cached_answer = await self._alookup_cached(query_emb, support_type, ticket_ids)
+                if cached_answer is not None:
+                    yield {"event": "token", "data": cached_answer}
+                    yield {"event": "end", "data": cached_answer}
+                    return
+
+                formatted_prompt = self.prompt.format_messages(
+                    context=self._prepare_context(relevant_docs, query=query),
+                    question=query
+                )
+
+                parts = []
+                with span("llm.generate", model=getattr(self.llm, "model_name", None), streaming=True) as s:
+                    start = time.perf_counter()
+                    async for chunk in self.llm.astream(formatted_prompt):
+                        self._record_usage(s, getattr(chunk, "usage_metadata", None))
+                        if chunk.content:
+                            if not parts:
+                                s.set(first_token_ms=round((time.perf_counter() - start) * 1000, 1))
+                            parts.append(chunk.content)
+                            yield {"event": "token", "data": chunk.content}
+                    s.set(chunks=len(parts))
+
+                answer = "".join(parts).strip()
+                if self.answer_cache is not None:
+                    await asyncio.to_thread(self.answer_cache.store, query, query_emb, support_type, ticket_ids, answer)
+                yield {"event": "end", "data": answer}
+
+            except ValueError as ve:
+                raise ve
+            except Exception as e:
+                logger.error(f"Error streaming response: {e}", exc_info=True)
+                raise Exception("Error generating response") from e
+            finally:
+                self.last_trace = root
+
+    # ----------------------------------------------------------------------
+    async def _aretrieve_many(
+        self,
+        queries: List[str],
+        query_embs: List[List[float]],
+        support_type: Optional[str],
+        hybrid: bool,
+        k: int
+    ) -> List[List[Dict[str, Any]]]:
+        """Retrieve tickets for many embedded queries with one bulk vector search."""
+        n = max(k, self.rerank_candidates) if self.reranker else k
+        candidates = 4 * n if hybrid else n
+        per_query = await self.vector_store.aquery_by_embeddings(query_embs, support_type=support_type, k=candidates)
+        if hybrid:
+            lexical = await asyncio.gather(*(
+                self.vector_store.aquery_lexical(query, support_type=support_type, k=candidates) for query in queries
+            ))
+            per_query = [
+                reciprocal_rank_fusion([docs, lexical_docs], k=n) if docs else []
+                for docs, lexical_docs in zip(per_query, lexical)
+            ]
+        if self.reranker:
+            return list(await asyncio.gather(*(
+                self.reranker.arerank(query, docs, k) for query, docs in zip(queries, per_query)
+            )))
+        return [docs[:k] for docs in per_query]
+
+    @staticmethod
+    def _without_client_retries(llm: Any) -> Any:
+        """
+        Copy of a ChatOpenAI model whose OpenAI client does not retry.
+        abatch_query retries rate limits itself, behind its rate limiter.
+        """
+        client = getattr(llm, "root_async_client", None)
+        if client is None:
+            return llm
+        client = client.with_options(max_retries=0)
+        return llm.model_copy(update={
+            "max_retries": 0,
+            "root_async_client": client,
+            "async_client": client.chat.completions,
+        })
+
+    async def _agenerate_limited(
+        self,
+        llm: Any,
+        query: str,
+        relevant_docs: List[Dict[str, Any]],
+        rate_limiter: RateLimiter,
+        max_retries: int,
+        expected_completion_tokens: int
+    ) -> Tuple[str, Dict[str, int]]:
+        """Generate one answer within the rate limits, retrying rate-limit errors with backoff."""
+        context, context_stats = self._build_context(relevant_docs, query=query)
+        formatted_prompt = self.prompt.format_messages(context=context, question=query)
+        estimate = sum(self.context_builder.count_tokens(m.content) for m in formatted_prompt)
+        estimate += expected_completion_tokens
+
+        with span("llm.generate", model=getattr(llm, "model_name", None), estimated_tokens=estimate) as s:
+            for attempt in range(1, max_retries + 1):
+                acquire_start = time.perf_counter()
+                await rate_limiter.acquire(estimate)
+                s.set(attempts=attempt, rate_limit_wait_ms=round((time.perf_counter() - acquire_start) * 1000, 1))
+                try:
+                    response = await llm.ainvoke(formatted_prompt)
+                    break
+                except RateLimitError as e:
+                    if attempt == max_retries:
+                        raise
+                    delay = 2 ** attempt
+                    logger.warning(f"Rate limited ({e}); retry {attempt}/{max_retries - 1} in {delay}s")
+                    await asyncio.sleep(delay)
+
+            usage = getattr(response, "usage_metadata", None)
+            self._record_usage(s, usage)
+        if usage and usage.get("total_tokens"):
+            rate_limiter.adjust(usage["total_tokens"] - estimate)
+        return response.content.strip(), context_stats
+
+    async def abatch_query(
+        self,
+        queries: List[str],
+        support_type: Optional[str] = None,
+        hybrid: bool = False,
+        k: int = 3,
+        embed_batch_size: int = 256,
+        max_concurrency: int = 8,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: int = 3,
+        expected_completion_tokens: int = 500
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer many queries at once, e.g. for nightly ticket triage.
+
+        Queries are embedded concurrently in batches of `embed_batch_size` and
+        each batch is searched in bulk. Generations start as soon as their batch is retrieved,
+        with at most `max_concurrency` in flight, throttled by `rate_limiter`
+        (requests and tokens per minute). A failing query does not affect the others.
+
+        Returns:
+            List[Dict[str, Any]]: One result per query, in input order:
+            {"query", "answer", "sources", "context", "error"}, where "error" is
+            None on success and "answer" is None on failure
+
+        Raises:
+            ValueError: If max_retries is less than 1
+        """
+        if max_retries < 1:
+            raise ValueError(f"max_retries must be at least 1, got {max_retries}")
+        start = time.perf_counter()
+        results = [
+            {"query": query, "answer": None, "sources": [], "context": {}, "error": None}
+            for query in queries
+        ]
+        valid = []
+        for i, query in enumerate(queries):
+            try:
+                self._validate_query(query)
+                valid.append(i)
+            except ValueError as ve:
+                results[i]["error"] = str(ve)
+
+        rate_limiter = rate_limiter or RateLimiter()
+        llm = self._without_client_retries(self.llm)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        cache_hits = 0
+
+        async def answer(i: int, query_emb: List[float]) -> None:
+            nonlocal cache_hits
+            query = queries[i]
+            relevant_docs = results[i]["sources"]
+            ticket_ids = [doc["metadata"].get("ticket_id", "") for doc in relevant_docs]
+            try:
+                cached_answer = await self._alookup_cached(query_emb, support_type, ticket_ids)
+                if cached_answer is not None:
+                    cache_hits += 1
+                    results[i]["answer"] = cached_answer
+                    return
+
+                async with semaphore:
+                    generated, context_stats = await self._agenerate_limited(
+                        llm, query, relevant_docs, rate_limiter, max_retries, expected_completion_tokens
+                    )
+                if self.answer_cache is not None:
+                    await asyncio.to_thread(self.answer_cache.store, query, query_emb, support_type, ticket_ids, generated)
+                results[i]["answer"] = generated
+                results[i]["context"] = context_stats
+            except Exception as e:
+                logger.error(f"Error generating response for query {i}: {e}", exc_info=True)
+                results[i]["error"] = f"Error generating response: {e}"
+
+        with span("rag.batch_query", queries=len(queries), hybrid=hybrid) as root:
+            tasks = []
+            for offset in range(0, len(valid), embed_batch_size):
+                batch = valid[offset:offset + embed_batch_size]
+                batch_queries = [queries[i] for i in batch]
+                try:
+                    with span("retrieve_many", queries=len(batch)):
+                        # Embedded as queries, so they share the query-cache entries of single queries
+                        query_embs = list(await asyncio.gather(*(
+                            self.vector_store.embeddings.aembed_query(query) for query in batch_queries
+                        )))
+                        per_query = await self._aretrieve_many(batch_queries, query_embs, support_type, hybrid, k)
+                except Exception as e:
+                    logger.error(f"Error retrieving documents for a batch of {len(batch)} queries: {e}", exc_info=True)
+                    for i in batch:
+                        results[i]["error"] = f"Error retrieving documents: {e}"
+                    continue
+
+                for i, query_emb, relevant_docs in zip(batch, query_embs, per_query):
+                    results[i]["sources"] = relevant_docs
+                    tasks.append(asyncio.create_task(answer(i, query_emb)))
+
+            await asyncio.gather(*tasks)
+
+            failed = sum(1 for result in results if result["error"])
+            logger.info(
+                f"Batch of {len(queries)} queries done in {time.perf_counter() - start:.1f}s: "
+                f"{len(queries) - failed} answered ({cache_hits} from cache), {failed} failed, "
+                f"{rate_limiter.waited:.1f}s waiting on rate limits."
+            )
+            root.set(failed=failed, cache_hits=cache_hits, rate_limit_wait_s=round(rate_limiter.waited, 2))
+        self.last_trace = root
+        return results
@@ -0,0 +1,77 @@
+from typing import Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `per_minute / 60` units per second."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = float(per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.available) / self.rate)
+
+    def take(self, amount: float) -> None:
+        """Consume units; a negative amount returns them."""
+        self._refill()
+        self.available = min(self.capacity, self.available - min(amount, self.capacity))
+
+
+class RateLimiter:
+    """
+    Client-side limiter for an LLM API quota in requests and tokens per minute.
+
+    acquire() waits until both buckets allow the request; adjust() corrects the
+    token estimate once the actual usage is known. Either limit may be None.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = 500, tokens_per_minute: Optional[float] = 30000):
+        """
+        Args:
+            requests_per_minute (float, optional): Request quota, None for unlimited
+            tokens_per_minute (float, optional): Token quota (prompt + completion), None for unlimited
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock: Optional[asyncio.Lock] = None
+        self.waited = 0.0
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one request using about `tokens` tokens fits in the quota."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Waiters are served in order, so a large request is not starved by small ones
+        async with self._lock:
+            while True:
+                delay = max(
+                    self.requests.wait_time(1) if self.requests else 0.0,
+                    self.tokens.wait_time(tokens) if self.tokens else 0.0
+                )
+                if delay <= 0:
+                    break
+                self.waited += delay
+                await asyncio.sleep(delay)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+
+    def adjust(self, tokens: int) -> None:
+        """Charge (positive) or refund (negative) tokens after the real usage is known."""
+        if self.tokens:
+            self.tokens.take(tokens)
@@ -0,0 +1,152 @@
+from typing import List, Dict, Any, Optional, Callable, Sequence, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# scorer(pairs) -> one relevance score per (query, passage) pair
+PairScorer = Callable[[List[Tuple[str, str]]], Sequence[float]]
+
+
+class CrossEncoderReranker:
+    """
+    Re-scores retrieved tickets against the query with a small local cross-encoder.
+
+    Scores are cached per (query, ticket), and scoring stops when the latency
+    budget would be exceeded, in which case the vector order is kept.
+    The default model needs the `sentence-transformers` package and runs on CPU.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_RERANK_MODEL,
+        batch_size: int = 16,
+        latency_budget: float = 0.5,
+        cache_size: int = 10000,
+        scorer: Optional[PairScorer] = None
+    ):
+        """
+        Args:
+            model_name (str): Hugging Face cross-encoder model, loaded on first use
+            batch_size (int): Pairs scored per model call
+            latency_budget (float): Seconds allowed for scoring one query's candidates
+            cache_size (int): Maximum number of cached (query, ticket) scores
+            scorer (PairScorer, optional): Custom pair scorer used instead of the model
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.latency_budget = latency_budget
+        self.cache_size = cache_size
+        self._scorer = scorer
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        # Running average of seconds per scored pair, used to predict batch cost
+        self._seconds_per_pair: Optional[float] = None
+        self.reranked = 0
+        self.fallbacks = 0
+
+    # ----------------------------------------------------------------------
+    def _load_scorer(self) -> PairScorer:
+        """Load the cross-encoder once; kept outside the latency budget."""
+        with self._model_lock:
+            if self._scorer is None:
+                from sentence_transformers import CrossEncoder
+                model = CrossEncoder(self.model_name, device="cpu")
+                self._scorer = lambda pairs: model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+                logger.info(f"Loaded cross-encoder '{self.model_name}'")
+            return self._scorer
+
+    @staticmethod
+    def _doc_key(doc: Dict[str, Any]) -> str:
+        ticket_id = doc["metadata"].get("ticket_id")
+        if ticket_id:
+            return str(ticket_id)
+        return hashlib.sha256(doc["content"].encode("utf-8")).hexdigest()
+
+    def _cached(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], float]:
+        with self._lock:
+            found = {}
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+            return found
+
+    def _remember(self, scores: Dict[Tuple[str, str], float]) -> None:
+        with self._lock:
+            self._cache.update(scores)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # ----------------------------------------------------------------------
+    def rerank(self, query: str, documents: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """
+        Return the top-k documents by cross-encoder score, each with a 'rerank_score'.
+        Falls back to the first k documents in their original order if scoring
+        would exceed the latency budget or fails.
+        """
+        if len(documents) <= 1:
+            return documents[:k]
+
+        try:
+            scorer = self._load_scorer()
+        except ImportError as e:
+            self.fallbacks += 1
+            logger.error(f"Cross-encoder unavailable ({e}); install sentence-transformers. Keeping vector order.")
+            return documents[:k]
+
+        start = time.perf_counter()
+        keys = [(query, self._doc_key(doc)) for doc in documents]
+        scores = self._cached(keys)
+        pending = [i for i, key in enumerate(keys) if key not in scores]
+
+        try:
+            for offset in range(0, len(pending), self.batch_size):
+                batch = pending[offset:offset + self.batch_size]
+                elapsed = time.perf_counter() - start
+                expected = (self._seconds_per_pair or 0.0) * len(batch)
+                if elapsed + expected > self.latency_budget:
+                    self.fallbacks += 1
+                    logger.warning(
+                        f"Rerank budget of {self.latency_budget * 1000:.0f} ms exceeded after "
+                        f"{elapsed * 1000:.0f} ms; keeping vector order."
+                    )
+                    return documents[:k]
+
+                batch_start = time.perf_counter()
+                batch_scores = [float(score) for score in scorer([(query, documents[i]["content"]) for i in batch])]
+                per_pair = (time.perf_counter() - batch_start) / len(batch)
+                self._seconds_per_pair = per_pair if self._seconds_per_pair is None \
+                    else 0.8 * self._seconds_per_pair + 0.2 * per_pair
+
+                fresh = {keys[i]: score for i, score in zip(batch, batch_scores)}
+                self._remember(fresh)
+                scores.update(fresh)
+        except Exception as e:
+            self.fallbacks += 1
+            logger.error(f"Reranking failed, keeping vector order: {e}", exc_info=True)
+            return documents[:k]
+
+        self.reranked += 1
+        order = sorted(range(len(documents)), key=lambda i: scores[keys[i]], reverse=True)
+        return [{**documents[i], "rerank_score": scores[keys[i]]} for i in order[:k]]
+
+    async def arerank(self, query: str, documents: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """Async version of rerank; the CPU-bound scoring runs in the default executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.rerank, query, documents, k)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reranked": self.reranked,
+            "fallbacks": self.fallbacks,
+            "cached_scores": len(self._cache),
+            "ms_per_pair": (self._seconds_per_pair or 0.0) * 1000,
+        }
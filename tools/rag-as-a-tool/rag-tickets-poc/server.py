@@ -0,0 +1,203 @@
+"""
+HTTP service for the support RAG chain.
+
+Each worker process loads the vector store once (from its manifest) and
+shares it, and one SupportRAGChain, between all of its requests. With a
+quantized backend (VECTOR_BACKEND=int8 or pq) the vector files are opened
+as read-only memory maps, so the workers share one copy of the index in the
+OS page cache instead of holding one each. Run from the directory
+containing the package:
+
+    uvicorn src.server:app --workers 4
+
+Configuration (environment variables):
+    VECTOR_STORE_DIR      store built by app.py or SupportVectorStore.create_vector_store
+    MAX_IN_FLIGHT         requests processed concurrently per worker (default 32)
+    MAX_QUEUE             requests waiting for a slot per worker (default 64)
+    QUEUE_TIMEOUT         seconds a request may wait in the queue (default 10)
+    RERANKER_MODEL        enables the cross-encoder reranker
+    ANSWER_CACHE=0        disables the semantic answer cache (shared by the workers through one SQLite file)
+    RAG_STUB_MODELS=1     offline stubs for the embedding model and LLM (load tests)
+"""
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable
+from contextlib import asynccontextmanager
+import json
+import logging
+import os
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.types import Receive, Scope, Send
+from .admission import AdmissionController, Overloaded
+from .answer_cache import SemanticAnswerCache
+from .rag_chain import SupportRAGChain
+from .reranker import CrossEncoderReranker
+from .tracing import configure_tracing
+from .vector_store import SupportVectorStore, get_shared_store, set_shared_store
+
+logger = logging.getLogger(__name__)
+
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "vector_store")
+
+
+class SearchRequest(BaseModel):
+    query: str
+    support_type: Optional[str] = None
+    k: int = Field(3, ge=1, le=50)
+    hybrid: bool = False
+    filters: Optional[Dict[str, Any]] = None
+
+
+class AnswerRequest(BaseModel):
+    query: str
+    support_type: Optional[str] = None
+    hybrid: bool = False
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that calls `on_close` once it is done, also when the
+    client disconnected before the body generator was ever started.
+    """
+
+    def __init__(self, content: AsyncIterator[str], on_close: Callable[[], None], **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+
+def load_store() -> SupportVectorStore:
+    """The worker's shared vector store; stub embeddings when RAG_STUB_MODELS is set."""
+    if os.getenv("RAG_STUB_MODELS") == "1":
+        from .ingest import StubEmbeddings
+        store = SupportVectorStore.load_local(
+            VECTOR_STORE_DIR, embeddings=StubEmbeddings(dim=int(os.getenv("STUB_EMBEDDING_DIM", "256")))
+        )
+        if store is not None:
+            set_shared_store(VECTOR_STORE_DIR, store)
+    else:
+        store = get_shared_store(VECTOR_STORE_DIR)
+    if store is None:
+        raise RuntimeError(f"No vector store in '{VECTOR_STORE_DIR}'; build one first (e.g. with app.py).")
+    return store
+
+
+def build_chain(store: SupportVectorStore) -> SupportRAGChain:
+    reranker_model = os.getenv("RERANKER_MODEL")
+    answer_cache = None
+    if os.getenv("ANSWER_CACHE", "1") != "0":
+        answer_cache = SemanticAnswerCache(os.path.join(VECTOR_STORE_DIR, "answer_cache.sqlite3"))
+    chain = SupportRAGChain(
+        store,
+        answer_cache=answer_cache,
+        reranker=CrossEncoderReranker(reranker_model) if reranker_model else None
+    )
+    if os.getenv("RAG_STUB_MODELS") == "1":
+        from .benchmark_async import StubChatModel
+        chain.llm = StubChatModel(latency=float(os.getenv("STUB_LLM_LATENCY", "0.3")))
+    return chain
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    configure_tracing()
+    store = load_store()
+    app.state.chain = build_chain(store)
+    app.state.admission = AdmissionController(
+        max_in_flight=int(os.getenv("MAX_IN_FLIGHT", "32")),
+        max_queue=int(os.getenv("MAX_QUEUE", "64")),
+        queue_timeout=float(os.getenv("QUEUE_TIMEOUT", "10"))
+    )
+    logger.info(
+        f"Worker {os.getpid()} ready: backend={(store.manifest or {}).get('backend', 'unknown')}, "
+        f"collections={store.get_support_types()}"
+    )
+    yield
+    store._query_pool.shutdown(wait=False)
+
+
+app = FastAPI(title="Support RAG service", lifespan=lifespan)
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded) -> JSONResponse:
+    logger.warning(f"Rejected {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after + 0.5))}
+    )
+
+
+# ----------------------------------------------------------------------
+@app.get("/health")
+async def health(request: Request) -> Dict[str, Any]:
+    chain: SupportRAGChain = request.app.state.chain
+    cache = chain.answer_cache.stats() if chain.answer_cache is not None else None
+    return {"status": "ok", "pid": os.getpid(), **request.app.state.admission.stats(), "answer_cache": cache}
+
+
+@app.post("/search")
+async def search(body: SearchRequest, request: Request) -> Dict[str, List[Dict[str, Any]]]:
+    """Retrieve relevant tickets without generating an answer."""
+    chain: SupportRAGChain = request.app.state.chain
+    async with request.app.state.admission.slot():
+        try:
+            results = await chain.aget_relevant_documents(
+                body.query, support_type=body.support_type, k=body.k, hybrid=body.hybrid, filters=body.filters
+            )
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+    return {"results": results}
+
+
+@app.post("/answer")
+async def answer(body: AnswerRequest, request: Request) -> Dict[str, Any]:
+    """Answer a question from the retrieved tickets; returns {"answer", "sources", "context"}."""
+    chain: SupportRAGChain = request.app.state.chain
+    async with request.app.state.admission.slot():
+        try:
+            return await chain.query_with_sources(body.query, support_type=body.support_type, hybrid=body.hybrid)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+
+
+@app.post("/answer/stream")
+async def answer_stream(body: AnswerRequest, request: Request) -> StreamingResponse:
+    """
+    Stream the answer as server-sent events: one `sources` event, `token`
+    events as the answer is generated, then `end` with the full answer
+    (or `error`). The admission slot is held until the stream ends.
+    """
+    chain: SupportRAGChain = request.app.state.chain
+    admission: AdmissionController = request.app.state.admission
+    try:
+        chain._validate_query(body.query)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    # Admit before the response starts, so overload is still a plain 503
+    admitted_at = await admission.acquire()
+    released = False
+
+    def release() -> None:
+        # Called when the stream ends and again when the response finishes; frees the slot once
+        nonlocal released
+        if not released:
+            released = True
+            admission.release(admitted_at)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in chain.astream_query(body.query, support_type=body.support_type, hybrid=body.hybrid):
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+        finally:
+            release()
+
+    return ReleasingStreamingResponse(events(), on_close=release, media_type="text/event-stream")
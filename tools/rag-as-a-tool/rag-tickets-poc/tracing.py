@@ -0,0 +1,288 @@
+"""
+Lightweight span tracing for the support RAG request path.
+
+Spans nest through a context variable, so they follow asyncio tasks, and
+every finished trace is kept in memory (for the app's debug panel) and
+handed to the configured exporters. Exporters write the OTLP/JSON encoding,
+either as JSON lines to a local file (readable by the OpenTelemetry
+Collector's `otlpjsonfile` receiver) or over OTLP/HTTP to a collector.
+Export runs on a background thread and never blocks a request.
+"""
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVICE_NAME = "rag-tickets-poc"
+
+
+class Span:
+    """One timed stage of a request, with attributes and child spans."""
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.attributes: Dict[str, Any] = {}
+        self.set(**(attributes or {}))
+        self.children: List["Span"] = []
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._start = time.perf_counter()
+        self.duration = 0.0
+        if parent is not None:
+            parent.children.append(self)
+
+    def set(self, **attributes: Any) -> None:
+        """Add or overwrite attributes; None values are skipped."""
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._start
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+
+    def walk(self, depth: int = 0) -> Iterator[Tuple[int, "Span"]]:
+        """Yield (depth, span) for this span and its descendants, depth first."""
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        """
+        Flatten the trace into rows for display.
+
+        Returns:
+            List[Dict[str, Any]]: One row per span: stage (indented by depth), ms,
+            share of the total time and its attributes
+        """
+        total = self.duration or 1e-9
+        return [
+            {
+                "stage": "  " * depth + span.name,
+                "ms": round(span.duration * 1000, 2),
+                "share": f"{span.duration / total:.0%}",
+                "details": ", ".join(f"{key}={value}" for key, value in span.attributes.items())
+                           + (f" error={span.error}" if span.error else ""),
+            }
+            for depth, span in self.walk()
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "ms": self.duration * 1000,
+            "attributes": self.attributes,
+            "error": self.error,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("rag_current_span", default=None)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time a block as a span, nested under the current span.
+    A span without a parent is a trace root and is exported when it ends.
+    """
+    previous = _current.get()
+    record = Span(name, parent=previous, attributes=attributes)
+    # set() rather than a token: the block may end in a different context
+    _current.set(record)
+    try:
+        yield record
+    except BaseException as e:
+        record.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record.finish()
+        _current.set(previous)
+        if record.parent is None:
+            _tracer.finished(record)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def resume(record: Span) -> None:
+    """
+    Make `record` the current span again, for code that continues in another
+    context, e.g. an async generator whose steps run as separate tasks.
+    """
+    _current.set(record)
+
+
+# ----------------------------------------------------------------------
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def to_otlp(traces: List[Span], service_name: str) -> Dict[str, Any]:
+    """Encode finished traces as an OTLP/JSON ExportTraceServiceRequest."""
+    spans = []
+    for root in traces:
+        for _, record in root.walk():
+            encoded = {
+                "traceId": record.trace_id,
+                "spanId": record.span_id,
+                "name": record.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(record.start_ns),
+                "endTimeUnixNano": str(record.end_ns or record.start_ns),
+                "attributes": _otlp_attributes(record.attributes),
+                # STATUS_CODE_OK / STATUS_CODE_ERROR
+                "status": {"code": 2, "message": record.error} if record.error else {"code": 1},
+            }
+            if record.parent is not None:
+                encoded["parentSpanId"] = record.parent.span_id
+            spans.append(encoded)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }]
+    }
+
+
+class FileSpanExporter:
+    """Appends one OTLP/JSON request per export to a JSON lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload) + "\n")
+
+
+class OTLPHttpExporter:
+    """Posts OTLP/JSON to a collector's /v1/traces endpoint."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0, headers: Optional[Dict[str, str]] = None):
+        endpoint = endpoint.rstrip("/")
+        self.url = endpoint if endpoint.endswith("/v1/traces") else f"{endpoint}/v1/traces"
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode("utf-8"), headers=self.headers)
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class _Tracer:
+    """Keeps the last trace and feeds finished traces to the exporters on a background thread."""
+
+    def __init__(self):
+        self.exporters: List[Any] = []
+        self.service_name = DEFAULT_SERVICE_NAME
+        self.last_trace: Optional[Span] = None
+        self.dropped = 0
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=1000)
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def finished(self, root: Span) -> None:
+        self.last_trace = root
+        if not self.exporters:
+            return
+        try:
+            self._queue.put_nowait(root)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="trace-export", daemon=True)
+                    self._worker.start()
+
+    def _run(self, max_batch: int = 64) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            payload = to_otlp(batch, self.service_name)
+            for exporter in list(self.exporters):
+                try:
+                    exporter.export(payload)
+                except Exception as e:
+                    logger.warning(f"Trace export to {type(exporter).__name__} failed: {e}")
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait (up to `timeout` seconds) until queued traces are exported."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+_tracer = _Tracer()
+
+
+def configure_tracing(
+    file_path: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    service_name: Optional[str] = None
+) -> None:
+    """
+    Choose where traces are exported; by default none are.
+
+    Args:
+        file_path (str, optional): JSON lines file for OTLP/JSON traces (default: TRACE_FILE env var)
+        endpoint (str, optional): OTLP/HTTP collector URL, e.g. http://localhost:4318
+            (default: OTEL_EXPORTER_OTLP_ENDPOINT env var)
+        service_name (str, optional): Resource service.name (default: OTEL_SERVICE_NAME or rag-tickets-poc)
+    """
+    file_path = file_path or os.getenv("TRACE_FILE")
+    endpoint = endpoint or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    exporters: List[Any] = []
+    if file_path:
+        exporters.append(FileSpanExporter(file_path))
+    if endpoint:
+        exporters.append(OTLPHttpExporter(endpoint))
+    _tracer.service_name = service_name or os.getenv("OTEL_SERVICE_NAME") or DEFAULT_SERVICE_NAME
+    _tracer.exporters = exporters
+    if exporters:
+        logger.info(f"Exporting traces to {', '.join(type(e).__name__ for e in exporters)}")
+
+
+def last_trace() -> Optional[Span]:
+    """The most recently finished trace in this process."""
+    return _tracer.last_trace
+
+
+def flush(timeout: float = 5.0) -> None:
+    _tracer.flush(timeout)
@@ -0,0 +1,132 @@
+from typing import List, Dict, Any, Optional
+from abc import ABC, abstractmethod
+import logging
+import os
+import chromadb
+from chromadb.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class VectorCollection(ABC):
+    """
+    The subset of the Chroma collection API used by SupportVectorStore.
+
+    `get` and `query` return Chroma-shaped dicts ("ids", "documents",
+    "metadatas", and for queries "distances" where similarity = 1 - distance).
+    """
+
+    name: str
+
+    @abstractmethod
+    def upsert(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: List[List[float]]
+    ) -> None:
+        ...
+
+    @abstractmethod
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        include: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None
+    ) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+
+class VectorBackend(ABC):
+    """Storage engine behind SupportVectorStore: one collection per support type."""
+
+    @abstractmethod
+    def get_or_create_collection(self, name: str) -> VectorCollection:
+        ...
+
+    @abstractmethod
+    def get_collection(self, name: str) -> VectorCollection:
+        ...
+
+    @abstractmethod
+    def list_collections(self) -> List[str]:
+        """Names of the stored collections."""
+
+    @abstractmethod
+    def delete_collection(self, name: str) -> None:
+        ...
+
+    def persist(self) -> None:
+        """Flush pending writes; a no-op for backends that write through."""
+
+
+class ChromaBackend(VectorBackend):
+    """Persistent ChromaDB client; Chroma collections already satisfy VectorCollection."""
+
+    def __init__(self, persist_directory: str):
+        self.client = chromadb.Client(
+            Settings(
+                is_persistent=True,
+                persist_directory=persist_directory
+            )
+        )
+
+    def get_or_create_collection(self, name: str) -> VectorCollection:
+        # Cosine space, so that the store's similarity = 1 - distance is cosine similarity
+        # (Chroma's default is squared L2). Existing collections keep the space they were built with.
+        return self.client.get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
+
+    def get_collection(self, name: str) -> VectorCollection:
+        return self.client.get_collection(name=name)
+
+    def list_collections(self) -> List[str]:
+        # Chroma < 0.6 returns Collection objects, later versions return names
+        return [c if isinstance(c, str) else c.name for c in self.client.list_collections()]
+
+    def delete_collection(self, name: str) -> None:
+        self.client.delete_collection(name=name)
+
+    def persist(self) -> None:
+        # Only the legacy clients need an explicit persist
+        persist = getattr(self.client, "persist", None)
+        if persist is not None:
+            persist()
+
+
+def create_backend(directory: str, kind: Optional[str] = None) -> VectorBackend:
+    """
+    Build the vector backend for a store directory.
+
+    Args:
+        directory (str): Vector store directory
+        kind (str, optional): "chroma", "int8" or "pq"; defaults to the VECTOR_BACKEND env var
+
+    Returns:
+        VectorBackend: The backend instance
+    """
+    kind = (kind or os.getenv("VECTOR_BACKEND", "chroma")).lower()
+    if kind == "chroma":
+        return ChromaBackend(directory)
+    if kind in ("int8", "pq"):
+        from .quantized_index import QuantizedBackend
+        return QuantizedBackend(os.path.join(directory, "quantized"), quantization=kind)
+    raise ValueError(f"Unknown vector backend '{kind}'. Use 'chroma', 'int8' or 'pq'.")
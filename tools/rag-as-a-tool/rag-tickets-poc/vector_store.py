@@ -1,159 +1,881 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Union, Callable
+from collections.abc import MutableMapping
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import hashlib
+import heapq
+import itertools
+import json
 import os
-import chromadb
-from chromadb.config import Settings
+import threading
 from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 import logging
 from dotenv import load_dotenv, find_dotenv
+from .embedding_cache import CachedEmbeddings, model_name_of
+from .ingest import EmbeddingPipeline
+from .lexical_index import BM25Index, reciprocal_rank_fusion
+from .metadata_index import MetadataIndex
+from .vector_backends import VectorBackend, VectorCollection, create_backend
+from .tracing import span
 
 load_dotenv(find_dotenv())
 
 logger = logging.getLogger(__name__)
 
+LEXICAL_INDEX_FILE = "bm25_index.pkl"
+METADATA_INDEX_FILE = "metadata_index.pkl"
+
+# Written after every successful build or sync; its presence marks the store as ready
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# Metadata key listing which fields hold JSON-encoded lists
+LIST_FIELDS_KEY = "_list_fields"
+
+# Either {support_type: documents} or lazily streamed (support_type, documents) pairs
+DocumentsByType = Union[Dict[str, Iterable[Document]], Iterable[Tuple[str, Iterable[Document]]]]
+
+
+def _iter_types(documents_by_type: DocumentsByType) -> Iterator[Tuple[str, Iterable[Document]]]:
+    if isinstance(documents_by_type, dict):
+        return iter(documents_by_type.items())
+    return iter(documents_by_type)
+
+
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    """Return the store manifest, or None if the store was never fully built."""
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        logger.warning(f"Ignoring manifest with unsupported version {manifest.get('version')} in {directory}")
+        return None
+    return manifest
+
+
+def embedding_model_of(embeddings: Embeddings) -> str:
+    """Model identifier recorded in the manifest, looking through CachedEmbeddings."""
+    return model_name_of(getattr(embeddings, "underlying", embeddings))
+
+
+class LazyCollections(MutableMapping):
+    """
+    Collection name -> collection, opening each collection on first access.
+
+    Membership and iteration only use the known names, so checking a support
+    type or listing them never touches the backend.
+    """
+
+    def __init__(self, opener: Callable[[str], VectorCollection], names: Iterable[str] = ()):
+        self._opener = opener
+        self._names = list(names)
+        self._opened: Dict[str, VectorCollection] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> VectorCollection:
+        if name not in self._names:
+            raise KeyError(name)
+        with self._lock:
+            if name not in self._opened:
+                self._opened[name] = self._opener(name)
+            return self._opened[name]
+
+    def __setitem__(self, name: str, collection: VectorCollection) -> None:
+        if name not in self._names:
+            self._names.append(name)
+        self._opened[name] = collection
+
+    def __delitem__(self, name: str) -> None:
+        self._names.remove(name)
+        self._opened.pop(name, None)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._names
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._names))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
 class SupportVectorStore:
     """
-    A class to manage the vector store for support tickets using ChromaDB.
+    A class to manage the vector store for support tickets using ChromaDB
+    or another VectorBackend.
     """
 
-    def __init__(self, vecstore_path: str):
-        """Initialize the vector store with ChromaDB client and OpenAI embeddings."""
+    def __init__(
+        self,
+        vecstore_path: str,
+        embeddings: Optional[Embeddings] = None,
+        backend: Optional[VectorBackend] = None
+    ):
+        """
+        Initialize the vector store with a vector backend and OpenAI embeddings.
+        Pass `embeddings` to override the default (e.g. StubEmbeddings offline).
+        The default embeddings go through the shared on-disk embedding cache.
+        The backend defaults to the one named by VECTOR_BACKEND (Chroma unless set).
+
+        The default embeddings, the backend and the local indexes are only
+        created or loaded when first used, so constructing a store is cheap.
+        """
         os.makedirs(vecstore_path, exist_ok=True)
 
         self.vecstore_path = vecstore_path
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
+        self.manifest: Optional[Dict[str, Any]] = None
+        self._embeddings = embeddings
+        self._backend = backend
+        self._lexical_index: Optional[BM25Index] = None
+        self._metadata_index: Optional[MetadataIndex] = None
+        self._init_lock = threading.RLock()
 
-        # Persistent ChromaDB client
-        self.client = chromadb.Client(
-            Settings(
-                is_persistent=True,
-                persist_directory=vecstore_path
-            )
-        )
+        self.collections: LazyCollections = LazyCollections(lambda name: self.backend.get_collection(name))
+
+        # Shared pool for fanning a query out over collections, and for the
+        # blocking parts (backend, SQLite, BM25) of the async methods
+        self._query_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="chroma-query")
+
+    # ----------------------------------------------------------------------
+    @property
+    def embeddings(self) -> Embeddings:
+        with self._init_lock:
+            if self._embeddings is None:
+                self._embeddings = CachedEmbeddings(OpenAIEmbeddings(model=DEFAULT_EMBEDDING_MODEL))
+                self._check_embedding_model()
+            return self._embeddings
 
-        self.collections: Dict[str, chromadb.Collection] = {}
+    @property
+    def backend(self) -> VectorBackend:
+        with self._init_lock:
+            if self._backend is None:
+                # Persistent ChromaDB client unless VECTOR_BACKEND says otherwise
+                self._backend = create_backend(self.vecstore_path)
+            return self._backend
+
+    # BM25 and metadata indexes kept in step with the collections, persisted next to the vectors
+    @property
+    def lexical_index(self) -> BM25Index:
+        with self._init_lock:
+            if self._lexical_index is None:
+                self._lexical_index = BM25Index.load(os.path.join(self.vecstore_path, LEXICAL_INDEX_FILE))
+            return self._lexical_index
+
+    @lexical_index.setter
+    def lexical_index(self, index: BM25Index) -> None:
+        self._lexical_index = index
+
+    @property
+    def metadata_index(self) -> MetadataIndex:
+        with self._init_lock:
+            if self._metadata_index is None:
+                self._metadata_index = MetadataIndex.load(os.path.join(self.vecstore_path, METADATA_INDEX_FILE))
+            return self._metadata_index
+
+    @metadata_index.setter
+    def metadata_index(self, index: MetadataIndex) -> None:
+        self._metadata_index = index
+
+    def _check_embedding_model(self) -> None:
+        """Warn when queries would be embedded with a different model than the stored vectors."""
+        if not self.manifest:
+            return
+        built_with = self.manifest.get("embedding_model")
+        current = embedding_model_of(self._embeddings)
+        if built_with and built_with != current:
+            logger.warning(
+                f"Vector store was built with '{built_with}' but queries use '{current}'; "
+                f"rebuild the store or pass matching embeddings."
+            )
 
     # ----------------------------------------------------------------------
     def _prepare_metadata(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
-        """Ensure all metadata is ChromaDB-compatible (no lists or None)."""
+        """
+        Make metadata ChromaDB-compatible while keeping its types.
+
+        Scalars (str, int, float, bool) are stored as-is and None is dropped.
+        Lists are stored as a JSON string plus one boolean flag per element
+        (e.g. "tags:billing": True), so they round-trip exactly and can still
+        be used in `where` filters.
+        """
         processed = {}
+        list_fields = []
         for key, value in metadata.items():
             if value is None:
                 continue
-            if isinstance(value, list):
-                processed[key] = ", ".join(str(v) for v in value)
+            if isinstance(value, (list, tuple, set)):
+                values = [str(v) for v in value]
+                processed[key] = json.dumps(values, ensure_ascii=False)
+                for v in values:
+                    processed[f"{key}:{v}"] = True
+                list_fields.append(key)
+            elif isinstance(value, (str, int, float, bool)):
+                processed[key] = value
             else:
                 processed[key] = str(value)
+        if list_fields:
+            processed[LIST_FIELDS_KEY] = ",".join(list_fields)
         return processed
 
     # ----------------------------------------------------------------------
     def _process_metadata_for_return(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
-        """Convert comma-separated lists back to Python lists when appropriate."""
-        processed = {}
-        for key, value in metadata.items():
-            if isinstance(value, str) and "," in value:
-                processed[key] = [v.strip() for v in value.split(",")]
-            else:
-                processed[key] = value
+        """Decode the list fields written by _prepare_metadata; everything else is returned untouched."""
+        list_fields = metadata.get(LIST_FIELDS_KEY)
+        if not list_fields:
+            return dict(metadata)
+
+        fields = list_fields.split(",")
+        prefixes = tuple(f"{field}:" for field in fields)
+        processed = {
+            key: value for key, value in metadata.items()
+            if key != LIST_FIELDS_KEY and not key.startswith(prefixes)
+        }
+        for field in fields:
+            if field in processed:
+                processed[field] = json.loads(processed[field])
         return processed
 
     # ----------------------------------------------------------------------
-    def create_vector_store(self, documents_by_type: Dict[str, List[Document]]) -> None:
+    @staticmethod
+    def _build_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Translate ticket filters into a Chroma `where` clause.
+
+        Same semantics as MetadataIndex.match: scalars match by equality, lists
+        match any value, and every listed tag is required.
+        """
+        if not filters:
+            return None
+
+        clauses = []
+        for field, wanted in filters.items():
+            values = list(wanted) if isinstance(wanted, (list, tuple, set)) else [wanted]
+            if field == "tags":
+                clauses.extend({f"tags:{value}": True} for value in values)
+            elif len(values) == 1:
+                clauses.append({field: values[0]})
+            else:
+                clauses.append({field: {"$in": values}})
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    # ----------------------------------------------------------------------
+    def _index_items(self, support_type: str, docs: Iterable[Document]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Yield (id, text, metadata) for indexing.
+
+        Ids are the stable `ticket_id` from the loader (positional only as a fallback),
+        and every metadata dict carries a `content_hash` of the text and metadata.
+        """
+        for i, doc in enumerate(docs):
+            doc_id = str(doc.metadata.get("ticket_id") or f"{support_type}_{i}")
+            metadata = self._prepare_metadata(doc.metadata)
+            metadata["content_hash"] = self._content_hash(doc.page_content, metadata)
+            yield doc_id, doc.page_content, metadata
+
+    @staticmethod
+    def _content_hash(text: str, metadata: Dict[str, Any]) -> str:
+        """Hash of a ticket's text and metadata, used to detect changed tickets."""
+        fields = {k: v for k, v in metadata.items() if k != "content_hash"}
+        payload = json.dumps([text, fields], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _existing_hashes(self, collection: VectorCollection, page_size: int = 10000) -> Dict[str, str]:
+        """Return {id: content_hash} for everything stored in a collection."""
+        hashes = {}
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            for doc_id, meta in zip(page["ids"], page["metadatas"]):
+                hashes[doc_id] = (meta or {}).get("content_hash", "")
+            if len(page["ids"]) < page_size:
+                return hashes
+            offset += page_size
+
+    def _batch_sink(self, collection: VectorCollection):
+        """Return a pipeline sink that upserts a batch into Chroma and the local indexes."""
+        def sink(ids, texts, metadatas, embeddings):
+            collection.upsert(ids=ids, documents=texts, metadatas=metadatas, embeddings=embeddings)
+            self.lexical_index.add_many(zip(ids, texts, metadatas))
+            self.metadata_index.add_many(
+                ((doc_id, self._process_metadata_for_return(meta)) for doc_id, meta in zip(ids, metadatas)),
+                collection=collection.name
+            )
+        return sink
+
+    def _save_local_indexes(self) -> None:
+        self.lexical_index.save()
+        self.metadata_index.save()
+
+    def _write_manifest(self) -> None:
+        """
+        Record collection names, counts, the embedding model and a build hash.
+        load_local reads only this file instead of listing and opening every collection.
+        """
+        content_hashes = sorted(
+            f"{doc_id}:{meta.get('content_hash', '')}" for doc_id, (_, meta, _) in self.lexical_index.docs.items()
+        )
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "backend": type(self.backend).__name__,
+            "embedding_model": embedding_model_of(self.embeddings),
+            "collections": {name: self.collections[name].count() for name in self.collections},
+            "build_hash": hashlib.sha256("\n".join(content_hashes).encode("utf-8")).hexdigest(),
+            "built_at": datetime.now(timezone.utc).isoformat(),
+        }
+        path = os.path.join(self.vecstore_path, MANIFEST_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+        self.manifest = manifest
+
+    # ----------------------------------------------------------------------
+    def create_vector_store(
+        self,
+        documents_by_type: DocumentsByType,
+        batch_size: int = 256,
+        max_workers: int = 4
+    ) -> None:
         """
         Create vector store collections from documents, organized by support type.
+
+        Documents are embedded in batches of `batch_size` with at most `max_workers`
+        embedding calls in flight, and each batch is added to Chroma as soon as it
+        is embedded. Documents may be lazy iterators (see
+        SupportDocumentLoader.iter_tickets), so exports never need to fit in memory.
         """
-        for support_type, docs in documents_by_type.items():
-            if not docs:
+        pipeline = EmbeddingPipeline(self.embeddings, batch_size=batch_size, max_workers=max_workers)
+
+        # The store is not ready again until the new manifest is written
+        manifest_path = os.path.join(self.vecstore_path, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        for support_type, docs in _iter_types(documents_by_type):
+            docs = iter(docs)
+            first = next(docs, None)
+            if first is None:
                 logger.warning(f"No documents found for support type '{support_type}'. Skipping.")
                 continue
+            docs = itertools.chain([first], docs)
 
-            collection = self.client.get_or_create_collection(name=support_type)
+            collection = self.backend.get_or_create_collection(support_type)
             self.collections[support_type] = collection
 
-            ids, texts, metadatas = [], [], []
-
-            for i, doc in enumerate(docs):
-                ids.append(f"{support_type}_{i}")
-                texts.append(doc.page_content)
-                metadatas.append(self._prepare_metadata(doc.metadata))
+            # Add each embedded batch to Chroma as it completes
+            stats = pipeline.run(self._index_items(support_type, docs), self._batch_sink(collection))
 
-            # Add to Chroma
-            collection.add(
-                ids=ids,
-                documents=texts,
-                metadatas=metadatas,
-                embeddings=self.embeddings.embed_documents(texts)
+            logger.info(
+                f"✅ Created vector collection for '{support_type}' with {stats['documents']} documents "
+                f"({stats['docs_per_sec']:.1f} docs/sec)."
             )
 
-            logger.info(f"✅ Created vector collection for '{support_type}' with {len(docs)} documents.")
+        self._save_local_indexes()
+        self.backend.persist()
+        self._write_manifest()
+
+    # ----------------------------------------------------------------------
+    def sync_vector_store(
+        self,
+        documents_by_type: DocumentsByType,
+        batch_size: int = 256,
+        max_workers: int = 4
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Incrementally bring collections in line with the given documents.
+
+        Tickets are matched on `ticket_id`. Only new tickets and tickets whose
+        content hash changed are embedded and upserted; tickets no longer present
+        for a support type are deleted. Support types not passed in are left alone.
 
-        self.client.persist()
+        Returns:
+            Dict[str, Dict[str, int]]: Per support type counts of
+            added, updated, deleted and unchanged tickets
+        """
+        pipeline = EmbeddingPipeline(self.embeddings, batch_size=batch_size, max_workers=max_workers)
+        summary: Dict[str, Dict[str, int]] = {}
+
+        for support_type, docs in _iter_types(documents_by_type):
+            collection = self.backend.get_or_create_collection(support_type)
+            self.collections[support_type] = collection
+
+            existing = self._existing_hashes(collection)
+            seen = set()
+            counts = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+
+            def pending() -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+                for doc_id, text, metadata in self._index_items(support_type, docs):
+                    seen.add(doc_id)
+                    stored_hash = existing.get(doc_id)
+                    if stored_hash == metadata["content_hash"]:
+                        counts["unchanged"] += 1
+                        continue
+                    counts["added" if stored_hash is None else "updated"] += 1
+                    yield doc_id, text, metadata
+
+            stats = pipeline.run(pending(), self._batch_sink(collection))
+
+            vanished = [doc_id for doc_id in existing if doc_id not in seen]
+            for start in range(0, len(vanished), batch_size):
+                collection.delete(ids=vanished[start:start + batch_size])
+            for doc_id in vanished:
+                self.lexical_index.remove(doc_id)
+                self.metadata_index.remove(doc_id)
+            counts["deleted"] = len(vanished)
+
+            if not collection.count():
+                self.backend.delete_collection(support_type)
+                del self.collections[support_type]
+
+            summary[support_type] = counts
+            logger.info(
+                f"🔄 Synced '{support_type}': {counts['added']} added, {counts['updated']} updated, "
+                f"{counts['deleted']} deleted, {counts['unchanged']} unchanged "
+                f"({stats['docs_per_sec']:.1f} docs/sec embedded)."
+            )
+
+        self._save_local_indexes()
+        self.backend.persist()
+        self._write_manifest()
+        return summary
 
     # ----------------------------------------------------------------------
     @classmethod
-    def load_local(cls, directory: str) -> Optional["SupportVectorStore"]:
+    def load_local(
+        cls,
+        directory: str,
+        embeddings: Optional[Embeddings] = None,
+        backend: Optional[VectorBackend] = None
+    ) -> Optional["SupportVectorStore"]:
         """
         Load a vector store from local storage.
+
+        With a manifest this is a single file read: collections are opened on
+        first use. Stores built before manifests existed are listed through the
+        backend once and get a manifest written.
+
+        Returns:
+            Optional[SupportVectorStore]: The store, or None if nothing was built there yet.
+            Backend errors are raised rather than reported as a missing store.
         """
         if not os.path.exists(directory):
             logger.warning(f"Vector store directory not found: {directory}")
             return None
 
-        instance = cls(directory)
+        instance = cls(directory, embeddings=embeddings, backend=backend)
+        instance.manifest = read_manifest(directory)
 
-        # Load all existing collections
-        try:
-            for name in instance.client.list_collections():
-                collection = instance.client.get_collection(name=name.name)
-                instance.collections[name.name] = collection
-            logger.info(f"Loaded {len(instance.collections)} collections from {directory}.")
-        except Exception as e:
-            logger.error(f"Failed to load Chroma collections: {e}")
-            return None
+        if instance.manifest is not None:
+            instance.collections = LazyCollections(
+                lambda name: instance.backend.get_collection(name), instance.manifest["collections"]
+            )
+            if embeddings is not None:
+                instance._check_embedding_model()
+            logger.info(
+                f"Loaded manifest for {len(instance.collections)} collections "
+                f"({sum(instance.manifest['collections'].values())} tickets) from {directory}."
+            )
+            return instance
 
+        names = instance.backend.list_collections()
+        if not names:
+            logger.warning(f"No collections found in {directory}")
+            return None
+        for name in names:
+            instance.collections[name] = instance.backend.get_collection(name)
+        instance._write_manifest()
+        logger.info(f"Loaded {len(instance.collections)} collections from {directory} and wrote a manifest.")
         return instance
 
     # ----------------------------------------------------------------------
-    def query_similar(
-        self,
-        query: str,
-        support_type: Optional[str] = None,
-        k: int = 5
-    ) -> List[Dict[str, Any]]:
-        """Query the vector store for similar documents."""
+    def _check_query(self, query: str, support_type: Optional[str]) -> bool:
+        """Validate a query and support type filter, logging why it is rejected."""
         if not query or not query.strip():
             logger.warning("Empty or null query provided. Returning no results.")
-            return []
+            return False
         if len(query.strip()) < 10:
             logger.warning("Query too short (<10 characters). Returning no results.")
-            return []
+            return False
+        if support_type and support_type not in self.collections:
+            logger.warning(f"Support type '{support_type}' not found.")
+            return False
+        return True
 
-        collections_to_query = []
+    def _collections_for(self, support_type: Optional[str]) -> List[VectorCollection]:
         if support_type:
             if support_type not in self.collections:
                 logger.warning(f"Support type '{support_type}' not found.")
                 return []
-            collections_to_query = [self.collections[support_type]]
-        else:
-            collections_to_query = list(self.collections.values())
+            return [self.collections[support_type]]
+        return list(self.collections.values())
+
+    def _plan_search(
+        self,
+        support_type: Optional[str],
+        k: int,
+        filters: Optional[Dict[str, Any]]
+    ) -> Tuple[List[Tuple[VectorCollection, int]], Optional[Dict[str, Any]]]:
+        """
+        Decide which collections to search and how many results to ask each for.
+
+        With filters, the metadata index resolves the matching tickets first:
+        collections without a match are skipped, and the `where` clause makes
+        Chroma search only the matching subset.
+        """
+        collections = self._collections_for(support_type)
+        if not filters:
+            return [(collection, k) for collection in collections], None
+
+        self._ensure_local_indexes()
+        counts = self.metadata_index.count_by_collection(self.metadata_index.match(filters))
+        plan = [
+            (collection, min(k, counts[collection.name]))
+            for collection in collections
+            if counts.get(collection.name)
+        ]
+        return plan, self._build_where(filters)
+
+    @staticmethod
+    def _search_collection_many(
+        collection: VectorCollection,
+        query_embs: List[List[float]],
+        k: int,
+        where: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[float, str, Dict[str, Any]]]]:
+        """One backend query for several embeddings; returns the hits of each."""
+        res = collection.query(query_embeddings=query_embs, n_results=k, where=where)
+        # Chroma returns distances
+        return [
+            [(1 - dist, doc, meta) for doc, meta, dist in zip(docs, metas, dists)]
+            for docs, metas, dists in zip(res["documents"], res["metadatas"], res["distances"])
+        ]
+
+    @staticmethod
+    def _search_collection(
+        collection: VectorCollection,
+        query_emb: List[float],
+        k: int,
+        where: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[float, str, Dict[str, Any]]]:
+        return SupportVectorStore._search_collection_many(collection, [query_emb], k, where)[0]
+
+    def _merge_hits(self, hits: List[Tuple[float, str, Dict[str, Any]]], k: int) -> List[Dict[str, Any]]:
+        """Keep the global top-k hits, ordered by similarity descending."""
+        return [
+            {
+                "content": doc,
+                "metadata": self._process_metadata_for_return(meta),
+                "similarity": similarity
+            }
+            for similarity, doc, meta in heapq.nlargest(k, hits, key=lambda hit: hit[0])
+        ]
+
+    # ----------------------------------------------------------------------
+    def query_similar(
+        self,
+        query: str,
+        support_type: Optional[str] = None,
+        k: int = 5,
+        query_emb: Optional[List[float]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Query the vector store for similar documents.
+        Pass `query_emb` to reuse an embedding the caller already computed, and
+        `filters` (e.g. {"priority": "high", "tags": ["billing"]}) to restrict
+        the search to matching tickets.
+        """
+        if not self._check_query(query, support_type):
+            return []
+
+        with span("vector_store.query_similar", support_type=support_type, k=k, filtered=bool(filters)) as s:
+            # Embed once, regardless of how many collections are searched
+            if query_emb is None:
+                query_emb = self.embed_query(query)
+            results = self.query_by_embedding(query_emb, support_type=support_type, k=k, filters=filters)
+            s.set(results=len(results))
+            return results
 
-        results = []
-        for collection in collections_to_query:
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query, recording the time and embedding cache hit as a span."""
+        with span("embed_query", model=embedding_model_of(self.embeddings)) as s:
+            hits = getattr(self.embeddings, "hits", None)
             query_emb = self.embeddings.embed_query(query)
-            res = collection.query(query_embeddings=[query_emb], n_results=k)
+            if hits is not None:
+                s.set(cache_hit=self.embeddings.hits > hits)
+            return query_emb
 
-            for doc, meta, dist in zip(res["documents"][0], res["metadatas"][0], res["distances"][0]):
-                results.append({
-                    "content": doc,
+    async def _in_pool(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run blocking work on the query pool, keeping the caller's trace span as parent."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._query_pool, contextvars.copy_context().run, func, *args)
+
+    async def aembed_query(self, query: str) -> List[float]:
+        """Async version of embed_query."""
+        with span("embed_query", model=embedding_model_of(self.embeddings)) as s:
+            hits = getattr(self.embeddings, "hits", None)
+            query_emb = await self.embeddings.aembed_query(query)
+            if hits is not None:
+                s.set(cache_hit=self.embeddings.hits > hits)
+            return query_emb
+
+    # ----------------------------------------------------------------------
+    def query_by_embedding(
+        self,
+        query_emb: List[float],
+        support_type: Optional[str] = None,
+        k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search one or all collections with a precomputed query embedding.
+
+        Collections are queried concurrently and their top-k lists are merged
+        into the global top-k, ordered by similarity descending.
+        """
+        with span("vector_search") as s:
+            plan, where = self._plan_search(support_type, k, filters)
+
+            if len(plan) == 1:
+                collection, n_results = plan[0]
+                hits = self._search_collection(collection, query_emb, n_results, where)
+            else:
+                hits = [
+                    hit
+                    for per_collection in self._query_pool.map(
+                        lambda step: self._search_collection(step[0], query_emb, step[1], where),
+                        plan
+                    )
+                    for hit in per_collection
+                ]
+            s.set(collections=len(plan), candidates=len(hits))
+            return self._merge_hits(hits, k)
+
+    def query_by_embeddings(
+        self,
+        query_embs: List[List[float]],
+        support_type: Optional[str] = None,
+        k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Bulk version of query_by_embedding: each collection is queried once for
+        all embeddings, and the results are returned in input order.
+        """
+        if not query_embs:
+            return []
+        plan, where = self._plan_search(support_type, k, filters)
+        per_query: List[List[Tuple[float, str, Dict[str, Any]]]] = [[] for _ in query_embs]
+        for per_collection in self._query_pool.map(
+            lambda step: self._search_collection_many(step[0], query_embs, step[1], where),
+            plan
+        ):
+            for hits, collection_hits in zip(per_query, per_collection):
+                hits.extend(collection_hits)
+        return [self._merge_hits(hits, k) for hits in per_query]
+
+    async def aquery_by_embeddings(
+        self,
+        query_embs: List[List[float]],
+        support_type: Optional[str] = None,
+        k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Async version of query_by_embeddings."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, lambda: self.query_by_embeddings(query_embs, support_type=support_type, k=k, filters=filters)
+        )
+
+    # ----------------------------------------------------------------------
+    async def aquery_similar(
+        self,
+        query: str,
+        support_type: Optional[str] = None,
+        k: int = 5,
+        query_emb: Optional[List[float]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Async version of query_similar that never blocks the event loop.
+
+        The query is embedded with the async embeddings API and the Chroma
+        queries run on the store's thread pool.
+        """
+        if not self._check_query(query, support_type):
+            return []
+
+        with span("vector_store.query_similar", support_type=support_type, k=k, filtered=bool(filters)) as s:
+            if query_emb is None:
+                query_emb = await self.aembed_query(query)
+            results = await self.aquery_by_embedding(query_emb, support_type=support_type, k=k, filters=filters)
+            s.set(results=len(results))
+            return results
+
+    async def aquery_by_embedding(
+        self,
+        query_emb: List[float],
+        support_type: Optional[str] = None,
+        k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Async version of query_by_embedding; planning (which may open collections
+        or rebuild the local indexes) and the collection queries run in the thread pool.
+        """
+        with span("vector_search") as s:
+            plan, where = await self._in_pool(self._plan_search, support_type, k, filters)
+            per_collection = await asyncio.gather(*(
+                self._in_pool(self._search_collection, collection, query_emb, n_results, where)
+                for collection, n_results in plan
+            ))
+            hits = [hit for hits in per_collection for hit in hits]
+            s.set(collections=len(plan), candidates=len(hits))
+            return self._merge_hits(hits, k)
+
+    # ----------------------------------------------------------------------
+    def rebuild_local_indexes(self, page_size: int = 10000) -> None:
+        """Rebuild the BM25 and metadata indexes from the documents stored in Chroma."""
+        self.lexical_index = BM25Index(self.lexical_index.path)
+        self.metadata_index = MetadataIndex(self.metadata_index.path)
+        for name, collection in self.collections.items():
+            offset = 0
+            while True:
+                page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+                self.lexical_index.add_many(zip(page["ids"], page["documents"], page["metadatas"]))
+                self.metadata_index.add_many(
+                    ((doc_id, self._process_metadata_for_return(meta)) for doc_id, meta in zip(page["ids"], page["metadatas"])),
+                    collection=name
+                )
+                if len(page["ids"]) < page_size:
+                    break
+                offset += page_size
+        self._save_local_indexes()
+        logger.info(f"Rebuilt BM25 and metadata indexes with {len(self.lexical_index)} documents.")
+
+    def _ensure_local_indexes(self) -> None:
+        """Rebuild the local indexes once for stores created before they existed."""
+        if self.collections and (not len(self.lexical_index) or not len(self.metadata_index)):
+            logger.warning("Local BM25/metadata indexes are empty; rebuilding them from Chroma.")
+            self.rebuild_local_indexes()
+
+    def query_lexical(
+        self,
+        query: str,
+        support_type: Optional[str] = None,
+        k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Keyword (BM25) search over the local inverted index; no network calls.
+        Results carry 'bm25_score' and a 'similarity' of 0.0.
+        """
+        if not query or not query.strip():
+            return []
+        self._ensure_local_indexes()
+        with span("lexical_search", k=k) as s:
+            allowed_ids = self.metadata_index.match(filters) if filters else None
+            results = [
+                {
+                    "content": content,
                     "metadata": self._process_metadata_for_return(meta),
-                    "similarity": 1 - dist  # Chroma returns distances
-                })
+                    "similarity": 0.0,
+                    "bm25_score": score
+                }
+                for score, _, content, meta in self.lexical_index.search(
+                    query, support_type=support_type, k=k, allowed_ids=allowed_ids
+                )
+            ]
+            s.set(results=len(results), allowed=len(allowed_ids) if allowed_ids is not None else None)
+            return results
+
+    async def aquery_lexical(
+        self,
+        query: str,
+        support_type: Optional[str] = None,
+        k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Async version of query_lexical; BM25 scoring runs in the thread pool."""
+        return await self._in_pool(lambda: self.query_lexical(query, support_type=support_type, k=k, filters=filters))
 
-        # Sort by similarity descending
-        results.sort(key=lambda x: x["similarity"], reverse=True)
-        return results
+    def query_hybrid(
+        self,
+        query: str,
+        support_type: Optional[str] = None,
+        k: int = 5,
+        candidates: Optional[int] = None,
+        query_emb: Optional[List[float]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fuse vector and BM25 results with reciprocal-rank fusion.
+
+        Each side retrieves `candidates` results (default 4 * k) before fusion.
+        """
+        candidates = candidates or 4 * k
+        vector_results = self.query_similar(query, support_type=support_type, k=candidates, query_emb=query_emb, filters=filters)
+        if not vector_results:
+            # query_similar rejects empty/short queries and unknown support types
+            return []
+        lexical_results = self.query_lexical(query, support_type=support_type, k=candidates, filters=filters)
+        with span("rank_fusion", candidates=len(vector_results) + len(lexical_results)):
+            return reciprocal_rank_fusion([vector_results, lexical_results], k=k)
+
+    async def aquery_hybrid(
+        self,
+        query: str,
+        support_type: Optional[str] = None,
+        k: int = 5,
+        candidates: Optional[int] = None,
+        query_emb: Optional[List[float]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Async version of query_hybrid; both sides run in the thread pool."""
+        candidates = candidates or 4 * k
+        vector_results = await self.aquery_similar(query, support_type=support_type, k=candidates, query_emb=query_emb, filters=filters)
+        if not vector_results:
+            return []
+        lexical_results = await self.aquery_lexical(query, support_type=support_type, k=candidates, filters=filters)
+        with span("rank_fusion", candidates=len(vector_results) + len(lexical_results)):
+            return reciprocal_rank_fusion([vector_results, lexical_results], k=k)
 
     # ----------------------------------------------------------------------
     def get_support_types(self) -> List[str]:
         """Return list of all support type collections."""
         return list(self.collections.keys())
+
+
+_shared_stores: Dict[str, SupportVectorStore] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_store(directory: str) -> Optional[SupportVectorStore]:
+    """
+    Process-wide store for a directory, loaded on first call.
+
+    Every session (e.g. each Streamlit user) shares one store, so the manifest,
+    backend client, local indexes and query pool are set up once per process.
+    """
+    key = os.path.abspath(directory)
+    with _shared_lock:
+        if key not in _shared_stores:
+            store = SupportVectorStore.load_local(directory)
+            if store is None:
+                return None
+            _shared_stores[key] = store
+        return _shared_stores[key]
+
+
+def set_shared_store(directory: str, store: SupportVectorStore) -> None:
+    """Register a freshly built store as the process-wide store for its directory."""
+    with _shared_lock:
+        _shared_stores[os.path.abspath(directory)] = store